@@ -0,0 +1,198 @@
+from array import array
+from collections import OrderedDict
+from threading import Lock
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+from .models import Exam, Question
+
+OPTION_CODES = {option: code for code, (option, _label) in enumerate(Question.OPTION_CHOICES)}
+OPTIONS = ''.join(option for option, _label in Question.OPTION_CHOICES)
+UNANSWERED = 255
+
+
+def encode_option(option):
+    """Encode 'A'-'D' as 0-3; anything else (blank answers) becomes UNANSWERED."""
+    return OPTION_CODES.get(option, UNANSWERED)
+
+
+class AnswerKey:
+    """
+    Compact, immutable answer key for one exam.
+
+    Question ids are kept in primary key order in an `array('q')` and the correct
+    options as one byte each, so a key for a 200-question exam is a few kilobytes
+    and pickles cheaply into the shared cache.
+    """
+
+    __slots__ = ('exam_id', 'question_ids', 'options', 'marks', 'negative_marks', '_positions')
+
+    def __init__(self, exam_id, question_ids, options, marks, negative_marks):
+        self.exam_id = exam_id
+        self.question_ids = array('q', question_ids)
+        self.options = bytes(options)
+        self.marks = marks
+        self.negative_marks = negative_marks
+        self._positions = None
+
+    def __getstate__(self):
+        return (self.exam_id, self.question_ids, self.options, self.marks, self.negative_marks)
+
+    def __setstate__(self, state):
+        self.exam_id, self.question_ids, self.options, self.marks, self.negative_marks = state
+        self._positions = None
+
+    def __len__(self):
+        return len(self.question_ids)
+
+    @classmethod
+    def build(cls, exam):
+        """Compile the key for `exam` (an instance or primary key) from the database."""
+        if not isinstance(exam, Exam):
+            exam = Exam.objects.only('marks', 'negative_marking', 'negative_marks_per_question').get(pk=exam)
+        rows = Question.objects.filter(exam_id=exam.pk).order_by('pk').values_list('pk', 'correct_option')
+        question_ids, options = [], []
+        for pk, option in rows:
+            question_ids.append(pk)
+            options.append(encode_option(option))
+        negative_marks = exam.negative_marks_per_question if exam.negative_marking else 0.0
+        return cls(exam.pk, question_ids, options, exam.marks, negative_marks)
+
+    @property
+    def positions(self):
+        """Map of question id to its index in the key, built on first use."""
+        if self._positions is None:
+            self._positions = {pk: index for index, pk in enumerate(self.question_ids)}
+        return self._positions
+
+    def correct_option(self, question_id):
+        return OPTIONS[self.options[self.positions[question_id]]]
+
+    def is_correct(self, question_id, selected_option):
+        index = self.positions.get(question_id)
+        return index is not None and self.options[index] == encode_option(selected_option)
+
+    def question_ids_by_option(self):
+        """Return {'A': [question ids], ...} for every option used in the key."""
+        grouped = {}
+        for pk, code in zip(self.question_ids, self.options):
+            grouped.setdefault(OPTIONS[code], []).append(pk)
+        return grouped
+
+    def score(self, correct, wrong):
+        return correct * self.marks - wrong * self.negative_marks
+
+    def grade(self, answers):
+        """Score an iterable of (question_id, selected_option) pairs without touching the database."""
+        correct = wrong = 0
+        for question_id, selected_option in answers:
+            if not selected_option:
+                continue
+            if self.is_correct(question_id, selected_option):
+                correct += 1
+            else:
+                wrong += 1
+        return self.score(correct, wrong)
+
+
+class _LRU:
+    """Small thread-safe LRU whose entries also expire after `ttl` seconds."""
+
+    def __init__(self, maxsize, ttl):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            value, expires = entry
+            if expires < time.monotonic():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._data[key] = (value, time.monotonic() + self.ttl)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def pop(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+
+# Grading must never use a key older than the last question edit, so each local
+# entry remembers the shared version it was built under and is only used while
+# that is still the exam's version: one cache read per lookup, no database query.
+_local = _LRU(
+    maxsize=getattr(settings, 'ANSWER_KEY_LOCAL_CACHE_SIZE', 256),
+    ttl=getattr(settings, 'ANSWER_KEY_LOCAL_CACHE_TTL', 60),
+)
+SHARED_CACHE_TIMEOUT = getattr(settings, 'ANSWER_KEY_CACHE_TIMEOUT', 60 * 60)
+
+
+def _version_key(exam_id):
+    return f"answer_key_version:{exam_id}"
+
+
+def _cache_key(exam_id, version):
+    return f"answer_key:{exam_id}:{version}"
+
+
+def _shared_version(exam_id):
+    key = _version_key(exam_id)
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, time.time_ns(), None)
+        version = cache.get(key)
+    return version
+
+
+def get_answer_key(exam):
+    """Return the AnswerKey for `exam`, from the local LRU, the shared cache or the database."""
+    exam_id = getattr(exam, 'pk', exam)
+    version = _shared_version(exam_id)
+    entry = _local.get(exam_id)
+    if entry is not None and entry[0] == version:
+        return entry[1]
+
+    key = cache.get(_cache_key(exam_id, version))
+    if key is None:
+        key = AnswerKey.build(exam)
+        cache.set(_cache_key(exam_id, version), key, SHARED_CACHE_TIMEOUT)
+    _local.set(exam_id, (version, key))
+    return key
+
+
+def invalidate_answer_key(exam_id):
+    """
+    Move the exam to a new answer key version, now and again once the transaction commits.
+
+    The second bump drops any key another process built from the database as it
+    was before the commit.
+    """
+    _local.pop(exam_id)
+    _bump_version(exam_id)
+    transaction.on_commit(lambda: _bump_version(exam_id))
+
+
+def _bump_version(exam_id):
+    cache.set(_version_key(exam_id), time.time_ns(), None)
+
+
+def clear_local_answer_keys():
+    _local.clear()
@@ -0,0 +1,115 @@
+import asyncio
+import logging
+from datetime import timedelta
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.utils import timezone
+
+from .grading import GRADING_BATCH_SIZE, grade_attempts
+from .models import ExamAttempt
+from .submissions import DEADLINE_GRACE, flush_buffers, flush_due_buffers
+
+AUTO_SUBMIT_INTERVAL = getattr(settings, 'AUTO_SUBMIT_INTERVAL', 15)
+# How long a completed attempt may wait for its score before the sweep grades it.
+REGRADE_DELAY = timedelta(seconds=getattr(settings, 'AUTO_SUBMIT_REGRADE_DELAY', 60))
+
+logger = logging.getLogger(__name__)
+
+
+def expired_attempts(now=None):
+    """Open attempts whose deadline, plus the grace period, has passed. Served by attempt_open_deadline_idx."""
+    cutoff = (now or timezone.now()) - DEADLINE_GRACE
+    return ExamAttempt.objects.filter(completed_at__isnull=True, deadline__lte=cutoff)
+
+
+def claim_expired(batch_size=GRADING_BATCH_SIZE, now=None):
+    """
+    Mark up to `batch_size` expired attempts completed and return the ids this call closed.
+
+    Candidates are locked with SKIP LOCKED where the database supports it, and the
+    completing UPDATE only touches rows that are still open, so concurrent schedulers
+    never close the same attempt twice. The rows closed here are read back by their
+    completion timestamp inside the same transaction.
+    """
+    now = now or timezone.now()
+    with transaction.atomic():
+        candidates = list(
+            expired_attempts(now).select_for_update(skip_locked=True)
+            .order_by('deadline').values_list('pk', flat=True)[:batch_size]
+        )
+        if not candidates:
+            return []
+        stamp = timezone.now()
+        ExamAttempt.objects.filter(pk__in=candidates, completed_at__isnull=True).update(completed_at=stamp)
+        closed = list(ExamAttempt.objects.filter(pk__in=candidates, completed_at=stamp).values_list('pk', flat=True))
+        # Answers still sitting in autosave buffers count; written once closed, so none can follow.
+        flush_buffers(closed, discard=True)
+        return closed
+
+
+def close_expired_attempts(batch_size=GRADING_BATCH_SIZE, now=None):
+    """Close and grade every expired attempt in batches. Returns how many this process closed."""
+    closed = 0
+    while True:
+        attempt_ids = claim_expired(batch_size, now)
+        if not attempt_ids:
+            return closed
+        grade_attempts(attempt_ids, batch_size)
+        closed += len(attempt_ids)
+
+
+def ungraded_attempts(now=None):
+    """Completed attempts still unscored `REGRADE_DELAY` after closing. Served by attempt_ungraded_idx."""
+    cutoff = (now or timezone.now()) - REGRADE_DELAY
+    return ExamAttempt.objects.filter(completed_at__isnull=False, completed_at__lte=cutoff, graded_at__isnull=True)
+
+
+def grade_ungraded(batch_size=GRADING_BATCH_SIZE, now=None):
+    """
+    Grade attempts that were closed but never scored, e.g. when a process died in between.
+
+    The delay leaves attempts being graded right now to their own process; grading
+    is idempotent, so a sweep that still overlaps one only repeats the work.
+    Returns how many were graded.
+    """
+    attempt_ids = list(ungraded_attempts(now).values_list('pk', flat=True))
+    if not attempt_ids:
+        return 0
+    logger.warning("Grading %d completed attempts that were left unscored", len(attempt_ids))
+    return grade_attempts(attempt_ids, batch_size)
+
+
+def _sweep(batch_size):
+    close_old_connections()
+    try:
+        flush_due_buffers()
+        closed = close_expired_attempts(batch_size)
+        grade_ungraded(batch_size)
+        return closed
+    finally:
+        close_old_connections()
+
+
+async def run_scheduler(interval=AUTO_SUBMIT_INTERVAL, batch_size=GRADING_BATCH_SIZE, stop=None):
+    """
+    Sweep for expired attempts every `interval` seconds until `stop` (an asyncio.Event) is set.
+
+    Each sweep first writes autosave buffers that have waited past their flush interval,
+    and ends by grading completed attempts whose grading never finished.
+    """
+    stop = stop or asyncio.Event()
+    sweep = sync_to_async(_sweep, thread_sensitive=True)
+    while not stop.is_set():
+        try:
+            closed = await sweep(batch_size)
+        except Exception:
+            logger.exception("Auto-submit sweep failed")
+        else:
+            if closed:
+                logger.info("Auto-submitted %d expired attempts", closed)
+        try:
+            await asyncio.wait_for(stop.wait(), timeout=interval)
+        except asyncio.TimeoutError:
+            pass
@@ -0,0 +1,134 @@
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from rest_framework import permissions
+
+from .models import Exam, Purchase
+
+ENTITLEMENT_CACHE_TIMEOUT = getattr(settings, 'ENTITLEMENT_CACHE_TIMEOUT', 5 * 60)
+
+
+def _version_key(user_id):
+    return f"entitlements_version:{user_id}"
+
+
+def _owned_key(user_id, version):
+    return f"entitlements:{user_id}:{version}"
+
+
+def _owned_version(user_id):
+    key = _version_key(user_id)
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, time.time_ns(), None)
+        version = cache.get(key)
+    return version
+
+
+def _exam_key(exam_id):
+    return f"exam_series:{exam_id}"
+
+
+def get_owned_series(user_id):
+    """
+    Return the frozenset of TestSeries ids the user has purchased.
+
+    The set is cached under the user's current entitlement version, read before
+    the query: a purchase committed meanwhile bumps the version, so a set read
+    just before it is stored under a key nobody asks for again.
+    """
+    key = _owned_key(user_id, _owned_version(user_id))
+    owned = cache.get(key)
+    if owned is None:
+        owned = frozenset(Purchase.objects.filter(user_id=user_id).values_list('test_series_id', flat=True))
+        cache.set(key, owned, ENTITLEMENT_CACHE_TIMEOUT)
+    return owned
+
+
+def invalidate_entitlements(user_id):
+    """
+    Move the user to a new entitlement version, now and again once the transaction commits.
+
+    The second bump drops any set cached by another process from the database as
+    it was before the commit.
+    """
+    _bump_version(user_id)
+    transaction.on_commit(lambda: _bump_version(user_id))
+
+
+def _bump_version(user_id):
+    cache.set(_version_key(user_id), time.time_ns(), None)
+
+
+def owns_series(user_id, series_id):
+    return series_id in get_owned_series(user_id)
+
+
+def partition_owned(user_id, series_ids):
+    """Split `series_ids` into (owned, not owned) lists, preserving order, with one cache read."""
+    owned = get_owned_series(user_id)
+    mine, others = [], []
+    for series_id in series_ids:
+        (mine if series_id in owned else others).append(series_id)
+    return mine, others
+
+
+def filter_owned(queryset, user_id, owned=True):
+    """Restrict a TestSeries queryset to series the user owns (or, with owned=False, does not)."""
+    ids = get_owned_series(user_id)
+    return queryset.filter(pk__in=ids) if owned else queryset.exclude(pk__in=ids)
+
+
+def get_exam_series(exam_id):
+    """Return (test_series_id, creator_id) for an exam, or None if it does not exist."""
+    key = _exam_key(exam_id)
+    series = cache.get(key)
+    if series is None:
+        series = Exam.objects.filter(pk=exam_id).values_list('test_series_id', 'test_series__creator_id').first()
+        if series is None:
+            return None
+        cache.set(key, series, ENTITLEMENT_CACHE_TIMEOUT)
+    return series
+
+
+def forget_exam_series(exam_id):
+    cache.delete(_exam_key(exam_id))
+
+
+class HasPurchasedSeries(permissions.BasePermission):
+    """
+    Allows access to an exam only to users who bought its test series, its creator and staff.
+
+    The exam comes from the view's `exam_id` URL kwarg. Both the exam's series and
+    the user's purchases are cached, so warm checks issue no queries. Unknown exams
+    pass through so the view can answer 404.
+    """
+    message = "You have not purchased this test series."
+
+    def has_permission(self, request, view):
+        user = request.user
+        if not user or not user.is_authenticated:
+            return False
+        if user.is_staff or user.is_superuser:
+            return True
+        series = get_exam_series(view.kwargs['exam_id'])
+        if series is None:
+            return True
+        series_id, creator_id = series
+        return creator_id == user.pk or owns_series(user.pk, series_id)
+
+
+class IsSeriesCreator(permissions.BasePermission):
+    """Allows access to an exam only to the creator of its test series and staff."""
+    message = "Only the creator of this test series can do that."
+
+    def has_permission(self, request, view):
+        user = request.user
+        if not user or not user.is_authenticated:
+            return False
+        if user.is_staff or user.is_superuser:
+            return True
+        series = get_exam_series(view.kwargs['exam_id'])
+        return series is None or series[1] == user.pk
@@ -0,0 +1,112 @@
+import csv
+import io
+import json
+import zlib
+
+from django.db.models import CharField
+from django.db.models.functions import Cast
+
+from backend.database import replica_alias
+
+from .answer_keys import get_answer_key
+from .models import Answer, ExamAttempt
+
+EXPORT_BATCH_SIZE = 2000
+EXPORT_FORMATS = ('csv', 'ndjson')
+ATTEMPT_COLUMNS = ('attempt', 'email', 'phone', 'score', 'started_at', 'completed_at')
+
+
+def result_columns(answer_key):
+    """Header of the result sheet: attempt fields, then one `q<id>` column per question in key order."""
+    return list(ATTEMPT_COLUMNS) + [f"q{question_id}" for question_id in answer_key.question_ids]
+
+
+def iter_result_batches(exam_id, batch_size=EXPORT_BATCH_SIZE, completed_only=False):
+    """
+    Yield lists of result rows (tuples matching `result_columns`) for an exam.
+
+    Attempts are read with a chunked values_list iterator and their answers with
+    one query per batch, so memory holds a single batch whatever the exam's size.
+    The phone is cast to text in SQL to skip building a PhoneNumber per row. Reads
+    go to a read replica when one is configured.
+    """
+    answer_key = get_answer_key(exam_id)
+    positions = answer_key.positions
+    width = len(answer_key)
+
+    using = replica_alias()
+    attempts = ExamAttempt.objects.using(using).filter(exam_id=exam_id)
+    if completed_only:
+        attempts = attempts.filter(completed_at__isnull=False)
+    attempts = attempts.order_by('pk').values_list(
+        'pk', 'user__email', Cast('user__phone', CharField()), 'score', 'started_at', 'completed_at',
+    )
+
+    batch = []
+    for row in attempts.iterator(chunk_size=batch_size):
+        batch.append(row)
+        if len(batch) == batch_size:
+            yield _with_answers(batch, positions, width, using)
+            batch = []
+    if batch:
+        yield _with_answers(batch, positions, width, using)
+
+
+def _with_answers(batch, positions, width, using):
+    choices = {row[0]: [''] * width for row in batch}
+    answers = Answer.objects.using(using).filter(attempt_id__in=list(choices)).values_list(
+        'attempt_id', 'question_id', 'selected_option',
+    )
+    for attempt_id, question_id, option in answers:
+        index = positions.get(question_id)
+        if index is not None:
+            choices[attempt_id][index] = option or ''
+    return [
+        (pk, email, phone, score, _isoformat(started_at), _isoformat(completed_at), *choices[pk])
+        for pk, email, phone, score, started_at, completed_at in batch
+    ]
+
+
+def _isoformat(value):
+    return value.isoformat() if value is not None else ''
+
+
+def csv_chunks(columns, batches):
+    """Encode a header and row batches as CSV, one bytes chunk per batch."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(columns)
+    for batch in batches:
+        writer.writerows(batch)
+        yield buffer.getvalue().encode('utf-8')
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode('utf-8')
+
+
+def ndjson_chunks(columns, batches):
+    """Encode row batches as newline-delimited JSON objects, one bytes chunk per batch."""
+    dumps = json.JSONEncoder(ensure_ascii=False, separators=(',', ':')).encode
+    for batch in batches:
+        yield ''.join(dumps(dict(zip(columns, row))) + '\n' for row in batch).encode('utf-8')
+
+
+def gzip_chunks(chunks, level=6):
+    """Compress a stream of bytes chunks into a gzip stream on the fly."""
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def export_results(exam_id, fmt='csv', compress=False, batch_size=EXPORT_BATCH_SIZE, completed_only=False):
+    """Return an iterator of bytes chunks with the exam's results as CSV or NDJSON, optionally gzipped."""
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f"Unknown export format {fmt!r}")
+    columns = result_columns(get_answer_key(exam_id))
+    batches = iter_result_batches(exam_id, batch_size, completed_only)
+    chunks = csv_chunks(columns, batches) if fmt == 'csv' else ndjson_chunks(columns, batches)
+    return gzip_chunks(chunks) if compress else chunks
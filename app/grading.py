@@ -0,0 +1,107 @@
+from django.db import transaction
+from django.db.models import BooleanField, Count, ExpressionWrapper, Q, Value
+from django.utils import timezone
+
+from .answer_keys import get_answer_key
+from .leaderboard import invalidate_leaderboard, record_scores
+from .models import Answer, ExamAttempt
+from .progress import record_attempts
+
+GRADING_BATCH_SIZE = 500
+
+
+def _chunks(items, size):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def _is_correct_expression(answer_key):
+    """Build a boolean SQL expression matching answers against the compiled key."""
+    condition = Q()
+    for option, question_ids in answer_key.question_ids_by_option().items():
+        condition |= Q(question_id__in=question_ids, selected_option=option)
+    if not condition:
+        return Value(False)
+    return ExpressionWrapper(condition, output_field=BooleanField())
+
+
+def _grade_batch(answer_key, attempt_ids):
+    """Grade one batch of attempts of a single exam in three set-based queries and return {attempt_id: score}."""
+    answers = Answer.objects.filter(attempt_id__in=attempt_ids)
+
+    # Pass 1: flag every answer in the batch with a single UPDATE.
+    answers.update(is_correct=_is_correct_expression(answer_key))
+
+    # Pass 2: count right and wrong answers per attempt. Blank options are not penalised.
+    counts = {
+        row['attempt_id']: row
+        for row in answers.values('attempt_id').annotate(
+            correct=Count('pk', filter=Q(is_correct=True)),
+            wrong=Count('pk', filter=Q(is_correct=False) & ~Q(selected_option='')),
+        )
+    }
+
+    # Pass 3: write all scores back in one bulk UPDATE, stamped so the sweep knows they are done.
+    scores = {}
+    for attempt_id in attempt_ids:
+        row = counts.get(attempt_id)
+        scores[attempt_id] = answer_key.score(row['correct'], row['wrong']) if row else 0.0
+    graded_at = timezone.now()
+    ExamAttempt.objects.bulk_update(
+        [ExamAttempt(pk=attempt_id, score=score, graded_at=graded_at) for attempt_id, score in scores.items()],
+        ['score', 'graded_at'],
+    )
+    return scores
+
+
+def grade_attempts(attempts, batch_size=GRADING_BATCH_SIZE):
+    """
+    Grade the given attempts (instances or primary keys) and return how many were scored.
+
+    Attempts are grouped by exam and graded in batches of `batch_size`, so the number
+    of queries grows with the number of batches rather than the number of answers.
+    """
+    attempt_ids = [getattr(attempt, 'pk', attempt) for attempt in attempts]
+    by_exam = {}
+    ranked_users = {}
+    for batch in _chunks(attempt_ids, batch_size):
+        rows = ExamAttempt.objects.filter(pk__in=batch).values_list('pk', 'exam_id', 'user_id', 'completed_at')
+        for pk, exam_id, user_id, completed_at in rows:
+            by_exam.setdefault(exam_id, []).append(pk)
+            if completed_at is not None:
+                ranked_users[pk] = user_id
+
+    graded = 0
+    for exam_id, ids in by_exam.items():
+        answer_key = get_answer_key(exam_id)
+        for batch in _chunks(ids, batch_size):
+            with transaction.atomic():
+                scores = _grade_batch(answer_key, batch)
+            graded += len(scores)
+            record_scores(exam_id, [
+                (ranked_users[pk], score) for pk, score in scores.items() if pk in ranked_users
+            ])
+            record_attempts((ranked_users[pk], exam_id) for pk in scores if pk in ranked_users)
+    return graded
+
+
+def grade_exam(exam, completed_only=True, batch_size=GRADING_BATCH_SIZE):
+    """
+    Grade every attempt of `exam` (an instance or primary key) and return how many were scored.
+
+    By default only attempts with `completed_at` set are graded.
+    """
+    answer_key = get_answer_key(exam)
+    attempts = ExamAttempt.objects.filter(exam_id=answer_key.exam_id)
+    if completed_only:
+        attempts = attempts.filter(completed_at__isnull=False)
+    attempts = list(attempts.order_by('pk').values_list('pk', 'user_id'))
+
+    graded = 0
+    for batch in _chunks(attempts, batch_size):
+        with transaction.atomic():
+            graded += len(_grade_batch(answer_key, [pk for pk, _user_id in batch]))
+        record_attempts((user_id, answer_key.exam_id) for _pk, user_id in batch)
+    # A regrade can lower scores, which incremental updates cannot express.
+    invalidate_leaderboard(answer_key.exam_id)
+    return graded
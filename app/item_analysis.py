@@ -0,0 +1,169 @@
+from datetime import timedelta
+
+import numpy as np
+from django.conf import settings
+from django.core.cache import cache
+
+from .answer_keys import OPTIONS, UNANSWERED, get_answer_key
+from .models import Answer, ExamAttempt
+
+ANALYSIS_BATCH_SIZE = 5000
+ANALYSIS_CACHE_TIMEOUT = 24 * 60 * 60
+# completed_at is stamped before the attempt's transaction commits, so an attempt can
+# become visible after others completed later. Each update re-reads this far behind
+# the newest attempt folded in, skipping the attempts it already counted.
+ANALYSIS_LATE_WINDOW = timedelta(seconds=getattr(settings, 'ITEM_ANALYSIS_LATE_WINDOW', 10 * 60))
+
+# Response matrix codes: 0-3 for options A-D, 4 for unanswered.
+BLANK = len(OPTIONS)
+_OPTION_TO_CODE = np.full(256, BLANK, dtype=np.uint8)
+for _code, _option in enumerate(OPTIONS):
+    _OPTION_TO_CODE[ord(_option)] = _code
+
+
+class ItemAnalysis:
+    """
+    Classical item statistics for one exam, kept as running sums.
+
+    Per question it tracks how many attempts chose each option and the sums needed
+    for the corrected point-biserial (the item against the rest of the test), so new
+    attempts can be folded in without revisiting old ones.
+    """
+
+    def __init__(self, answer_key):
+        k = len(answer_key)
+        self.exam_id = answer_key.exam_id
+        self.question_ids = np.frombuffer(answer_key.question_ids.tobytes(), dtype=np.int64).copy()
+        self.key = np.frombuffer(answer_key.options, dtype=np.uint8).copy()
+        self.attempts = 0
+        self.option_counts = np.zeros((BLANK + 1, k), dtype=np.int64)
+        self.correct_counts = np.zeros(k, dtype=np.int64)
+        self.sum_rest = np.zeros(k, dtype=np.float64)
+        self.sum_rest_sq = np.zeros(k, dtype=np.float64)
+        self.sum_item_rest = np.zeros(k, dtype=np.float64)
+        self.watermark = None  # completed_at of the newest attempt folded in
+        self.recent = {}  # attempt id: completed_at, for attempts folded in within the late window
+
+    def matches(self, answer_key):
+        return (
+            self.question_ids.tobytes() == answer_key.question_ids.tobytes()
+            and self.key.tobytes() == answer_key.options
+        )
+
+    def add_responses(self, responses):
+        """Fold in an (attempts x questions) uint8 matrix of option codes."""
+        correct = (responses == self.key).astype(np.float64)
+        rest = correct.sum(axis=1, keepdims=True) - correct
+        self.attempts += responses.shape[0]
+        self.correct_counts += correct.sum(axis=0).astype(np.int64)
+        for code in range(BLANK + 1):
+            self.option_counts[code] += (responses == code).sum(axis=0)
+        self.sum_rest += rest.sum(axis=0)
+        self.sum_rest_sq += (rest * rest).sum(axis=0)
+        self.sum_item_rest += (correct * rest).sum(axis=0)
+
+    def difficulty(self):
+        """p-value per question: the share of attempts that answered it correctly."""
+        if not self.attempts:
+            return np.full(len(self.key), np.nan)
+        return self.correct_counts / self.attempts
+
+    def discrimination(self):
+        """Corrected point-biserial per question; NaN where either side has no variance."""
+        n = self.attempts
+        if not n:
+            return np.full(len(self.key), np.nan)
+        p = self.correct_counts / n
+        mean_rest = self.sum_rest / n
+        covariance = self.sum_item_rest / n - p * mean_rest
+        variance = p * (1 - p) * (self.sum_rest_sq / n - mean_rest ** 2)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            return np.where(variance > 1e-12, covariance / np.sqrt(np.maximum(variance, 1e-12)), np.nan)
+
+    def distractors(self):
+        """Share of attempts choosing A-D and leaving the question blank, shape (5, questions)."""
+        return self.option_counts / max(self.attempts, 1)
+
+    def summary(self):
+        """Return one dict per question in key order."""
+        difficulty, discrimination, distractors = self.difficulty(), self.discrimination(), self.distractors()
+        rows = []
+        for index, question_id in enumerate(self.question_ids.tolist()):
+            choices = {option: float(distractors[code, index]) for code, option in enumerate(OPTIONS)}
+            choices['blank'] = float(distractors[BLANK, index])
+            rows.append({
+                'question': question_id,
+                'correct_option': OPTIONS[self.key[index]] if self.key[index] != UNANSWERED else None,
+                'difficulty': float(difficulty[index]),
+                'discrimination': float(discrimination[index]),
+                'choices': choices,
+            })
+        return rows
+
+    def update(self, batch_size=ANALYSIS_BATCH_SIZE):
+        """Stream attempts not yet counted into the statistics. Returns how many."""
+        attempts = ExamAttempt.objects.filter(exam_id=self.exam_id, completed_at__isnull=False)
+        if self.watermark is not None:
+            attempts = attempts.filter(completed_at__gte=self.watermark - ANALYSIS_LATE_WINDOW)
+        attempts = attempts.order_by('completed_at', 'pk').values_list('completed_at', 'pk')
+
+        added = 0
+        batch = []
+        for row in attempts.iterator(chunk_size=batch_size):
+            if row[1] in self.recent:
+                continue
+            batch.append(row)
+            if len(batch) == batch_size:
+                added += self._add_batch(batch)
+                batch = []
+        if batch:
+            added += self._add_batch(batch)
+        return added
+
+    def _add_batch(self, batch):
+        attempt_ids = np.fromiter((pk for _completed_at, pk in batch), dtype=np.int64, count=len(batch))
+        order = np.argsort(attempt_ids)
+        sorted_ids = attempt_ids[order]
+
+        rows = Answer.objects.filter(attempt_id__in=attempt_ids.tolist()).values_list(
+            'attempt_id', 'question_id', 'selected_option',
+        )
+        triples = list(rows)
+        responses = np.full((len(batch), len(self.key)), BLANK, dtype=np.uint8)
+        if triples and len(self.key):
+            answer_attempts, questions, options = zip(*triples)
+            row_index = order[np.searchsorted(sorted_ids, np.array(answer_attempts, dtype=np.int64))]
+            # Key question ids are in primary key order, so columns are a binary search away.
+            questions = np.array(questions, dtype=np.int64)
+            column_index = np.minimum(np.searchsorted(self.question_ids, questions), len(self.key) - 1)
+            known = self.question_ids[column_index] == questions
+            option_bytes = ''.join(option or ' ' for option in options).encode('latin-1')
+            codes = _OPTION_TO_CODE[np.frombuffer(option_bytes, dtype=np.uint8)]
+            responses[row_index[known], column_index[known]] = codes[known]
+
+        self.add_responses(responses)
+        self.recent.update((pk, completed_at) for completed_at, pk in batch)
+        self.watermark = max(self.watermark or batch[-1][0], batch[-1][0])
+        horizon = self.watermark - ANALYSIS_LATE_WINDOW
+        self.recent = {pk: completed_at for pk, completed_at in self.recent.items() if completed_at >= horizon}
+        return len(batch)
+
+
+def _cache_key(exam_id):
+    return f"item_analysis:{exam_id}"
+
+
+def get_item_analysis(exam_id, batch_size=ANALYSIS_BATCH_SIZE):
+    """
+    Return up-to-date item statistics for an exam.
+
+    Cached statistics are brought forward with only the attempts completed since
+    they were last updated; a changed answer key forces a rebuild.
+    """
+    answer_key = get_answer_key(exam_id)
+    analysis = cache.get(_cache_key(exam_id))
+    if analysis is None or not analysis.matches(answer_key):
+        analysis = ItemAnalysis(answer_key)
+    if analysis.update(batch_size) or analysis.watermark is None:
+        cache.set(_cache_key(exam_id), analysis, ANALYSIS_CACHE_TIMEOUT)
+    return analysis
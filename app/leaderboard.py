@@ -0,0 +1,224 @@
+import time
+from array import array
+from bisect import bisect_left, bisect_right
+from collections import OrderedDict
+from threading import Lock
+
+from django.conf import settings
+from django.core.cache import cache
+
+from .models import ExamAttempt
+
+LEADERBOARD_MAX_CATCHUP = getattr(settings, 'LEADERBOARD_MAX_CATCHUP', 1000)
+LEADERBOARD_DELTA_TIMEOUT = getattr(settings, 'LEADERBOARD_DELTA_TIMEOUT', 60 * 60)
+LEADERBOARD_GAP_TIMEOUT = getattr(settings, 'LEADERBOARD_GAP_TIMEOUT', 5)
+# Exams whose index a process keeps; the least recently read are dropped past this.
+LEADERBOARD_LOCAL_CACHE_SIZE = getattr(settings, 'LEADERBOARD_LOCAL_CACHE_SIZE', 64)
+REBUILD_CHUNK_SIZE = 5000
+
+
+class Leaderboard:
+    """
+    Sorted rank index of each user's best completed score on one exam.
+
+    Entries live in two parallel arrays ordered by score descending, then user id,
+    so rank, top-N and percentile lookups are binary searches and a million entries
+    take about 16 MB. Scores are stored negated to keep the arrays ascending.
+    """
+
+    def __init__(self, exam_id, best_scores=None, version=0):
+        self.exam_id = exam_id
+        self.version = version
+        self.stalled_since = None  # When catching up first hit a delta not written yet
+        self._best = dict(best_scores or {})
+        ordered = sorted((-score, user_id) for user_id, score in self._best.items())
+        self._scores = array('d', (score for score, _user_id in ordered))
+        self._users = array('q', (user_id for _score, user_id in ordered))
+
+    def __len__(self):
+        return len(self._users)
+
+    @classmethod
+    def build(cls, exam_id, version=0):
+        """
+        Rebuild from completed attempts in one streaming pass over ExamAttempt.
+
+        Reads stay on the primary: the board is stamped with `version`, so scores
+        a lagging replica had not seen yet would never be replayed.
+        """
+        best = {}
+        rows = (
+            ExamAttempt.objects.filter(exam_id=exam_id, completed_at__isnull=False)
+            .values_list('user_id', 'score')
+            .iterator(chunk_size=REBUILD_CHUNK_SIZE)
+        )
+        for user_id, score in rows:
+            if score > best.get(user_id, float('-inf')):
+                best[user_id] = score
+        return cls(exam_id, best, version)
+
+    def _position(self, user_id, negated):
+        lo = bisect_left(self._scores, negated)
+        hi = bisect_right(self._scores, negated, lo)
+        return bisect_left(self._users, user_id, lo, hi)
+
+    def record(self, user_id, score):
+        """Record a graded score, keeping the user's best. Returns True if the index changed."""
+        previous = self._best.get(user_id)
+        if previous is not None:
+            if previous >= score:
+                return False
+            index = self._position(user_id, -previous)
+            del self._scores[index]
+            del self._users[index]
+        self._best[user_id] = score
+        index = self._position(user_id, -score)
+        self._scores.insert(index, -score)
+        self._users.insert(index, user_id)
+        return True
+
+    def score_of(self, user_id):
+        return self._best.get(user_id)
+
+    def rank(self, user_id):
+        """1-based competition rank of the user (ties share a rank), or None if unranked."""
+        score = self._best.get(user_id)
+        if score is None:
+            return None
+        return bisect_left(self._scores, -score) + 1
+
+    def percentile(self, score):
+        """Percentage of ranked users who scored strictly below `score`."""
+        if not self._users:
+            return 0.0
+        below = len(self._scores) - bisect_right(self._scores, -score)
+        return 100.0 * below / len(self._scores)
+
+    def top(self, n):
+        """Return up to `n` leading entries as (rank, user_id, score) tuples."""
+        entries = []
+        rank = 0
+        previous = None
+        for index in range(min(n, len(self._users))):
+            score = self._scores[index]
+            if score != previous:
+                rank, previous = index + 1, score
+            entries.append((rank, self._users[index], -score))
+        return entries
+
+
+# Each process keeps its own indexes. Changes travel between processes as numbered
+# deltas in the shared cache: a process that is behind replays the deltas it missed.
+# A delta can be missing for a moment, between a publisher reserving its versions
+# and writing them; the board then stops at the last contiguous version and only
+# rebuilds from the database once the gap outlives LEADERBOARD_GAP_TIMEOUT, or
+# when a delta is REBUILD.
+#
+# Each board lives in a slot with its own lock, and slots are kept in LRU order up
+# to LEADERBOARD_LOCAL_CACHE_SIZE. A dropped exam simply rebuilds on its next read.
+# A board is only touched under its slot's lock: a thread still holding a dropped
+# slot works on a board nobody else can reach.
+_slots = OrderedDict()
+_slots_guard = Lock()
+
+REBUILD = 'rebuild'
+
+
+class _Slot:
+    __slots__ = ('lock', 'board')
+
+    def __init__(self):
+        self.lock = Lock()
+        self.board = None
+
+
+def _slot(exam_id):
+    """Return the exam's slot, marked most recently used, dropping the least recently used past the limit."""
+    with _slots_guard:
+        slot = _slots.get(exam_id)
+        if slot is None:
+            slot = _slots[exam_id] = _Slot()
+        else:
+            _slots.move_to_end(exam_id)
+        while len(_slots) > LEADERBOARD_LOCAL_CACHE_SIZE:
+            _slots.popitem(last=False)
+        return slot
+
+
+def _version_key(exam_id):
+    return f"leaderboard:{exam_id}:version"
+
+
+def _delta_key(exam_id, version):
+    return f"leaderboard:{exam_id}:delta:{version}"
+
+
+def _shared_version(exam_id):
+    return cache.get_or_set(_version_key(exam_id), 0, None)
+
+
+def _catch_up(board, shared):
+    """Replay deltas up to `shared` onto `board`. Returns False if the board must be rebuilt."""
+    missed = range(board.version + 1, shared + 1)
+    if len(missed) > LEADERBOARD_MAX_CATCHUP:
+        return False
+    deltas = cache.get_many([_delta_key(board.exam_id, version) for version in missed])
+    for version in missed:
+        delta = deltas.get(_delta_key(board.exam_id, version))
+        if delta is None:
+            if board.stalled_since is None:
+                board.stalled_since = time.monotonic()
+            return time.monotonic() - board.stalled_since < LEADERBOARD_GAP_TIMEOUT
+        if delta == REBUILD:
+            return False
+        board.record(*delta)
+        board.version = version
+        board.stalled_since = None
+    return True
+
+
+def get_leaderboard(exam_id):
+    """Return an up-to-date Leaderboard for the exam."""
+    shared = _shared_version(exam_id)
+    slot = _slot(exam_id)
+    with slot.lock:
+        board = slot.board
+        if board is not None and board.version < shared and not _catch_up(board, shared):
+            board = None
+        if board is None:
+            board = slot.board = Leaderboard.build(exam_id, version=shared)
+        return board
+
+
+def _publish(exam_id, deltas):
+    """Reserve versions for `deltas` with one increment and write them with one call."""
+    key = _version_key(exam_id)
+    try:
+        last = cache.incr(key, len(deltas))
+    except ValueError:
+        cache.add(key, 0, None)
+        last = cache.incr(key, len(deltas))
+    first = last - len(deltas) + 1
+    cache.set_many(
+        {_delta_key(exam_id, first + offset): delta for offset, delta in enumerate(deltas)},
+        LEADERBOARD_DELTA_TIMEOUT,
+    )
+
+
+def record_scores(exam_id, scores):
+    """Publish (user_id, score) pairs of newly completed and graded attempts."""
+    scores = list(scores)
+    if scores:
+        _publish(exam_id, scores)
+
+
+def invalidate_leaderboard(exam_id):
+    """Force every process to rebuild the exam's leaderboard, e.g. after a regrade."""
+    with _slots_guard:
+        _slots.pop(exam_id, None)
+    _publish(exam_id, [REBUILD])
+
+
+def clear_local_leaderboards():
+    with _slots_guard:
+        _slots.clear()
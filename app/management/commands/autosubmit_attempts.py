@@ -0,0 +1,38 @@
+import asyncio
+import signal
+
+from django.core.management.base import BaseCommand
+
+from app.autosubmit import AUTO_SUBMIT_INTERVAL, close_expired_attempts, grade_ungraded, run_scheduler
+from app.submissions import flush_due_buffers
+from app.grading import GRADING_BATCH_SIZE
+
+
+class Command(BaseCommand):
+    help = (
+        "Auto-submit and grade exam attempts whose time has run out, and write autosaved answers "
+        "that have waited past their flush interval, then grade completed attempts left unscored. "
+        "Runs until stopped, or sweeps once with --once (for cron). Safe to run in several processes."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help="Sweep once and exit.")
+        parser.add_argument('--interval', type=float, default=AUTO_SUBMIT_INTERVAL, help="Seconds between sweeps.")
+        parser.add_argument('--batch-size', type=int, default=GRADING_BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        if options['once']:
+            flush_due_buffers()
+            closed = close_expired_attempts(options['batch_size'])
+            grade_ungraded(options['batch_size'])
+            self.stdout.write(self.style.SUCCESS(f"Auto-submitted {closed} expired attempts."))
+            return
+        asyncio.run(self.serve(options['interval'], options['batch_size']))
+
+    async def serve(self, interval, batch_size):
+        stop = asyncio.Event()
+        loop = asyncio.get_running_loop()
+        for signum in (signal.SIGINT, signal.SIGTERM):
+            loop.add_signal_handler(signum, stop.set)
+        self.stdout.write(f"Sweeping for expired attempts every {interval:g}s")
+        await run_scheduler(interval, batch_size, stop)
@@ -0,0 +1,34 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from app.exports import EXPORT_BATCH_SIZE, EXPORT_FORMATS, export_results
+from app.models import Exam
+
+
+class Command(BaseCommand):
+    help = "Stream an exam's results, one row per attempt with its chosen options, as CSV or NDJSON."
+
+    def add_arguments(self, parser):
+        parser.add_argument('exam_id', type=int)
+        parser.add_argument('--format', choices=EXPORT_FORMATS, default='csv')
+        parser.add_argument('--gzip', action='store_true', help="Gzip the output.")
+        parser.add_argument('--output', '-o', help="File to write to (default: stdout).")
+        parser.add_argument('--completed', action='store_true', help="Only include submitted attempts.")
+        parser.add_argument('--batch-size', type=int, default=EXPORT_BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        if not Exam.objects.filter(pk=options['exam_id']).exists():
+            raise CommandError(f"Exam {options['exam_id']} does not exist.")
+        if options['gzip'] and not options['output']:
+            raise CommandError("--gzip needs --output.")
+
+        chunks = export_results(
+            options['exam_id'], options['format'], compress=options['gzip'],
+            batch_size=options['batch_size'], completed_only=options['completed'],
+        )
+        if options['output']:
+            with open(options['output'], 'wb') as handle:
+                for chunk in chunks:
+                    handle.write(chunk)
+        else:
+            for chunk in chunks:
+                self.stdout.write(chunk.decode('utf-8'), ending='')
@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from app.grading import GRADING_BATCH_SIZE, grade_exam
+from app.models import Exam
+
+
+class Command(BaseCommand):
+    help = "Grade all attempts of an exam with set-based bulk queries."
+
+    def add_arguments(self, parser):
+        parser.add_argument('exam_id', type=int)
+        parser.add_argument(
+            '--include-open', action='store_true',
+            help="Also grade attempts that have not been completed yet.",
+        )
+        parser.add_argument('--batch-size', type=int, default=GRADING_BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        try:
+            exam = Exam.objects.get(pk=options['exam_id'])
+        except Exam.DoesNotExist:
+            raise CommandError(f"Exam {options['exam_id']} does not exist.")
+
+        graded = grade_exam(
+            exam,
+            completed_only=not options['include_open'],
+            batch_size=options['batch_size'],
+        )
+        self.stdout.write(self.style.SUCCESS(f"Graded {graded} attempts for exam {exam.pk}."))
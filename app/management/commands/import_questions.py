@@ -0,0 +1,47 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from app.models import Exam
+from app.question_import import IMPORT_BATCH_SIZE, QuestionImporter, read_rows
+
+
+class Command(BaseCommand):
+    help = (
+        "Bulk import questions into an exam from a JSONL or CSV file with columns "
+        "text, option_a, option_b, option_c, option_d, correct_option."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('exam_id', type=int)
+        parser.add_argument('path')
+        parser.add_argument('--format', choices=['csv', 'jsonl'], help="Defaults to the file extension.")
+        parser.add_argument('--batch-size', type=int, default=IMPORT_BATCH_SIZE, help="Rows per transaction.")
+
+    def handle(self, *args, **options):
+        exam = Exam.objects.filter(pk=options['exam_id']).first()
+        if exam is None:
+            raise CommandError(f"Exam {options['exam_id']} does not exist.")
+        fmt = options['format'] or ('csv' if options['path'].endswith('.csv') else 'jsonl')
+        started = time.perf_counter()
+
+        def report(stats):
+            rate = stats["rows"] / max(time.perf_counter() - started, 1e-9)
+            self.stdout.write(
+                f"rows {stats['rows']}  created {stats['created']}  duplicates {stats['duplicates']}  "
+                f"errors {len(stats['errors'])}  ({rate:.0f} rows/s)"
+            )
+
+        importer = QuestionImporter(exam, batch_size=options['batch_size'], report=report)
+        try:
+            with open(options['path'], newline='', encoding='utf-8') as handle:
+                stats = importer.run(read_rows(handle, fmt))
+        except OSError as exc:
+            raise CommandError(str(exc))
+
+        for line, message in stats["errors"]:
+            self.stderr.write(f"row {line}: {message}")
+        self.stdout.write(self.style.SUCCESS(
+            f"Imported {stats['created']} questions, skipped {stats['duplicates']} duplicates "
+            f"and {len(stats['errors'])} invalid rows of {stats['rows']}."
+        ))
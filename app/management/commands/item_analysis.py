@@ -0,0 +1,34 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from app.item_analysis import get_item_analysis
+from app.models import Exam
+
+
+class Command(BaseCommand):
+    help = "Print difficulty, point-biserial discrimination and distractor shares per question of an exam."
+
+    def add_arguments(self, parser):
+        parser.add_argument('exam_id', type=int)
+        parser.add_argument('--json', action='store_true', help="Emit one JSON object per question.")
+
+    def handle(self, *args, **options):
+        if not Exam.objects.filter(pk=options['exam_id']).exists():
+            raise CommandError(f"Exam {options['exam_id']} does not exist.")
+
+        analysis = get_item_analysis(options['exam_id'])
+        rows = analysis.summary()
+        if options['json']:
+            for row in rows:
+                self.stdout.write(json.dumps(row))
+            return
+
+        self.stdout.write(f"{analysis.attempts} completed attempts")
+        self.stdout.write(f"{'question':>10} {'key':>3} {'p':>6} {'r_pb':>6}    A      B      C      D    blank")
+        for row in rows:
+            choices = "  ".join(f"{row['choices'][option]:5.3f}" for option in ('A', 'B', 'C', 'D', 'blank'))
+            self.stdout.write(
+                f"{row['question']:>10} {row['correct_option'] or '-':>3} "
+                f"{row['difficulty']:6.3f} {row['discrimination']:6.3f}  {choices}"
+            )
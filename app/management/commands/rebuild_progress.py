@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from app.progress import PROGRESS_BATCH_SIZE, rebuild_progress
+
+
+class Command(BaseCommand):
+    help = "Recompute every user's per-series progress rows from their attempts, in streaming batches."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=PROGRESS_BATCH_SIZE, help="Purchases per transaction.")
+
+    def handle(self, *args, **options):
+        processed = rebuild_progress(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt progress for {processed} purchases."))
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from app.search import INDEX_BATCH_SIZE, rebuild_index
+
+
+class Command(BaseCommand):
+    help = "Rebuild the question full-text index and recompute every near-duplicate signature."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=INDEX_BATCH_SIZE, help="Questions per signature batch.")
+
+    def handle(self, *args, **options):
+        indexed = rebuild_index(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f"Indexed {indexed} questions."))
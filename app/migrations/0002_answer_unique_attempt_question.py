@@ -0,0 +1,17 @@
+# Generated by Django 5.2.4 on 2026-10-18 03:25
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AlterUniqueTogether(
+            name='answer',
+            unique_together={('attempt', 'question')},
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.4 on 2026-10-18 03:35
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0002_answer_unique_attempt_question'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='exam',
+            name='paper_version',
+            field=models.PositiveIntegerField(default=1, editable=False, help_text='Bumped whenever the exam or its questions change; versions paper snapshots'),
+        ),
+    ]
@@ -0,0 +1,38 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+def backfill_deadlines(apps, schema_editor):
+    ExamAttempt = apps.get_model('app', 'ExamAttempt')
+    open_attempts = ExamAttempt.objects.filter(completed_at__isnull=True).select_related('exam')
+    batch = []
+    for attempt in open_attempts.iterator(chunk_size=2000):
+        attempt.deadline = attempt.started_at + timedelta(minutes=attempt.exam.duration_minutes)
+        batch.append(attempt)
+        if len(batch) == 2000:
+            ExamAttempt.objects.bulk_update(batch, ['deadline'])
+            batch = []
+    ExamAttempt.objects.bulk_update(batch, ['deadline'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0003_exam_paper_version'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='examattempt',
+            name='deadline',
+            field=models.DateTimeField(blank=True, editable=False, help_text="When the exam's time runs out; open attempts past it are auto-submitted", null=True),
+        ),
+        migrations.AddIndex(
+            model_name='examattempt',
+            index=models.Index(condition=models.Q(('completed_at__isnull', True)), fields=['deadline'], name='attempt_open_deadline_idx'),
+        ),
+        migrations.RunPython(backfill_deadlines, migrations.RunPython.noop),
+    ]
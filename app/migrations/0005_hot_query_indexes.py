@@ -0,0 +1,31 @@
+# Generated by Django 5.2.4 on 2026-10-18 03:59
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0004_examattempt_deadline'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='exam',
+            index=models.Index(condition=models.Q(('is_published', True)), fields=['scheduled_at'], name='exam_published_schedule_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='exam',
+            index=models.Index(condition=models.Q(('is_live', True)), fields=['scheduled_at'], name='exam_live_schedule_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='examattempt',
+            index=models.Index(fields=['user', 'exam'], name='attempt_user_exam_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='examattempt',
+            index=models.Index(fields=['exam', 'completed_at'], name='attempt_exam_completed_idx'),
+        ),
+    ]
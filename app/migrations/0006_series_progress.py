@@ -0,0 +1,32 @@
+# Generated by Django 5.2.4 on 2026-10-18 04:01
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0005_hot_query_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SeriesProgress',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('exams_attempted', models.PositiveIntegerField(default=0)),
+                ('attempts_completed', models.PositiveIntegerField(default=0)),
+                ('best_score', models.FloatField(blank=True, null=True)),
+                ('average_score', models.FloatField(blank=True, null=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('test_series', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='progress', to='app.testseries')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='series_progress', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'unique_together': {('user', 'test_series')},
+            },
+        ),
+    ]
@@ -0,0 +1,137 @@
+import hashlib
+import re
+import zlib
+
+import django.db.models.deletion
+import numpy as np
+from django.db import migrations, models
+
+FTS_COLUMNS = 'text, option_a, option_b, option_c, option_d'
+NEW_VALUES = 'new.id, new.text, new.option_a, new.option_b, new.option_c, new.option_d'
+OLD_VALUES = "'delete', old.id, old.text, old.option_a, old.option_b, old.option_c, old.option_d"
+
+# External content FTS5 table over app_question; the triggers keep it in step with every write, ORM or not.
+CREATE_FTS = [
+    f"CREATE VIRTUAL TABLE app_question_fts USING fts5({FTS_COLUMNS}, content='app_question', content_rowid='id', "
+    "tokenize='unicode61 remove_diacritics 2')",
+    f"CREATE TRIGGER app_question_fts_insert AFTER INSERT ON app_question BEGIN "
+    f"INSERT INTO app_question_fts(rowid, {FTS_COLUMNS}) VALUES ({NEW_VALUES}); END",
+    f"CREATE TRIGGER app_question_fts_delete AFTER DELETE ON app_question BEGIN "
+    f"INSERT INTO app_question_fts(app_question_fts, rowid, {FTS_COLUMNS}) VALUES ({OLD_VALUES}); END",
+    f"CREATE TRIGGER app_question_fts_update AFTER UPDATE OF {FTS_COLUMNS} ON app_question BEGIN "
+    f"INSERT INTO app_question_fts(app_question_fts, rowid, {FTS_COLUMNS}) VALUES ({OLD_VALUES}); "
+    f"INSERT INTO app_question_fts(rowid, {FTS_COLUMNS}) VALUES ({NEW_VALUES}); END",
+    "INSERT INTO app_question_fts(app_question_fts) VALUES ('rebuild')",
+]
+DROP_FTS = [
+    "DROP TRIGGER IF EXISTS app_question_fts_update",
+    "DROP TRIGGER IF EXISTS app_question_fts_delete",
+    "DROP TRIGGER IF EXISTS app_question_fts_insert",
+    "DROP TABLE IF EXISTS app_question_fts",
+]
+
+
+def create_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    for statement in CREATE_FTS:
+        schema_editor.execute(statement)
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    for statement in DROP_FTS:
+        schema_editor.execute(statement)
+
+
+# A frozen copy of app.search's MinHash as of this migration, so later changes to
+# that module cannot change or break it. Keep both in step only by a new migration.
+SHINGLE_SIZE = 3
+MINHASH_PERMUTATIONS = 32
+MINHASH_BANDS = 8
+_WORD = re.compile(r'\w+')
+_permutations = np.random.default_rng(20240607)
+_MULTIPLIERS = _permutations.integers(0, 2 ** 64, MINHASH_PERMUTATIONS, dtype=np.uint64, endpoint=False)
+_OFFSETS = _permutations.integers(0, 2 ** 64, MINHASH_PERMUTATIONS, dtype=np.uint64, endpoint=False)
+_EMPTY_SIGNATURE = np.full(MINHASH_PERMUTATIONS, 2 ** 32 - 1, dtype=np.uint32)
+
+
+def shingles(text, options):
+    shingled = set()
+    for value in (text, *options):
+        words = _WORD.findall(value.casefold())
+        if len(words) < SHINGLE_SIZE:
+            shingled.add(' '.join(words))
+        else:
+            shingled.update(' '.join(words[i:i + SHINGLE_SIZE]) for i in range(len(words) - SHINGLE_SIZE + 1))
+    shingled.discard('')
+    return shingled
+
+
+def minhash(text, options):
+    shingled = shingles(text, options)
+    if not shingled:
+        return _EMPTY_SIGNATURE
+    hashes = np.fromiter((zlib.crc32(shingle.encode('utf-8')) for shingle in shingled), dtype=np.uint64)
+    permuted = (hashes[:, None] * _MULTIPLIERS + _OFFSETS) >> np.uint64(32)
+    return permuted.min(axis=0).astype(np.uint32)
+
+
+def band_buckets(signature):
+    rows = MINHASH_PERMUTATIONS // MINHASH_BANDS
+    return [
+        int.from_bytes(
+            hashlib.blake2b(bytes([band]) + signature[band * rows:(band + 1) * rows].tobytes(), digest_size=8).digest(),
+            'big', signed=True,
+        )
+        for band in range(MINHASH_BANDS)
+    ]
+
+
+def backfill_signatures(apps, schema_editor):
+    Question = apps.get_model('app', 'Question')
+    QuestionSignature = apps.get_model('app', 'QuestionSignature')
+    QuestionBand = apps.get_model('app', 'QuestionBand')
+    rows = Question.objects.order_by('pk').values_list('pk', 'text', 'option_a', 'option_b', 'option_c', 'option_d')
+    signatures, bands = [], []
+    for pk, text, *options in rows.iterator(chunk_size=2000):
+        signature = minhash(text, options)
+        signatures.append(QuestionSignature(question_id=pk, minhash=signature.tobytes()))
+        bands.extend(QuestionBand(question_id=pk, bucket=bucket) for bucket in band_buckets(signature))
+        if len(signatures) == 2000:
+            QuestionSignature.objects.bulk_create(signatures)
+            QuestionBand.objects.bulk_create(bands)
+            signatures, bands = [], []
+    QuestionSignature.objects.bulk_create(signatures)
+    QuestionBand.objects.bulk_create(bands)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0006_series_progress'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='QuestionSignature',
+            fields=[
+                ('question', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='signature', serialize=False, to='app.question')),
+                ('minhash', models.BinaryField()),
+            ],
+        ),
+        migrations.CreateModel(
+            name='QuestionBand',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('bucket', models.BigIntegerField()),
+                ('question', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='bands', to='app.question')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['bucket', 'question'], name='question_band_bucket_idx')],
+            },
+        ),
+        migrations.RunPython(create_search_index, drop_search_index),
+        migrations.RunPython(backfill_signatures, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,28 @@
+from django.db import migrations, models
+
+
+def mark_completed_graded(apps, schema_editor):
+    # Attempts completed before grading was tracked were graded when they closed.
+    ExamAttempt = apps.get_model('app', 'ExamAttempt')
+    ExamAttempt.objects.filter(completed_at__isnull=False).update(graded_at=models.F('completed_at'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0007_question_search'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='examattempt',
+            name='graded_at',
+            field=models.DateTimeField(blank=True, editable=False, help_text='When the score was last computed; completed attempts without one are graded by the auto-submit sweep', null=True),
+        ),
+        # Backfilled before the index exists, so it is only ever built over ungraded rows.
+        migrations.RunPython(mark_completed_graded, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='examattempt',
+            index=models.Index(condition=models.Q(('completed_at__isnull', False), ('graded_at__isnull', True)), fields=['completed_at'], name='attempt_ungraded_idx'),
+        ),
+    ]
@@ -1,8 +1,47 @@
 from django.db import models
+from django.db.models import Case, F, Q, Value, When
+from django.db.models.functions import Cast, Greatest, Round
 from django.contrib.auth import get_user_model
 
 User = get_user_model()
 
+PRICE_SCALE = 10 ** 6  # effective prices are computed exactly in millionths of a unit
+
+
+class TestSeriesQuerySet(models.QuerySet):
+    def discount_active_q(self, now=None):
+        """Q matching series whose discount applies at `now`, as in get_discounted_price()."""
+        from django.utils import timezone
+        now = now or timezone.now()
+        return (
+            Q(discount_type__isnull=False) & ~Q(discount_type='')
+            & Q(discount_value__isnull=False) & ~Q(discount_value=0)
+            & Q(discount_start__lte=now, discount_end__gte=now)
+        )
+
+    def with_effective_price(self, now=None):
+        """
+        Annotate `effective_price`, the SQL equivalent of get_discounted_price().
+
+        Price and discount are rounded to integer cents and the result is computed
+        in integer millionths, which is exact for every value the two DecimalFields
+        can hold, so filtering and ordering agree with the Python method.
+        """
+        price = Cast(Round(F('price') * 100), models.BigIntegerField())
+        value = Cast(Round(F('discount_value') * 100), models.BigIntegerField())
+        active = self.discount_active_q(now)
+        micros = Case(
+            When(active & Q(discount_type='percent'), then=Greatest(price * 10000 - price * value, Value(0))),
+            When(active & Q(discount_type='fixed'), then=Greatest((price - value) * 10000, Value(0))),
+            default=price * 10000,
+            output_field=models.BigIntegerField(),
+        )
+        return self.annotate(effective_price=Cast(
+            micros / Value(float(PRICE_SCALE)),
+            models.DecimalField(max_digits=14, decimal_places=6),
+        ))
+
+
 class TestSeries(models.Model):
     creator = models.ForeignKey(User, on_delete=models.CASCADE, related_name='test_series')
     title = models.CharField(max_length=255)
@@ -31,6 +70,8 @@ class TestSeries(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    objects = TestSeriesQuerySet.as_manager()
+
     def get_discounted_price(self):
         from django.utils import timezone
         now = timezone.now()
@@ -53,6 +94,20 @@ class TestSeries(models.Model):
         return self.title
 
 
+class ExamQuerySet(models.QuerySet):
+    def published(self):
+        return self.filter(is_published=True)
+
+    def upcoming(self, now=None):
+        """Published exams scheduled from `now` on, soonest first. Served by exam_published_schedule_idx."""
+        from django.utils import timezone
+        return self.published().filter(scheduled_at__gte=now or timezone.now()).order_by('scheduled_at')
+
+    def live(self):
+        """Exams currently running, by start time. Served by exam_live_schedule_idx."""
+        return self.filter(is_live=True).order_by('scheduled_at')
+
+
 class Exam(models.Model):
     test_series = models.ForeignKey(TestSeries, on_delete=models.CASCADE, related_name='exams')
     title = models.CharField(max_length=255)
@@ -64,6 +119,11 @@ class Exam(models.Model):
 
     # Publishing control
     is_published = models.BooleanField(default=False)
+    paper_version = models.PositiveIntegerField(
+        default=1,
+        editable=False,
+        help_text="Bumped whenever the exam or its questions change; versions paper snapshots"
+    )
 
     # Negative marking
     negative_marking = models.BooleanField(default=False)
@@ -75,6 +135,15 @@ class Exam(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    objects = ExamQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            # Partial: only the published (or live) exams are indexed, by schedule.
+            models.Index(fields=['scheduled_at'], condition=Q(is_published=True), name='exam_published_schedule_idx'),
+            models.Index(fields=['scheduled_at'], condition=Q(is_live=True), name='exam_live_schedule_idx'),
+        ]
+
     def __str__(self):
         return f"{self.title} - {self.test_series.title}"
 
@@ -106,12 +175,69 @@ class Purchase(models.Model):
     class Meta:
         unique_together = ('user', 'test_series')
 
+class ExamAttemptQuerySet(models.QuerySet):
+    def fill_deadlines(self, attempts):
+        """
+        Set the deadline of unsaved attempts that have none from their exam's duration.
+
+        Exams already loaded on an attempt are used as they are; the durations of
+        the others are read with one query for the whole batch.
+        """
+        from datetime import timedelta
+
+        from django.utils import timezone
+        missing = [attempt for attempt in attempts if attempt.deadline is None]
+        unloaded = {attempt.exam_id for attempt in missing if not ExamAttempt.exam.is_cached(attempt)}
+        durations = dict(Exam.objects.filter(pk__in=unloaded).values_list('pk', 'duration_minutes')) if unloaded else {}
+        now = timezone.now()
+        for attempt in missing:
+            if ExamAttempt.exam.is_cached(attempt):
+                minutes = attempt.exam.duration_minutes
+            else:
+                minutes = durations[attempt.exam_id]
+            attempt.deadline = (attempt.started_at or now) + timedelta(minutes=minutes)
+        return attempts
+
+    def bulk_create(self, objs, *args, **kwargs):
+        # No signals run here, so deadlines are filled in as save() does through pre_save.
+        return super().bulk_create(self.fill_deadlines(list(objs)), *args, **kwargs)
+
+
 class ExamAttempt(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE)
     exam = models.ForeignKey(Exam, on_delete=models.CASCADE)
     started_at = models.DateTimeField(auto_now_add=True)
     completed_at = models.DateTimeField(null=True, blank=True)
+    deadline = models.DateTimeField(
+        null=True,
+        blank=True,
+        editable=False,
+        help_text="When the exam's time runs out; open attempts past it are auto-submitted"
+    )
     score = models.FloatField(default=0.0)
+    graded_at = models.DateTimeField(
+        null=True,
+        blank=True,
+        editable=False,
+        help_text="When the score was last computed; completed attempts without one are graded by the auto-submit sweep"
+    )
+
+    objects = ExamAttemptQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            # A user's attempts at an exam; the leading user column also serves their history.
+            models.Index(fields=['user', 'exam'], name='attempt_user_exam_idx'),
+            # An exam's completed attempts in completion order: leaderboards, grading, item analysis.
+            models.Index(fields=['exam', 'completed_at'], name='attempt_exam_completed_idx'),
+            # Only open attempts are indexed, so the auto-submit scan stays small.
+            models.Index(fields=['deadline'], condition=Q(completed_at__isnull=True), name='attempt_open_deadline_idx'),
+            # Completed attempts still waiting for a score, for the sweep that grades them.
+            models.Index(
+                fields=['completed_at'], condition=Q(completed_at__isnull=False, graded_at__isnull=True),
+                name='attempt_ungraded_idx',
+            ),
+        ]
 
 class Answer(models.Model):
     attempt = models.ForeignKey(ExamAttempt, on_delete=models.CASCADE, related_name='answers')
@@ -119,3 +245,41 @@ class Answer(models.Model):
     selected_option = models.CharField(max_length=1, choices=Question.OPTION_CHOICES)
     is_correct = models.BooleanField(default=False)
 
+    class Meta:
+        unique_together = ('attempt', 'question')  # One answer per question; lets submissions upsert
+
+
+
+class SeriesProgress(models.Model):
+    """
+    Materialized dashboard row: one per purchase, summarizing the buyer's completed attempts in the series.
+
+    Kept current by app.progress when attempts are graded; rebuilt with `manage.py rebuild_progress`.
+    """
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='series_progress')
+    test_series = models.ForeignKey(TestSeries, on_delete=models.CASCADE, related_name='progress')
+    exams_attempted = models.PositiveIntegerField(default=0)
+    attempts_completed = models.PositiveIntegerField(default=0)
+    best_score = models.FloatField(null=True, blank=True)
+    average_score = models.FloatField(null=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        unique_together = ('user', 'test_series')  # Also the index the dashboard reads by user
+
+
+class QuestionSignature(models.Model):
+    """MinHash signature of a question's text and options, for near-duplicate detection (app.search)."""
+    question = models.OneToOneField(Question, on_delete=models.CASCADE, primary_key=True, related_name='signature')
+    minhash = models.BinaryField()
+
+
+class QuestionBand(models.Model):
+    """One locality-sensitive hashing band of a signature; questions sharing a bucket are duplicate candidates."""
+    question = models.ForeignKey(Question, on_delete=models.CASCADE, related_name='bands')
+    bucket = models.BigIntegerField()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['bucket', 'question'], name='question_band_bucket_idx'),
+        ]
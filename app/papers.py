@@ -0,0 +1,191 @@
+import gzip
+import hashlib
+import json
+import os
+import time
+from threading import Lock
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.db.models import F
+
+from .models import Exam, Question
+
+PAPER_CACHE_TIMEOUT = getattr(settings, 'EXAM_PAPER_CACHE_TIMEOUT', 24 * 60 * 60)
+PAPER_SNAPSHOT_DIR = getattr(settings, 'EXAM_PAPER_SNAPSHOT_DIR', None)
+PAPER_BUILD_LOCK_TIMEOUT = 30
+PAPER_BUILD_WAIT = 10
+
+PAPER_EXAM_FIELDS = (
+    'id', 'title', 'description', 'duration_minutes', 'scheduled_at',
+    'marks', 'negative_marking', 'negative_marks_per_question',
+)
+PAPER_QUESTION_FIELDS = ('id', 'text', 'option_a', 'option_b', 'option_c', 'option_d')
+META_FIELDS = ('paper_version', 'is_published', 'scheduled_at')
+
+
+class PaperSnapshot:
+    """An immutable, gzip-compressed rendering of one version of an exam paper."""
+
+    __slots__ = ('exam_id', 'version', 'etag', 'body')
+
+    def __init__(self, exam_id, version, etag, body):
+        self.exam_id = exam_id
+        self.version = version
+        self.etag = etag
+        self.body = body
+
+    def __getstate__(self):
+        return (self.exam_id, self.version, self.etag, self.body)
+
+    def __setstate__(self, state):
+        self.exam_id, self.version, self.etag, self.body = state
+
+    def json(self):
+        return gzip.decompress(self.body)
+
+
+def _meta_key(exam_id):
+    return f"paper_meta:{exam_id}"
+
+
+def _snapshot_key(exam_id, version):
+    return f"paper:{exam_id}:{version}"
+
+
+def get_paper_meta(exam_id):
+    """Return the exam's {paper_version, is_published, scheduled_at}, or None if it does not exist."""
+    meta = cache.get(_meta_key(exam_id))
+    if meta is None:
+        meta = Exam.objects.filter(pk=exam_id).values(*META_FIELDS).first()
+        if meta is None:
+            return None
+        cache.set(_meta_key(exam_id), meta, PAPER_CACHE_TIMEOUT)
+    return meta
+
+
+def bump_paper_version(exam_id):
+    """Give the exam a new paper version, so the next request builds a fresh snapshot."""
+    Exam.objects.filter(pk=exam_id).update(paper_version=F('paper_version') + 1)
+    forget_paper_meta(exam_id)
+
+
+def forget_paper_meta(exam_id):
+    """
+    Drop the exam's cached meta, now and again once the transaction commits.
+
+    The second delete drops meta another process cached from the row as it was
+    before the commit.
+    """
+    cache.delete(_meta_key(exam_id))
+    transaction.on_commit(lambda: cache.delete(_meta_key(exam_id)))
+
+
+def render_paper(exam_id):
+    """
+    Serialize the paper without answers and return (version, json bytes).
+
+    Reads stay on the primary, which holds the version the caller asked for; a
+    lagging replica could return an older one.
+    """
+    exam = Exam.objects.values(*PAPER_EXAM_FIELDS, 'paper_version').get(pk=exam_id)
+    exam['questions'] = list(
+        Question.objects.filter(exam_id=exam_id).order_by('pk').values(*PAPER_QUESTION_FIELDS)
+    )
+    version = exam.pop('paper_version')
+    data = json.dumps(exam, cls=DjangoJSONEncoder, ensure_ascii=False, separators=(',', ':'))
+    return version, data.encode('utf-8')
+
+
+def build_snapshot(exam_id, version=None):
+    """
+    Render and store a snapshot of the paper, under `version` when given.
+
+    The database may already hold a newer version than the one requested; the
+    newer paper is then stored under the requested version, which is what the
+    callers waiting on that version look for.
+    """
+    rendered, data = render_paper(exam_id)
+    version = rendered if version is None else version
+    etag = f'"{exam_id}-{version}-{hashlib.sha256(data).hexdigest()[:16]}"'
+    snapshot = PaperSnapshot(exam_id, version, etag, gzip.compress(data, mtime=0))
+    _store(snapshot)
+    return snapshot
+
+
+def _disk_path(exam_id, version):
+    return os.path.join(PAPER_SNAPSHOT_DIR, f"exam-{exam_id}-v{version}.json.gz")
+
+
+def _store(snapshot):
+    cache.set(_snapshot_key(snapshot.exam_id, snapshot.version), snapshot, PAPER_CACHE_TIMEOUT)
+    if PAPER_SNAPSHOT_DIR:
+        os.makedirs(PAPER_SNAPSHOT_DIR, exist_ok=True)
+        path = _disk_path(snapshot.exam_id, snapshot.version)
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, 'wb') as handle:
+            handle.write(snapshot.etag.encode('ascii') + b'\n' + snapshot.body)
+        os.replace(tmp, path)
+
+
+def _load(exam_id, version):
+    snapshot = cache.get(_snapshot_key(exam_id, version))
+    if snapshot is None and PAPER_SNAPSHOT_DIR:
+        try:
+            with open(_disk_path(exam_id, version), 'rb') as handle:
+                etag, body = handle.read().split(b'\n', 1)
+        except FileNotFoundError:
+            return None
+        snapshot = PaperSnapshot(exam_id, version, etag.decode('ascii'), body)
+        cache.set(_snapshot_key(exam_id, version), snapshot, PAPER_CACHE_TIMEOUT)
+    return snapshot
+
+
+# One lock per (exam, version) being built, so a cold build only holds up requests for the same paper.
+_build_locks = {}
+_build_locks_guard = Lock()
+
+
+def _build_lock(exam_id, version):
+    with _build_locks_guard:
+        return _build_locks.setdefault((exam_id, version), Lock())
+
+
+def get_snapshot(exam_id, version):
+    """
+    Return the snapshot of `version`, building it if needed.
+
+    Cold builds are coalesced: within a process a per-version lock lets one thread
+    build, and across processes a cache.add() lock does the same. Threads that lose
+    the cross-process race poll for the result without holding any lock, and build
+    themselves only if the holder does not finish in time.
+    """
+    snapshot = _load(exam_id, version)
+    if snapshot is not None:
+        return snapshot
+
+    lock_key = f"paper_build:{exam_id}:{version}"
+    try:
+        with _build_lock(exam_id, version):
+            snapshot = _load(exam_id, version)
+            if snapshot is not None:
+                return snapshot
+            if cache.add(lock_key, 1, PAPER_BUILD_LOCK_TIMEOUT):
+                try:
+                    return build_snapshot(exam_id, version)
+                finally:
+                    cache.delete(lock_key)
+    finally:
+        # Threads already waiting keep their reference; later ones find the snapshot.
+        with _build_locks_guard:
+            _build_locks.pop((exam_id, version), None)
+
+    deadline = time.monotonic() + PAPER_BUILD_WAIT
+    while time.monotonic() < deadline:
+        time.sleep(0.05)
+        snapshot = _load(exam_id, version)
+        if snapshot is not None:
+            return snapshot
+    return build_snapshot(exam_id, version)
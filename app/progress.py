@@ -0,0 +1,171 @@
+from django.db import transaction
+from django.db.models import Avg, Count, Exists, Max, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from .entitlements import get_exam_series
+from .models import Exam, ExamAttempt, Purchase, SeriesProgress
+
+PROGRESS_BATCH_SIZE = 500
+PROGRESS_FIELDS = ('exams_attempted', 'attempts_completed', 'best_score', 'average_score')
+EMPTY_PROGRESS = {'exams_attempted': 0, 'attempts_completed': 0, 'best_score': None, 'average_score': None}
+
+
+def aggregate_progress(pairs):
+    """
+    Return {(user_id, series_id): progress fields} over the completed attempts of `pairs`.
+
+    One grouped query over the users' attempts (attempt_user_exam_idx); pairs
+    without a completed attempt are absent.
+    """
+    pairs = set(pairs)
+    if not pairs:
+        return {}
+    rows = (
+        ExamAttempt.objects
+        .filter(
+            completed_at__isnull=False,
+            user_id__in={user_id for user_id, _series_id in pairs},
+            exam__test_series_id__in={series_id for _user_id, series_id in pairs},
+        )
+        .values('user_id', 'exam__test_series_id')
+        .annotate(
+            exams_attempted=Count('exam_id', distinct=True),
+            attempts_completed=Count('pk'),
+            best_score=Max('score'),
+            average_score=Avg('score'),
+        )
+    )
+    progress = {}
+    for row in rows:
+        pair = (row.pop('user_id'), row.pop('exam__test_series_id'))
+        if pair in pairs:
+            progress[pair] = row
+    return progress
+
+
+def refresh_progress(pairs):
+    """
+    Re-aggregate the progress rows of the given (user_id, series_id) pairs and return how many changed.
+
+    Only pairs with a row, that is with a purchase, are written. Rows are
+    recomputed from the user's attempts rather than adjusted, so regrades that
+    lower a score stay correct.
+    """
+    pairs = set(pairs)
+    if not pairs:
+        return 0
+    rows = [
+        row for row in SeriesProgress.objects.filter(
+            user_id__in={user_id for user_id, _series_id in pairs},
+            test_series_id__in={series_id for _user_id, series_id in pairs},
+        )
+        if (row.user_id, row.test_series_id) in pairs
+    ]
+    progress = aggregate_progress((row.user_id, row.test_series_id) for row in rows)
+    now = timezone.now()
+    changed = []
+    for row in rows:
+        values = progress.get((row.user_id, row.test_series_id), EMPTY_PROGRESS)
+        if any(getattr(row, field) != values[field] for field in PROGRESS_FIELDS):
+            for field in PROGRESS_FIELDS:
+                setattr(row, field, values[field])
+            row.updated_at = now
+            changed.append(row)
+    SeriesProgress.objects.bulk_update(changed, [*PROGRESS_FIELDS, 'updated_at'])
+    return len(changed)
+
+
+def record_attempts(attempts):
+    """Refresh progress after grading; `attempts` are (user_id, exam_id) pairs."""
+    pairs = set()
+    for user_id, exam_id in attempts:
+        series_id, _creator_id = get_exam_series(exam_id) or (None, None)
+        if series_id is not None:
+            pairs.add((user_id, series_id))
+    return refresh_progress(pairs)
+
+
+def start_progress(user_id, series_id):
+    """Create the progress row of a new purchase, counting any attempts made before it."""
+    SeriesProgress.objects.bulk_create([SeriesProgress(user_id=user_id, test_series_id=series_id)], ignore_conflicts=True)
+    refresh_progress([(user_id, series_id)])
+
+
+def rebuild_progress(batch_size=PROGRESS_BATCH_SIZE):
+    """
+    Recompute every progress row from scratch and return how many purchases were processed.
+
+    Purchases are streamed in batches; each batch is aggregated with one grouped
+    query and upserted in its own transaction. Rows left without a purchase are
+    removed at the end.
+    """
+    purchases = Purchase.objects.order_by('pk').values_list('user_id', 'test_series_id')
+    processed = 0
+    batch = []
+    for pair in purchases.iterator(chunk_size=batch_size):
+        batch.append(pair)
+        if len(batch) == batch_size:
+            processed += _rebuild_batch(batch)
+            batch = []
+    if batch:
+        processed += _rebuild_batch(batch)
+    SeriesProgress.objects.filter(~Exists(
+        Purchase.objects.filter(user_id=OuterRef('user_id'), test_series_id=OuterRef('test_series_id')),
+    )).delete()
+    return processed
+
+
+def _rebuild_batch(pairs):
+    progress = aggregate_progress(pairs)
+    rows = [
+        SeriesProgress(user_id=user_id, test_series_id=series_id, **progress.get((user_id, series_id), EMPTY_PROGRESS))
+        for user_id, series_id in pairs
+    ]
+    with transaction.atomic():
+        SeriesProgress.objects.bulk_create(
+            rows, update_conflicts=True, unique_fields=['user', 'test_series'],
+            update_fields=[*PROGRESS_FIELDS, 'updated_at'],
+        )
+    return len(rows)
+
+
+def _dashboard_rows():
+    exam_count = (
+        Exam.objects.filter(test_series_id=OuterRef('test_series_id'))
+        .order_by().values('test_series_id').annotate(total=Count('pk')).values('total')
+    )
+    return (
+        SeriesProgress.objects
+        .annotate(exams_total=Coalesce(Subquery(exam_count), 0))
+        .order_by('test_series_id')
+        .values('test_series_id', 'test_series__title', 'exams_total', *PROGRESS_FIELDS)
+    )
+
+
+# Built once: resolving the annotation and values() costs more than running the query.
+DASHBOARD_ROWS = _dashboard_rows()
+
+
+def dashboard(user_id):
+    """
+    Return the user's progress in every purchased series, in one query.
+
+    The query reads the user's rows through the (user, test_series) unique
+    index; the series' exam count comes from a correlated count on the exam's
+    test_series index.
+    """
+    rows = DASHBOARD_ROWS.filter(user_id=user_id)
+    return [
+        {
+            'test_series': row['test_series_id'],
+            'title': row['test_series__title'],
+            'exams_total': row['exams_total'],
+            'exams_attempted': row['exams_attempted'],
+            'attempts_completed': row['attempts_completed'],
+            'best_score': row['best_score'],
+            'average_score': row['average_score'],
+            'completion': round(100 * row['exams_attempted'] / row['exams_total'], 1) if row['exams_total'] else 0.0,
+        }
+        for row in rows
+    ]
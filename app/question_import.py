@@ -0,0 +1,123 @@
+import csv
+import hashlib
+import json
+from itertools import islice
+
+from django.db import transaction
+
+from .answer_keys import OPTIONS, invalidate_answer_key
+from .models import Question
+from .papers import bump_paper_version
+from .search import index_questions
+
+IMPORT_BATCH_SIZE = 500
+OPTION_FIELDS = ('option_a', 'option_b', 'option_c', 'option_d')
+MAX_LENGTHS = {name: Question._meta.get_field(name).max_length for name in OPTION_FIELDS}
+
+
+def read_rows(lines, fmt='jsonl'):
+    """
+    Yield dict rows from an iterable of text lines, CSV (with a header line) or JSONL.
+
+    A JSONL line that is not a JSON object yields None, so it is reported as a row error.
+    """
+    if fmt == 'csv':
+        yield from csv.DictReader(lines)
+        return
+    for line in lines:
+        if line.strip():
+            try:
+                row = json.loads(line)
+            except ValueError:
+                row = None
+            yield row if isinstance(row, dict) else None
+
+
+def content_hash(text, options):
+    """Hash of a question's text and options, ignoring case and runs of whitespace."""
+    normalized = '\x1f'.join(' '.join(value.split()).casefold() for value in (text, *options))
+    return hashlib.sha1(normalized.encode('utf-8')).digest()
+
+
+def clean_row(row):
+    """Return (fields, errors) for one row; fields is None when the row is invalid."""
+    if row is None:
+        return None, ["not a JSON object"]
+    errors = []
+    text = str(row.get('text') or '').strip()
+    if not text:
+        errors.append("text is required")
+    fields = {'text': text}
+    for name in OPTION_FIELDS:
+        value = str(row.get(name) or '').strip()
+        if not value:
+            errors.append(f"{name} is required")
+        elif len(value) > MAX_LENGTHS[name]:
+            errors.append(f"{name} is longer than {MAX_LENGTHS[name]} characters")
+        fields[name] = value
+    correct_option = str(row.get('correct_option') or '').strip().upper()
+    if len(correct_option) != 1 or correct_option not in OPTIONS:
+        errors.append(f"correct_option must be one of {', '.join(OPTIONS)}")
+    fields['correct_option'] = correct_option
+    return (None, errors) if errors else (fields, errors)
+
+
+class QuestionImporter:
+    """
+    Streams question rows into one exam in batches.
+
+    Each batch is validated row by row, checked against the exam's existing
+    questions by content hash and inserted with one bulk_create in its own
+    transaction, together with the questions' near-duplicate signatures. Invalid
+    rows are reported by line number and skipped. Because bulk_create sends no
+    signals, the exam's answer key and paper version are refreshed once at the end.
+    """
+
+    def __init__(self, exam, batch_size=IMPORT_BATCH_SIZE, report=None):
+        self.exam = exam
+        self.batch_size = batch_size
+        self.report = report or (lambda stats: None)
+        self.stats = {"rows": 0, "created": 0, "duplicates": 0, "errors": []}
+        self._hashes = None
+
+    def existing_hashes(self):
+        rows = Question.objects.filter(exam=self.exam).values_list('text', *OPTION_FIELDS)
+        return {content_hash(text, options) for text, *options in rows.iterator(chunk_size=2000)}
+
+    def run(self, rows):
+        self._hashes = self.existing_hashes()
+        rows = iter(rows)
+        try:
+            while True:
+                batch = list(islice(rows, self.batch_size))
+                if not batch:
+                    break
+                self._import_batch(batch)
+                self.report(self.stats)
+        finally:
+            if self.stats["created"]:
+                invalidate_answer_key(self.exam.pk)
+                bump_paper_version(self.exam.pk)
+        return self.stats
+
+    def _import_batch(self, batch):
+        first_line = self.stats["rows"] + 1
+        self.stats["rows"] += len(batch)
+
+        questions = []
+        for line, row in enumerate(batch, start=first_line):
+            fields, errors = clean_row(row)
+            if errors:
+                self.stats["errors"].append((line, "; ".join(errors)))
+                continue
+            digest = content_hash(fields['text'], [fields[name] for name in OPTION_FIELDS])
+            if digest in self._hashes:
+                self.stats["duplicates"] += 1
+                continue
+            self._hashes.add(digest)
+            questions.append(Question(exam=self.exam, **fields))
+
+        with transaction.atomic():
+            Question.objects.bulk_create(questions, batch_size=self.batch_size)
+            index_questions(questions)
+        self.stats["created"] += len(questions)
@@ -0,0 +1,205 @@
+"""
+Question bank search and near-duplicate detection.
+
+Full-text search runs on `app_question_fts`, an SQLite FTS5 index over the
+question text and options. Triggers on app_question (migration 0007) keep it
+in sync, so bulk_create, update() and raw SQL writes are covered as well.
+
+Near duplicates are found with MinHash signatures over word shingles of the
+normalized text and options. Each signature is split into bands; questions
+sharing a band bucket become candidates, and candidates are ranked by the
+share of equal signature slots, an estimate of their shingle Jaccard
+similarity. Signatures are computed in Python, so they are refreshed by the
+Question signals and by the bulk importer; `manage.py rebuild_question_index`
+recomputes everything after writes that bypass both.
+"""
+
+import hashlib
+import re
+import zlib
+
+import numpy as np
+from django.conf import settings
+from django.db import connection, transaction
+
+from .models import Exam, Question, QuestionBand, QuestionSignature, TestSeries
+
+FTS_TABLE = 'app_question_fts'
+SEARCH_FIELDS = ('text', 'option_a', 'option_b', 'option_c', 'option_d')
+# bm25 column weights: a hit in the question text counts for more than one in an option.
+SEARCH_WEIGHTS = (4.0, 1.0, 1.0, 1.0, 1.0)
+SEARCH_LIMIT = 20
+
+SHINGLE_SIZE = 3
+MINHASH_PERMUTATIONS = 32
+MINHASH_BANDS = 8  # 8 bands of 4 slots: pairs at 0.8 similarity are candidates 98% of the time
+NEAR_DUPLICATE_THRESHOLD = getattr(settings, 'QUESTION_DUPLICATE_THRESHOLD', 0.8)
+INDEX_BATCH_SIZE = 2000  # Questions per rebuild batch
+
+_WORD = re.compile(r'\w+')
+# Fixed seed: stored signatures must stay comparable across processes and releases.
+_permutations = np.random.default_rng(20240607)
+_MULTIPLIERS = _permutations.integers(0, 2 ** 64, MINHASH_PERMUTATIONS, dtype=np.uint64, endpoint=False)
+_OFFSETS = _permutations.integers(0, 2 ** 64, MINHASH_PERMUTATIONS, dtype=np.uint64, endpoint=False)
+_EMPTY_SIGNATURE = np.full(MINHASH_PERMUTATIONS, 2 ** 32 - 1, dtype=np.uint32)
+
+
+def shingles(text, options):
+    """Set of word `SHINGLE_SIZE`-grams of the casefolded text and options."""
+    shingled = set()
+    for value in (text, *options):
+        words = _WORD.findall(value.casefold())
+        if len(words) < SHINGLE_SIZE:
+            shingled.add(' '.join(words))
+        else:
+            shingled.update(' '.join(words[i:i + SHINGLE_SIZE]) for i in range(len(words) - SHINGLE_SIZE + 1))
+    shingled.discard('')
+    return shingled
+
+
+def minhash(text, options):
+    """MinHash signature (uint32 array) of a question, permuting the shingles' CRC32 with multiply-add-shift hashes."""
+    shingled = shingles(text, options)
+    if not shingled:
+        return _EMPTY_SIGNATURE
+    hashes = np.fromiter((zlib.crc32(shingle.encode('utf-8')) for shingle in shingled), dtype=np.uint64)
+    # (a * h + b) mod 2**64 with 64-bit a and b; its high 32 bits are a strongly universal hash of the 32-bit h.
+    permuted = (hashes[:, None] * _MULTIPLIERS + _OFFSETS) >> np.uint64(32)
+    return permuted.min(axis=0).astype(np.uint32)
+
+
+def band_buckets(signature):
+    """One signed 64-bit bucket per band of `signature`."""
+    rows = MINHASH_PERMUTATIONS // MINHASH_BANDS
+    return [
+        int.from_bytes(
+            hashlib.blake2b(bytes([band]) + signature[band * rows:(band + 1) * rows].tobytes(), digest_size=8).digest(),
+            'big', signed=True,
+        )
+        for band in range(MINHASH_BANDS)
+    ]
+
+
+def similarity(first, second):
+    """Estimated Jaccard similarity of two signatures."""
+    return float(np.count_nonzero(first == second)) / MINHASH_PERMUTATIONS
+
+
+def index_questions(questions):
+    """
+    Store the signatures and band buckets of saved Question instances, replacing any previous ones.
+
+    Rows are written with executemany: nine model instances per question made
+    the ORM's bulk_create several times slower than the inserts themselves.
+    """
+    if not questions:
+        return 0
+    signatures, bands = [], []
+    for question in questions:
+        signature = minhash(question.text, [getattr(question, name) for name in SEARCH_FIELDS[1:]])
+        signatures.append((question.pk, signature.tobytes()))
+        bands.extend((question.pk, bucket) for bucket in band_buckets(signature))
+    signature_table, band_table = QuestionSignature._meta.db_table, QuestionBand._meta.db_table
+    with transaction.atomic(), connection.cursor() as cursor:
+        QuestionBand.objects.filter(question_id__in=[question.pk for question in questions]).delete()
+        cursor.executemany(
+            f"INSERT INTO {signature_table} (question_id, minhash) VALUES (%s, %s) "
+            "ON CONFLICT (question_id) DO UPDATE SET minhash = excluded.minhash",
+            signatures,
+        )
+        cursor.executemany(f"INSERT INTO {band_table} (question_id, bucket) VALUES (%s, %s)", bands)
+    return len(signatures)
+
+
+def rebuild_index(batch_size=INDEX_BATCH_SIZE):
+    """Rebuild the full-text index from app_question and recompute every signature. Returns questions indexed."""
+    with connection.cursor() as cursor:
+        cursor.execute(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')")
+    QuestionBand.objects.all().delete()
+    QuestionSignature.objects.all().delete()
+    indexed = 0
+    batch = []
+    for question in Question.objects.only(*SEARCH_FIELDS).order_by('pk').iterator(chunk_size=batch_size):
+        batch.append(question)
+        if len(batch) == batch_size:
+            indexed += index_questions(batch)
+            batch = []
+    if batch:
+        indexed += index_questions(batch)
+    return indexed
+
+
+def find_near_duplicates(text, options, creator_id=None, exam_id=None, threshold=None, limit=10, exclude=()):
+    """
+    Return [(question_id, exam_id, similarity)] of stored questions resembling the given one, most similar first.
+
+    Candidates come from the band bucket index; only those whose estimated
+    similarity reaches `threshold` are returned. `creator_id` limits the search
+    to one author's test series, `exam_id` to one exam.
+    """
+    threshold = NEAR_DUPLICATE_THRESHOLD if threshold is None else threshold
+    signature = minhash(text, options)
+    candidates = QuestionBand.objects.filter(bucket__in=band_buckets(signature)).exclude(question_id__in=exclude)
+    if exam_id is not None:
+        candidates = candidates.filter(question__exam_id=exam_id)
+    if creator_id is not None:
+        candidates = candidates.filter(question__exam__test_series__creator_id=creator_id)
+    rows = QuestionSignature.objects.filter(
+        question_id__in=candidates.values('question_id'),
+    ).values_list('question_id', 'question__exam_id', 'minhash')
+
+    matches = []
+    for question_id, question_exam_id, stored in rows:
+        score = similarity(signature, np.frombuffer(stored, dtype=np.uint32))
+        if score >= threshold:
+            matches.append((question_id, question_exam_id, score))
+    matches.sort(key=lambda match: (-match[2], match[0]))
+    return matches[:limit]
+
+
+def match_expression(query):
+    """
+    Turn free text into a safe FTS5 query: every word must match, the last one as a prefix.
+
+    Words are quoted, so FTS5 operators and punctuation typed by users are searched as text.
+    """
+    words = _WORD.findall(query)
+    if not words:
+        return None
+    return ' '.join(f'"{word}"' for word in words) + '*'
+
+
+def search_questions(query, creator_id=None, exam_id=None, limit=SEARCH_LIMIT):
+    """
+    Return up to `limit` questions matching `query`, best bm25 rank first.
+
+    Each result has the question's fields, its `score` (lower is better, as
+    bm25() reports it) and a `snippet` of the text with the hits in [brackets].
+    """
+    expression = match_expression(query)
+    if expression is None:
+        return []
+    question, exam, series = Question._meta.db_table, Exam._meta.db_table, TestSeries._meta.db_table
+    columns = ', '.join(f'q.{name}' for name in ('id', 'exam_id', *SEARCH_FIELDS))
+    weights = ', '.join(str(weight) for weight in SEARCH_WEIGHTS)
+    sql = [
+        f"SELECT {columns}, bm25({FTS_TABLE}, {weights}) AS score,",
+        f"snippet({FTS_TABLE}, 0, '[', ']', '…', 12)",
+        f"FROM {FTS_TABLE} JOIN {question} q ON q.id = {FTS_TABLE}.rowid",
+    ]
+    params = []
+    if creator_id is not None:
+        sql.append(f"JOIN {exam} e ON e.id = q.exam_id JOIN {series} s ON s.id = e.test_series_id AND s.creator_id = %s")
+        params.append(creator_id)
+    sql.append(f"WHERE {FTS_TABLE} MATCH %s")
+    params.append(expression)
+    if exam_id is not None:
+        sql.append("AND q.exam_id = %s")
+        params.append(exam_id)
+    sql.append("ORDER BY score LIMIT %s")
+    params.append(limit)
+
+    with connection.cursor() as cursor:
+        cursor.execute(' '.join(sql), params)
+        names = ['id', 'exam', *SEARCH_FIELDS, 'score', 'snippet']
+        return [dict(zip(names, row)) for row in cursor.fetchall()]
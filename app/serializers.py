@@ -0,0 +1,27 @@
+from rest_framework import serializers
+
+from .models import ExamAttempt, Question
+
+
+class AnswerItemSerializer(serializers.Serializer):
+    """A single (question, selected_option) pair inside a submission batch"""
+    question = serializers.IntegerField()
+    selected_option = serializers.ChoiceField(choices=Question.OPTION_CHOICES, allow_blank=True)
+
+
+class AnswerBatchSerializer(serializers.Serializer):
+    """Serializer for a batch of answers submitted for one exam attempt"""
+    answers = AnswerItemSerializer(many=True, allow_empty=False, max_length=1000)
+    autosave = serializers.BooleanField(default=False)
+
+    def get_pairs(self):
+        return [(item['question'], item['selected_option']) for item in self.validated_data['answers']]
+
+
+class ExamAttemptSerializer(serializers.ModelSerializer):
+    """Serializer for returning an exam attempt and its score"""
+
+    class Meta:
+        model = ExamAttempt
+        fields = ["id", "exam", "started_at", "completed_at", "score"]
+        read_only_fields = fields
@@ -0,0 +1,87 @@
+from django.db.models import F
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from .answer_keys import invalidate_answer_key
+from .entitlements import forget_exam_series, invalidate_entitlements
+from .models import Exam, ExamAttempt, Purchase, Question, SeriesProgress
+from .papers import bump_paper_version, forget_paper_meta
+from .progress import start_progress
+from .search import index_questions
+
+ANSWER_KEY_EXAM_FIELDS = {'marks', 'negative_marking', 'negative_marks_per_question'}
+
+
+@receiver(pre_save, sender=Question)
+def question_saving(sender, instance, **kwargs):
+    # A question moved to another exam changes the old exam's key and paper too.
+    instance._previous_exam_id = None
+    if not instance._state.adding:
+        instance._previous_exam_id = (
+            Question.objects.filter(pk=instance.pk).values_list('exam_id', flat=True).first()
+        )
+
+
+@receiver([post_save, post_delete], sender=Question)
+def question_changed(sender, instance, **kwargs):
+    exam_ids = {instance.exam_id, getattr(instance, '_previous_exam_id', None)} - {None}
+    for exam_id in exam_ids:
+        invalidate_answer_key(exam_id)
+        bump_paper_version(exam_id)
+
+
+@receiver(post_save, sender=Question)
+def question_saved(sender, instance, **kwargs):
+    # The full-text index follows through triggers; the MinHash signature is computed here.
+    index_questions([instance])
+
+
+@receiver(pre_save, sender=Exam)
+def exam_saving(sender, instance, update_fields=None, **kwargs):
+    # Increment in SQL so a stale instance can never write back an older paper version.
+    if not instance._state.adding and update_fields is None:
+        instance.paper_version = F('paper_version') + 1
+
+
+@receiver(post_save, sender=Exam)
+def exam_saved(sender, instance, created, update_fields=None, **kwargs):
+    if not created:
+        if update_fields is None:
+            instance.refresh_from_db(fields=['paper_version'])
+        elif 'paper_version' not in update_fields:
+            bump_paper_version(instance.pk)
+    forget_paper_meta(instance.pk)
+    forget_exam_series(instance.pk)
+
+    if update_fields is not None and not ANSWER_KEY_EXAM_FIELDS.intersection(update_fields):
+        return
+    invalidate_answer_key(instance.pk)
+
+
+@receiver(post_delete, sender=Exam)
+def exam_deleted(sender, instance, **kwargs):
+    invalidate_answer_key(instance.pk)
+    forget_paper_meta(instance.pk)
+    forget_exam_series(instance.pk)
+
+
+@receiver([post_save, post_delete], sender=Purchase)
+def purchase_changed(sender, instance, **kwargs):
+    invalidate_entitlements(instance.user_id)
+
+
+@receiver(post_save, sender=Purchase)
+def purchase_saved(sender, instance, created, **kwargs):
+    if created:
+        start_progress(instance.user_id, instance.test_series_id)
+
+
+@receiver(post_delete, sender=Purchase)
+def purchase_deleted(sender, instance, **kwargs):
+    SeriesProgress.objects.filter(user_id=instance.user_id, test_series_id=instance.test_series_id).delete()
+
+
+@receiver(pre_save, sender=ExamAttempt)
+def attempt_deadline(sender, instance, **kwargs):
+    if instance._state.adding:
+        ExamAttempt.objects.fill_deadlines([instance])
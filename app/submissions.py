@@ -0,0 +1,205 @@
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.utils import timezone
+
+from .answer_keys import OPTION_CODES, get_answer_key
+from .grading import grade_attempts
+from .models import Answer, ExamAttempt
+
+SUBMISSION_BATCH_SIZE = 500
+AUTOSAVE_FLUSH_INTERVAL = getattr(settings, 'ANSWER_AUTOSAVE_FLUSH_INTERVAL', 30)
+AUTOSAVE_BUFFER_TIMEOUT = getattr(settings, 'ANSWER_AUTOSAVE_BUFFER_TIMEOUT', 6 * 60 * 60)
+# Seconds past an attempt's deadline that answers are still accepted, for requests in flight.
+DEADLINE_GRACE = timedelta(seconds=getattr(settings, 'ATTEMPT_DEADLINE_GRACE', 30))
+
+
+class SubmissionError(Exception):
+    """Raised when a batch of answers cannot be accepted for an attempt."""
+
+
+def _validate(attempt, answers):
+    """Check a batch against the cached answer key and return it as {question_id: option}."""
+    if attempt.completed_at is not None:
+        raise SubmissionError("This attempt has already been submitted.")
+    if attempt.deadline is not None and timezone.now() > attempt.deadline + DEADLINE_GRACE:
+        raise SubmissionError("Time is up for this attempt.")
+
+    positions = get_answer_key(attempt.exam_id).positions
+    cleaned = {}
+    for question_id, selected_option in answers:
+        if question_id not in positions:
+            raise SubmissionError(f"Question {question_id} does not belong to this exam.")
+        if selected_option and selected_option not in OPTION_CODES:
+            raise SubmissionError(f"Invalid option {selected_option!r} for question {question_id}.")
+        # Later entries win, so a client may send a question more than once in one batch.
+        cleaned[question_id] = selected_option or ''
+    return cleaned
+
+
+def save_answers(attempt, answers):
+    """Upsert {question_id: option} for `attempt` with one INSERT ... ON CONFLICT per batch."""
+    rows = [
+        Answer(attempt_id=attempt.pk, question_id=question_id, selected_option=option)
+        for question_id, option in answers.items()
+    ]
+    Answer.objects.bulk_create(
+        rows,
+        batch_size=SUBMISSION_BATCH_SIZE,
+        update_conflicts=True,
+        unique_fields=['attempt', 'question'],
+        update_fields=['selected_option'],
+    )
+    return len(rows)
+
+
+def submit_answers(attempt, answers):
+    """
+    Validate and immediately write a batch of (question_id, selected_option) pairs.
+
+    Returns the number of answers written.
+    """
+    cleaned = _validate(attempt, answers)
+    written = save_answers(attempt, cleaned)
+    # A later flush must not put back an older autosaved choice for these questions.
+    cache.delete_many([_answer_key(attempt.pk, question_id) for question_id in cleaned])
+    return written
+
+
+def _answer_key(attempt_id, question_id):
+    return f"autosave:{attempt_id}:{question_id}"
+
+
+def _pending_key(attempt_id):
+    return f"autosave_pending:{attempt_id}"
+
+
+class AnswerBuffer:
+    """
+    Write-behind buffer of autosaved answers for one attempt, kept in the shared cache.
+
+    Every buffered answer is its own cache key, so concurrent autosaves of an attempt
+    merge without a read-modify-write. A pending marker, added after the answers,
+    holds the time of the oldest unwritten one. Buffers reach the database when the
+    attempt is submitted or closed, when an autosave finds the marker
+    `AUTOSAVE_FLUSH_INTERVAL` seconds old, and from the auto-submit sweep
+    (flush_due_buffers) for attempts that went quiet. The cache must be shared by
+    every process (CACHE_URL) and keep its keys for the length of an exam.
+    """
+
+    def __init__(self, attempt):
+        self.attempt = attempt
+
+    def add(self, answers):
+        """Buffer a validated batch, flushing if the interval has elapsed. Returns the number flushed."""
+        cleaned = _validate(self.attempt, answers)
+        cache.set_many(
+            {_answer_key(self.attempt.pk, question_id): option for question_id, option in cleaned.items()},
+            AUTOSAVE_BUFFER_TIMEOUT,
+        )
+        if cache.add(_pending_key(self.attempt.pk), time.time(), AUTOSAVE_BUFFER_TIMEOUT):
+            since = time.time()
+        else:
+            since = cache.get(_pending_key(self.attempt.pk), time.time())
+        if time.time() - since >= AUTOSAVE_FLUSH_INTERVAL:
+            return _flush([(self.attempt.pk, self.attempt.exam_id)])
+        return 0
+
+    def flush(self, discard=False):
+        """Write everything buffered for the attempt; `discard` then drops the buffer, for closed attempts."""
+        return _flush([(self.attempt.pk, self.attempt.exam_id)], discard)
+
+
+def _flush(attempts, discard=False):
+    """
+    Upsert the buffered answers of (attempt_id, exam_id) pairs with one cache read. Returns rows written.
+
+    The pending markers are removed before the answers are read: an autosave racing
+    the flush either lands in this read or leaves a new marker behind for the next
+    one. Answer keys are only dropped with `discard`, once no autosave can follow;
+    until then a flush rewrites what it already wrote, which the upsert makes harmless.
+    """
+    if not attempts:
+        return 0
+    cache.delete_many([_pending_key(attempt_id) for attempt_id, _exam_id in attempts])
+    keys = {
+        _answer_key(attempt_id, question_id): (attempt_id, question_id)
+        for attempt_id, exam_id in attempts
+        for question_id in get_answer_key(exam_id).question_ids
+    }
+    buffered = cache.get_many(keys)
+    rows = [
+        Answer(attempt_id=keys[key][0], question_id=keys[key][1], selected_option=option)
+        for key, option in buffered.items()
+    ]
+    Answer.objects.bulk_create(
+        rows,
+        batch_size=SUBMISSION_BATCH_SIZE,
+        update_conflicts=True,
+        unique_fields=['attempt', 'question'],
+        update_fields=['selected_option'],
+    )
+    if discard:
+        cache.delete_many(list(buffered))
+    return len(rows)
+
+
+def flush_buffers(attempt_ids, discard=False):
+    """Write the buffered answers of many attempts with one cache read and one upsert. Returns rows written."""
+    return _flush(list(ExamAttempt.objects.filter(pk__in=attempt_ids).values_list('pk', 'exam_id')), discard)
+
+
+def flush_due_buffers(now=None, batch_size=SUBMISSION_BATCH_SIZE):
+    """
+    Flush the buffers of open attempts whose oldest autosave is past the flush interval.
+
+    Run on a timer by the auto-submit sweep, so answers reach the database even when
+    the attempt stops autosaving. Returns rows written.
+    """
+    cutoff = (now or time.time()) - AUTOSAVE_FLUSH_INTERVAL
+    open_attempts = ExamAttempt.objects.filter(completed_at__isnull=True).values_list('pk', 'exam_id')
+    written = 0
+    batch = []
+    for pair in open_attempts.iterator(chunk_size=batch_size):
+        batch.append(pair)
+        if len(batch) == batch_size:
+            written += _flush_due(batch, cutoff)
+            batch = []
+    return written + _flush_due(batch, cutoff)
+
+
+def _flush_due(attempts, cutoff):
+    pending = cache.get_many([_pending_key(attempt_id) for attempt_id, _exam_id in attempts])
+    return _flush([
+        (attempt_id, exam_id) for attempt_id, exam_id in attempts
+        if pending.get(_pending_key(attempt_id), cutoff + 1) <= cutoff
+    ])
+
+
+def autosave_answers(attempt, answers):
+    return AnswerBuffer(attempt).add(answers)
+
+
+def finish_attempt(attempt):
+    """Flush buffered answers, mark the attempt completed and grade it."""
+    if attempt.completed_at is not None:
+        raise SubmissionError("This attempt has already been submitted.")
+    completed_at = timezone.now()
+    # Closed and flushed together: nothing sees the attempt completed without its answers,
+    # and a failed flush leaves it open with its buffer intact, to be submitted or closed again.
+    with transaction.atomic():
+        # The completed_at filter makes a concurrent double submit a no-op for the loser.
+        updated = ExamAttempt.objects.filter(pk=attempt.pk, completed_at__isnull=True).update(
+            completed_at=completed_at,
+        )
+        if not updated:
+            raise SubmissionError("This attempt has already been submitted.")
+        # Flushed once the attempt is closed, so autosaves accepted just before closing are included.
+        AnswerBuffer(attempt).flush(discard=True)
+    attempt.completed_at = completed_at
+    grade_attempts([attempt.pk])
+    attempt.refresh_from_db(fields=['score'])
+    return attempt
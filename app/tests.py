@@ -1,3 +1,1119 @@
-from django.test import TestCase
+import csv
+import gzip
+import io
+import json
+import os
+import random
+import tempfile
+import threading
+import tracemalloc
+from datetime import timedelta
+from decimal import Decimal
+from io import StringIO
+from unittest import mock
 
-# Create your tests here.
+import numpy as np
+from asgiref.sync import async_to_sync, iscoroutinefunction, sync_to_async
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import DatabaseError, connection
+from django.http import HttpResponse
+from django.test import AsyncClient, AsyncRequestFactory, TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+
+from backend.database import PrimaryReplicaRouter, replica_alias, replica_reads
+from backend.profiling import QueryRecorder, RequestProfilingMiddleware, install_query_recorder, registry
+
+from .answer_keys import AnswerKey, clear_local_answer_keys, get_answer_key
+from .exports import export_results
+from .entitlements import filter_owned, get_exam_series, get_owned_series, partition_owned
+from .grading import grade_attempts, grade_exam
+from .item_analysis import get_item_analysis
+from .leaderboard import Leaderboard, clear_local_leaderboards, get_leaderboard
+from . import answer_keys, autosubmit, entitlements, leaderboard, papers, submissions
+from .models import Answer, Exam, ExamAttempt, Purchase, Question, SeriesProgress, TestSeries
+from .progress import dashboard
+from .question_import import QuestionImporter
+from .search import find_near_duplicates, minhash, search_questions, similarity
+
+User = get_user_model()
+
+
+class ExamFixtureMixin:
+    """Builds a small exam with four questions whose answer key is A, B, C, D."""
+
+    @classmethod
+    def make_user(cls, n):
+        return User.objects.create_user(email=f"user{n}@example.com", phone=f"+91980000{n:04d}")
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.creator = cls.make_user(0)
+        cls.series = TestSeries.objects.create(creator=cls.creator, title='Series', price=100)
+        cls.exam = Exam.objects.create(
+            test_series=cls.series, title='Mock 1', duration_minutes=60, marks=4.0,
+            negative_marking=True, negative_marks_per_question=1.0,
+        )
+        cls.questions = [
+            Question.objects.create(
+                exam=cls.exam, text=f"Q{i}", option_a='a', option_b='b', option_c='c', option_d='d',
+                correct_option=option,
+            )
+            for i, option in enumerate('ABCD')
+        ]
+
+    def setUp(self):
+        cache.clear()
+        clear_local_answer_keys()
+        clear_local_leaderboards()
+
+    def make_attempt(self, user, choices, completed=True):
+        attempt = ExamAttempt.objects.create(
+            user=user, exam=self.exam, completed_at=timezone.now() if completed else None,
+        )
+        Answer.objects.bulk_create([
+            Answer(attempt=attempt, question=question, selected_option=choice)
+            for question, choice in zip(self.questions, choices)
+        ])
+        return attempt
+
+
+class GradingTests(ExamFixtureMixin, TestCase):
+
+    def test_grade_exam_scores_with_negative_marking(self):
+        attempt = self.make_attempt(self.make_user(1), 'ABDA')
+        self.assertEqual(grade_exam(self.exam), 1)
+        attempt.refresh_from_db()
+        self.assertEqual(attempt.score, 2 * 4.0 - 2 * 1.0)
+        self.assertEqual(
+            list(attempt.answers.order_by('question_id').values_list('is_correct', flat=True)),
+            [True, True, False, False],
+        )
+
+    def test_blank_answers_are_not_penalised(self):
+        attempt = self.make_attempt(self.make_user(1), ['A', '', '', ''])
+        grade_exam(self.exam)
+        attempt.refresh_from_db()
+        self.assertEqual(attempt.score, 4.0)
+
+    def test_without_negative_marking(self):
+        self.exam.negative_marking = False
+        self.exam.save()
+        attempt = self.make_attempt(self.make_user(1), 'ABDA')
+        grade_exam(self.exam.pk)
+        attempt.refresh_from_db()
+        self.assertEqual(attempt.score, 8.0)
+
+    def test_open_attempts_are_skipped_by_default(self):
+        attempt = self.make_attempt(self.make_user(1), 'ABCD', completed=False)
+        self.assertEqual(grade_exam(self.exam), 0)
+        self.assertEqual(grade_exam(self.exam, completed_only=False), 1)
+        attempt.refresh_from_db()
+        self.assertEqual(attempt.score, 16.0)
+
+    def test_query_count_does_not_grow_with_attempts(self):
+        attempts = [self.make_attempt(self.make_user(n), 'ABCD') for n in range(1, 21)]
+        get_answer_key(self.exam)
+        get_exam_series(self.exam.pk)
+        # Attempt grouping, then three queries per batch inside a savepoint pair,
+        # then the batch's progress rows (none here: nobody bought the series).
+        with self.assertNumQueries(7):
+            self.assertEqual(grade_attempts(attempts), 20)
+        self.assertEqual(set(ExamAttempt.objects.values_list('score', flat=True)), {16.0})
+
+    def test_grade_exam_command(self):
+        self.make_attempt(self.make_user(1), 'ABCD')
+        call_command('grade_exam', self.exam.pk, stdout=StringIO())
+        self.assertEqual(ExamAttempt.objects.get().score, 16.0)
+
+
+class AnswerKeyTests(ExamFixtureMixin, TestCase):
+
+    def test_key_is_compact_and_ordered(self):
+        key = AnswerKey.build(self.exam)
+        self.assertEqual(list(key.question_ids), [q.pk for q in self.questions])
+        self.assertEqual(key.options, bytes([0, 1, 2, 3]))
+        self.assertEqual(key.negative_marks, 1.0)
+        self.assertEqual(key.correct_option(self.questions[2].pk), 'C')
+        self.assertEqual(key.grade([(q.pk, c) for q, c in zip(self.questions, 'ABDA')]), 6.0)
+
+    def test_warm_key_does_not_query(self):
+        get_answer_key(self.exam.pk)
+        with self.assertNumQueries(0):
+            get_answer_key(self.exam.pk)
+        clear_local_answer_keys()
+        with self.assertNumQueries(0):
+            self.assertEqual(len(get_answer_key(self.exam.pk)), 4)
+
+    def test_question_save_and_delete_invalidate(self):
+        self.assertTrue(get_answer_key(self.exam).is_correct(self.questions[0].pk, 'A'))
+        question = self.questions[0]
+        question.correct_option = 'D'
+        question.save()
+        self.assertTrue(get_answer_key(self.exam).is_correct(question.pk, 'D'))
+        question.delete()
+        self.assertEqual(len(get_answer_key(self.exam)), 3)
+
+    def test_exam_marking_change_invalidates(self):
+        self.assertEqual(get_answer_key(self.exam).marks, 4.0)
+        self.exam.marks = 2.0
+        self.exam.save(update_fields=['marks'])
+        self.assertEqual(get_answer_key(self.exam).marks, 2.0)
+
+    def test_edit_in_another_process_is_seen_at_once(self):
+        self.assertTrue(get_answer_key(self.exam).is_correct(self.questions[0].pk, 'A'))
+        # Another worker edits the question: the database and shared version change, this LRU does not.
+        Question.objects.filter(pk=self.questions[0].pk).update(correct_option='D')
+        answer_keys._bump_version(self.exam.pk)
+        self.assertTrue(get_answer_key(self.exam).is_correct(self.questions[0].pk, 'D'))
+
+    def test_moving_a_question_invalidates_both_exams(self):
+        other = Exam.objects.create(test_series=self.series, title='Mock 2', duration_minutes=60)
+        self.assertEqual((len(get_answer_key(self.exam)), len(get_answer_key(other))), (4, 0))
+        question = self.questions[0]
+        question.exam = other
+        question.save()
+        self.assertEqual((len(get_answer_key(self.exam)), len(get_answer_key(other))), (3, 1))
+
+    def test_unrelated_exam_update_keeps_key(self):
+        get_answer_key(self.exam)
+        self.exam.save(update_fields=['title'])
+        with self.assertNumQueries(0):
+            get_answer_key(self.exam)
+
+
+class AnswerSubmissionTests(ExamFixtureMixin, TestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.user = self.make_user(1)
+        self.attempt = ExamAttempt.objects.create(user=self.user, exam=self.exam)
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.url = reverse('attempt_answers', args=[self.attempt.pk])
+
+    def post_answers(self, choices, **extra):
+        payload = [
+            {"question": question.pk, "selected_option": choice}
+            for question, choice in zip(self.questions, choices)
+        ]
+        return self.client.post(self.url, {"answers": payload, **extra}, format='json')
+
+    def answers(self):
+        return ''.join(self.attempt.answers.order_by('question_id').values_list('selected_option', flat=True))
+
+    def test_batch_is_upserted(self):
+        self.assertEqual(self.post_answers('ABCD').data["written"], 4)
+        self.post_answers('DD')
+        self.assertEqual(self.answers(), 'DDCD')
+        self.assertEqual(Answer.objects.count(), 4)
+
+    def test_warm_batch_writes_in_one_statement(self):
+        get_answer_key(self.exam)
+        rows = [(q.pk, 'A') for q in self.questions]
+        with self.assertNumQueries(1):
+            self.assertEqual(submissions.submit_answers(self.attempt, rows), 4)
+
+    def test_rejects_foreign_question(self):
+        other = Exam.objects.create(test_series=self.series, title='Other', duration_minutes=10)
+        foreign = Question.objects.create(
+            exam=other, text='X', option_a='a', option_b='b', option_c='c', option_d='d', correct_option='A',
+        )
+        response = self.client.post(
+            self.url, {"answers": [{"question": foreign.pk, "selected_option": "A"}]}, format='json',
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(Answer.objects.exists())
+
+    def test_other_users_attempt_is_not_found(self):
+        self.client.force_authenticate(self.make_user(2))
+        self.assertEqual(self.post_answers('A').status_code, 404)
+
+    def test_autosave_buffers_until_submit(self):
+        self.assertEqual(self.post_answers('ABCA', autosave=True).data["written"], 0)
+        self.assertFalse(Answer.objects.exists())
+
+        response = self.client.post(reverse('attempt_submit', args=[self.attempt.pk]))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["score"], 3 * 4.0 - 1.0)
+        self.assertEqual(self.answers(), 'ABCA')
+
+        self.assertEqual(self.post_answers('A').status_code, 400)
+        self.assertEqual(self.client.post(reverse('attempt_submit', args=[self.attempt.pk])).status_code, 400)
+
+    def test_submit_payload_matches_serializer(self):
+        from rest_framework.renderers import JSONRenderer
+
+        from .serializers import ExamAttemptSerializer
+
+        response = self.client.post(reverse('attempt_submit', args=[self.attempt.pk]))
+        self.attempt.refresh_from_db()
+        self.assertEqual(response.content, JSONRenderer().render(ExamAttemptSerializer(self.attempt).data))
+
+    def test_autosave_flushes_after_interval(self):
+        with mock.patch.object(submissions, 'AUTOSAVE_FLUSH_INTERVAL', 0):
+            self.assertEqual(self.post_answers('AB', autosave=True).data["written"], 2)
+        self.assertEqual(self.answers(), 'AB')
+
+    def test_autosaves_merge_per_question_and_flush_on_a_timer(self):
+        # Two workers buffering for the same attempt: neither overwrites the other's answers.
+        first, second = submissions.AnswerBuffer(self.attempt), submissions.AnswerBuffer(self.attempt)
+        first.add([(self.questions[0].pk, 'A'), (self.questions[1].pk, 'B')])
+        second.add([(self.questions[1].pk, 'C'), (self.questions[2].pk, 'C')])
+        self.assertEqual(submissions.flush_due_buffers(), 0)
+        self.assertFalse(Answer.objects.exists())
+
+        with mock.patch.object(submissions.time, 'time', return_value=submissions.time.time() + 60):
+            self.assertEqual(submissions.flush_due_buffers(), 3)
+        self.assertEqual(self.answers(), 'ACC')
+        self.assertEqual(submissions.flush_due_buffers(), 0)  # nothing pending until the next autosave
+
+    def test_immediate_write_wins_over_buffered_answer(self):
+        self.post_answers('A', autosave=True)
+        self.post_answers('D')
+        self.client.post(reverse('attempt_submit', args=[self.attempt.pk]))
+        self.assertEqual(self.answers(), 'D')
+
+    def test_failed_flush_leaves_the_attempt_open(self):
+        self.post_answers('AB', autosave=True)
+        with mock.patch.object(Answer.objects, 'bulk_create', side_effect=DatabaseError):
+            with self.assertRaises(DatabaseError):
+                submissions.finish_attempt(self.attempt)
+        self.attempt.refresh_from_db()
+        self.assertIsNone(self.attempt.completed_at)
+
+        self.assertEqual(submissions.finish_attempt(self.attempt).score, 2 * 4.0)
+        self.assertEqual(self.answers(), 'AB')
+
+
+class LeaderboardTests(ExamFixtureMixin, TestCase):
+
+    def test_rank_top_and_percentile(self):
+        board = Leaderboard(self.exam.pk, {1: 10.0, 2: 30.0, 3: 20.0, 4: 20.0})
+        self.assertEqual(board.rank(2), 1)
+        self.assertEqual(board.rank(3), 2)
+        self.assertEqual(board.rank(4), 2)
+        self.assertEqual(board.rank(1), 4)
+        self.assertIsNone(board.rank(99))
+        self.assertEqual(board.top(3), [(1, 2, 30.0), (2, 3, 20.0), (2, 4, 20.0)])
+        self.assertEqual(board.percentile(20.0), 25.0)
+        self.assertEqual(board.percentile(31.0), 100.0)
+
+    def test_record_keeps_best_score(self):
+        board = Leaderboard(self.exam.pk, {1: 10.0, 2: 30.0})
+        self.assertFalse(board.record(2, 5.0))
+        self.assertTrue(board.record(1, 40.0))
+        self.assertEqual(board.top(2), [(1, 1, 40.0), (2, 2, 30.0)])
+        self.assertEqual(len(board), 2)
+
+    def test_graded_attempts_update_the_index_incrementally(self):
+        first = self.make_attempt(self.make_user(1), 'ABCD')
+        grade_attempts([first])
+        self.assertEqual(get_leaderboard(self.exam.pk).rank(first.user_id), 1)
+
+        second = self.make_attempt(self.make_user(2), 'ABCD')
+        third = self.make_attempt(self.make_user(3), 'AAAA')
+        grade_attempts([second, third])
+        with self.assertNumQueries(0):
+            board = get_leaderboard(self.exam.pk)
+        self.assertEqual([user for _rank, user, _score in board.top(3)], [first.user_id, second.user_id, third.user_id])
+        self.assertEqual(board.rank(third.user_id), 3)
+
+    def test_missing_deltas_trigger_rebuild(self):
+        attempt = self.make_attempt(self.make_user(1), 'ABCD')
+        get_leaderboard(self.exam.pk)
+        grade_exam(self.exam)
+        self.assertEqual(get_leaderboard(self.exam.pk).score_of(attempt.user_id), 16.0)
+
+    def test_unwritten_delta_waits_instead_of_rebuilding(self):
+        get_leaderboard(self.exam.pk)
+        leaderboard.record_scores(self.exam.pk, [(1, 10.0), (2, 20.0)])
+        # A publisher that reserved version 3 but has not written its delta yet.
+        cache.incr(leaderboard._version_key(self.exam.pk))
+        leaderboard.record_scores(self.exam.pk, [(3, 30.0)])
+        with self.assertNumQueries(0):
+            board = get_leaderboard(self.exam.pk)
+        self.assertEqual((board.version, len(board)), (2, 2))
+        cache.set(leaderboard._delta_key(self.exam.pk, 3), (4, 40.0))
+        with self.assertNumQueries(0):
+            board = get_leaderboard(self.exam.pk)
+        self.assertEqual((board.version, [user for _rank, user, _score in board.top(4)]), (4, [4, 3, 2, 1]))
+
+    def test_gap_outliving_the_timeout_rebuilds(self):
+        attempt = self.make_attempt(self.make_user(1), 'ABCD', completed=False)
+        get_leaderboard(self.exam.pk)
+        cache.incr(leaderboard._version_key(self.exam.pk))
+        get_leaderboard(self.exam.pk)
+        ExamAttempt.objects.filter(pk=attempt.pk).update(completed_at=timezone.now(), score=16.0)
+        with mock.patch.object(leaderboard, 'LEADERBOARD_GAP_TIMEOUT', 0):
+            self.assertEqual(get_leaderboard(self.exam.pk).score_of(attempt.user_id), 16.0)
+
+    def test_least_recently_read_boards_are_dropped(self):
+        exams = [self.exam] + [
+            Exam.objects.create(test_series=self.series, title=f'Mock {n}', duration_minutes=60) for n in (2, 3)
+        ]
+        with mock.patch.object(leaderboard, 'LEADERBOARD_LOCAL_CACHE_SIZE', 2):
+            for exam in exams[:2]:
+                get_leaderboard(exam.pk)
+            get_leaderboard(exams[0].pk)
+            get_leaderboard(exams[2].pk)
+            self.assertEqual(list(leaderboard._slots), [exams[0].pk, exams[2].pk])
+            with self.assertNumQueries(1):  # Rebuilt from the database
+                get_leaderboard(exams[1].pk)
+        self.assertEqual(list(leaderboard._slots), [exams[2].pk, exams[1].pk])
+
+    def test_leaderboard_view(self):
+        attempt = self.make_attempt(self.make_user(1), 'ABCD')
+        Purchase.objects.create(user=attempt.user, test_series=self.series)
+        grade_exam(self.exam)
+        client = APIClient()
+        client.force_authenticate(attempt.user)
+        response = client.get(reverse('exam_leaderboard', args=[self.exam.pk]), {'top': 5})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["total"], 1)
+        self.assertEqual(response.data["me"], {"rank": 1, "score": 16.0, "percentile": 0.0})
+
+
+class EffectivePriceTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.creator = User.objects.create_user(email="creator@example.com", phone="+919800000000")
+
+    def test_matches_get_discounted_price(self):
+        now = timezone.now()
+        rng = random.Random(9)
+        windows = [(None, None), (now - timedelta(days=1), now + timedelta(days=1)), (now, now),
+                   (now + timedelta(hours=1), now + timedelta(days=2)), (now - timedelta(days=2), now - timedelta(seconds=1))]
+        series = []
+        for i in range(400):
+            start, end = rng.choice(windows)
+            series.append(TestSeries(
+                creator=self.creator, title=f"S{i}",
+                price=Decimal(rng.choice([0, 1, 99999999, rng.randint(0, 99999999)])) / 100,
+                discount_type=rng.choice([None, '', 'percent', 'fixed', 'other']),
+                discount_value=rng.choice([None, Decimal(0), Decimal(rng.randint(0, 999999)) / 100, Decimal('12.35')]),
+                discount_start=start, discount_end=end,
+            ))
+        TestSeries.objects.bulk_create(series)
+
+        with mock.patch('django.utils.timezone.now', return_value=now):
+            rows = list(TestSeries.objects.with_effective_price(now))
+            for row in rows:
+                self.assertEqual(row.effective_price, row.get_discounted_price(), (row.price, row.discount_type, row.discount_value))
+
+        ordered = TestSeries.objects.with_effective_price(now).order_by('effective_price', 'pk')
+        self.assertEqual(
+            [row.pk for row in ordered],
+            [row.pk for row in sorted(rows, key=lambda row: (row.effective_price, row.pk))],
+        )
+
+    def test_filter_by_effective_price(self):
+        now = timezone.now()
+        TestSeries.objects.create(
+            creator=self.creator, title="Sale", price=Decimal("500.00"), discount_type='percent',
+            discount_value=Decimal("50"), discount_start=now - timedelta(days=1), discount_end=now + timedelta(days=1),
+        )
+        TestSeries.objects.create(creator=self.creator, title="Full", price=Decimal("300.00"))
+        cheap = TestSeries.objects.with_effective_price(now).filter(effective_price__lte=Decimal("299.99"))
+        self.assertEqual([s.title for s in cheap], ["Sale"])
+
+
+class ExamPaperTests(ExamFixtureMixin, TestCase):
+
+    def setUp(self):
+        super().setUp()
+        Exam.objects.filter(pk=self.exam.pk).update(is_published=True)
+        self.client = APIClient()
+        self.client.force_authenticate(self.creator)
+        self.url = reverse('exam_paper', args=[self.exam.pk])
+
+    def test_paper_strips_answers_and_revalidates(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        paper = json.loads(response.content)
+        self.assertEqual([q["id"] for q in paper["questions"]], [q.pk for q in self.questions])
+        self.assertNotIn("correct_option", paper["questions"][0])
+
+        with self.assertNumQueries(0):
+            cached = self.client.get(self.url, HTTP_IF_NONE_MATCH=response["ETag"])
+        self.assertEqual(cached.status_code, 304)
+
+        gzipped = self.client.get(self.url, HTTP_ACCEPT_ENCODING="gzip, br")
+        self.assertEqual(gzipped["Content-Encoding"], "gzip")
+        self.assertEqual(gzip.decompress(gzipped.content), response.content)
+
+    def test_question_edit_produces_new_version(self):
+        etag = self.client.get(self.url)["ETag"]
+        question = self.questions[0]
+        question.text = "Edited"
+        question.save()
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response["ETag"], etag)
+        self.assertEqual(json.loads(response.content)["questions"][0]["text"], "Edited")
+
+    def test_stale_exam_instance_cannot_reuse_a_version(self):
+        stale = Exam.objects.get(pk=self.exam.pk)
+        loaded_version = stale.paper_version
+        self.questions[0].save()
+        stale.title = "Renamed"
+        stale.save()
+        self.assertEqual(stale.paper_version, loaded_version + 2)
+        self.assertEqual(Exam.objects.get(pk=self.exam.pk).paper_version, loaded_version + 2)
+
+    def test_unpublished_and_future_exams_are_hidden(self):
+        Exam.objects.filter(pk=self.exam.pk).update(is_published=False)
+        cache.clear()
+        self.assertEqual(self.client.get(self.url).status_code, 404)
+        self.exam.is_published = True
+        self.exam.scheduled_at = timezone.now() + timedelta(hours=1)
+        self.exam.save()
+        self.assertEqual(self.client.get(self.url).status_code, 403)
+
+    def test_meta_cached_before_commit_is_dropped(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.exam.is_published = False
+            self.exam.save()
+            # Another process reading before the commit caches the still-published row.
+            cache.set(f"paper_meta:{self.exam.pk}", {'is_published': True})
+        self.assertFalse(papers.get_paper_meta(self.exam.pk)['is_published'])
+
+    def test_cold_build_waits_for_the_lock_holder(self):
+        version = Exam.objects.get(pk=self.exam.pk).paper_version
+        built = papers.build_snapshot(self.exam.pk)
+        cache.delete(f"paper:{self.exam.pk}:{version}")
+        # Another worker holds the build lock and publishes its snapshot shortly after.
+        cache.add(f"paper_build:{self.exam.pk}:{version}", 1)
+        publisher = threading.Timer(0.1, cache.set, args=[f"paper:{self.exam.pk}:{version}", built])
+        publisher.start()
+        self.addCleanup(publisher.join)
+        with mock.patch.object(papers, 'build_snapshot') as build:
+            self.assertEqual(papers.get_snapshot(self.exam.pk, version).etag, built.etag)
+        build.assert_not_called()
+
+    def test_snapshot_is_stored_under_the_requested_version(self):
+        version = Exam.objects.get(pk=self.exam.pk).paper_version
+        # The paper changed between reading the version and building it.
+        Exam.objects.filter(pk=self.exam.pk).update(paper_version=version + 1)
+        with papers._build_lock(self.exam.pk, version + 1):  # Another thread building a different version
+            snapshot = papers.get_snapshot(self.exam.pk, version)
+        self.assertEqual(snapshot.version, version)
+        self.assertEqual(papers._load(self.exam.pk, version).etag, snapshot.etag)
+
+
+class EntitlementTests(ExamFixtureMixin, TestCase):
+
+    def setUp(self):
+        super().setUp()
+        Exam.objects.filter(pk=self.exam.pk).update(is_published=True)
+        self.user = self.make_user(1)
+        self.other_series = TestSeries.objects.create(creator=self.creator, title='Other', price=50)
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.url = reverse('exam_paper', args=[self.exam.pk])
+
+    def test_paper_requires_purchase(self):
+        self.assertEqual(self.client.get(self.url).status_code, 403)
+        Purchase.objects.create(user=self.user, test_series=self.series)
+        self.assertEqual(self.client.get(self.url).status_code, 200)
+
+    def test_warm_check_does_not_query(self):
+        Purchase.objects.create(user=self.user, test_series=self.series)
+        response = self.client.get(self.url)
+        with self.assertNumQueries(0):
+            self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH=response["ETag"]).status_code, 304)
+
+    def test_purchase_delete_revokes_access(self):
+        purchase = Purchase.objects.create(user=self.user, test_series=self.series)
+        self.assertEqual(self.client.get(self.url).status_code, 200)
+        purchase.delete()
+        self.assertEqual(self.client.get(self.url).status_code, 403)
+
+    def test_set_cached_before_commit_is_dropped(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            Purchase.objects.create(user=self.user, test_series=self.series)
+            # Another process reading before the commit caches the old, empty set.
+            cache.set(entitlements._owned_key(self.user.pk, entitlements._owned_version(self.user.pk)), frozenset())
+        self.assertEqual(get_owned_series(self.user.pk), {self.series.pk})
+
+    def test_batch_partition_and_filter(self):
+        Purchase.objects.create(user=self.user, test_series=self.other_series)
+        series_ids = [self.series.pk, self.other_series.pk]
+        get_owned_series(self.user.pk)
+        with self.assertNumQueries(0):
+            self.assertEqual(partition_owned(self.user.pk, series_ids), ([self.other_series.pk], [self.series.pk]))
+        owned = filter_owned(TestSeries.objects.all(), self.user.pk)
+        self.assertEqual(list(owned.values_list('pk', flat=True)), [self.other_series.pk])
+        not_owned = filter_owned(TestSeries.objects.all(), self.user.pk, owned=False)
+        self.assertEqual(list(not_owned.values_list('pk', flat=True)), [self.series.pk])
+
+
+class ResultExportTests(ExamFixtureMixin, TestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.client = APIClient()
+        self.client.force_authenticate(self.creator)
+        self.url = reverse('exam_results', args=[self.exam.pk])
+
+    def bulk_attempts(self, user, count):
+        attempts = ExamAttempt.objects.bulk_create(
+            ExamAttempt(user=user, exam=self.exam, score=4.0) for _ in range(count)
+        )
+        Answer.objects.bulk_create(
+            Answer(attempt=attempt, question=question, selected_option='A')
+            for attempt in attempts for question in self.questions
+        )
+
+    def test_csv_export(self):
+        attempt = self.make_attempt(self.make_user(1), 'AB')
+        grade_exam(self.exam)
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        rows = list(csv.reader(io.StringIO(b''.join(response.streaming_content).decode())))
+        self.assertEqual(rows[0][:3], ['attempt', 'email', 'phone'])
+        self.assertEqual(rows[0][6:], [f"q{q.pk}" for q in self.questions])
+        self.assertEqual(rows[1][:4], [str(attempt.pk), 'user1@example.com', '+919800000001', '8.0'])
+        self.assertEqual(rows[1][6:], ['A', 'B', '', ''])
+
+    def test_gzipped_ndjson_export(self):
+        self.make_attempt(self.make_user(1), 'ABCD')
+        self.make_attempt(self.make_user(2), 'DCBA', completed=False)
+        response = self.client.get(self.url, {'type': 'ndjson', 'completed': '1'}, HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        lines = gzip.decompress(b''.join(response.streaming_content)).decode().splitlines()
+        self.assertEqual([json.loads(line)['email'] for line in lines], ['user1@example.com'])
+
+    def test_only_creator_can_export(self):
+        self.client.force_authenticate(self.make_user(1))
+        self.assertEqual(self.client.get(self.url).status_code, 403)
+
+    def test_command_writes_rows(self):
+        self.make_attempt(self.make_user(1), 'ABCD')
+        out = StringIO()
+        call_command('export_results', self.exam.pk, '--format', 'ndjson', stdout=out)
+        self.assertEqual(json.loads(out.getvalue())[f"q{self.questions[3].pk}"], 'D')
+
+    def test_memory_stays_flat(self):
+        user = self.make_user(1)
+
+        def peak(count):
+            ExamAttempt.objects.all().delete()
+            self.bulk_attempts(user, count)
+            tracemalloc.start()
+            size = sum(len(chunk) for chunk in export_results(self.exam.pk, batch_size=100))
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+            return size, peak
+
+        small_size, small_peak = peak(200)
+        large_size, large_peak = peak(2000)
+        self.assertGreater(large_size, 9 * small_size)
+        self.assertLess(large_peak, small_peak * 1.5)
+
+
+class QuestionImportTests(ExamFixtureMixin, TestCase):
+
+    def upload(self, name, content, user=None):
+        client = APIClient()
+        client.force_authenticate(user or self.creator)
+        upload = io.BytesIO(content.encode())
+        upload.name = name
+        return client.post(reverse('exam_question_import', args=[self.exam.pk]), {'file': upload}, format='multipart')
+
+    def test_jsonl_import_skips_invalid_and_duplicate_rows(self):
+        key_before = get_answer_key(self.exam.pk)
+        rows = [
+            {"text": "New", "option_a": "1", "option_b": "2", "option_c": "3", "option_d": "4", "correct_option": "b"},
+            {"text": " q0 ", "option_a": "A", "option_b": "b", "option_c": "c", "option_d": "d", "correct_option": "A"},
+            {"text": "Long", "option_a": "x" * 256, "option_b": "2", "option_c": "3", "option_d": "4", "correct_option": "A"},
+            {"text": "Bad key", "option_a": "1", "option_b": "2", "option_c": "3", "option_d": "4", "correct_option": "AB"},
+        ]
+        content = "".join(json.dumps(row) + "\n" for row in rows) + "[1, 2]\n"
+        response = self.upload("bank.jsonl", content)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual((response.data["created"], response.data["duplicates"]), (1, 1))
+        self.assertEqual([error["row"] for error in response.data["errors"]], [3, 4, 5])
+        self.assertIn("option_a is longer than 255", response.data["errors"][0]["error"])
+
+        created = Question.objects.get(text="New")
+        self.assertEqual(created.correct_option, 'B')
+        self.assertEqual(len(get_answer_key(self.exam.pk)), len(key_before) + 1)
+
+    def test_csv_command_batches(self):
+        directory = tempfile.mkdtemp()
+        path = os.path.join(directory, "bank.csv")
+        self.addCleanup(os.remove, path)
+        with open(path, 'w') as handle:
+            handle.write("text,option_a,option_b,option_c,option_d,correct_option\n")
+            handle.writelines(f"Imported {i},a,b,c,d,C\n" for i in range(5))
+            handle.write("Imported 0,a,b,c,d,C\n")
+        out, err = StringIO(), StringIO()
+        call_command('import_questions', self.exam.pk, path, '--batch-size', '2', stdout=out, stderr=err)
+        self.assertIn("Imported 5 questions, skipped 1 duplicates and 0 invalid rows of 6.", out.getvalue())
+        self.assertEqual(Question.objects.filter(exam=self.exam, text__startswith="Imported").count(), 5)
+
+    def test_only_creator_can_import(self):
+        response = self.upload("bank.jsonl", "", user=self.make_user(1))
+        self.assertEqual(response.status_code, 403)
+
+
+class AutoSubmitTests(ExamFixtureMixin, TestCase):
+
+    def expire(self, attempt, minutes=5):
+        attempt.deadline = timezone.now() - timedelta(minutes=minutes)
+        ExamAttempt.objects.filter(pk=attempt.pk).update(deadline=attempt.deadline)
+        return attempt
+
+    def test_deadline_is_set_on_start(self):
+        attempt = ExamAttempt.objects.create(user=self.make_user(1), exam=self.exam)
+        self.assertAlmostEqual(attempt.deadline - attempt.started_at, timedelta(minutes=60), delta=timedelta(seconds=1))
+
+    def test_deadline_needs_no_exam_query(self):
+        user = self.make_user(1)
+        with self.assertNumQueries(1):
+            ExamAttempt.objects.create(user=user, exam=self.exam)
+
+    def test_bulk_created_attempts_get_deadlines(self):
+        other = Exam.objects.create(test_series=self.series, title='Mock 2', duration_minutes=30)
+        users = [self.make_user(n) for n in (1, 2)]
+        with self.assertNumQueries(2):  # The durations of both exams, then the INSERT
+            ExamAttempt.objects.bulk_create([
+                ExamAttempt(user=users[0], exam_id=self.exam.pk), ExamAttempt(user=users[1], exam_id=other.pk),
+            ])
+        durations = {
+            exam_id: deadline - started_at
+            for exam_id, deadline, started_at in ExamAttempt.objects.values_list('exam_id', 'deadline', 'started_at')
+        }
+        self.assertAlmostEqual(durations[self.exam.pk], timedelta(minutes=60), delta=timedelta(seconds=1))
+        self.assertAlmostEqual(durations[other.pk], timedelta(minutes=30), delta=timedelta(seconds=1))
+
+    def test_expired_attempts_are_closed_and_graded(self):
+        expired = self.make_attempt(self.make_user(1), 'AB', completed=False)
+        submissions.autosave_answers(expired, [(self.questions[2].pk, 'C')])
+        self.expire(expired)
+        in_grace = self.expire(self.make_attempt(self.make_user(2), 'AB', completed=False), minutes=0)
+        running = self.make_attempt(self.make_user(3), 'AB', completed=False)
+
+        self.assertEqual(autosubmit.close_expired_attempts(batch_size=1), 1)
+        expired.refresh_from_db()
+        self.assertIsNotNone(expired.completed_at)
+        self.assertEqual(expired.score, 3 * 4.0)
+        self.assertEqual(get_leaderboard(self.exam.pk).score_of(expired.user_id), 12.0)
+        self.assertFalse(ExamAttempt.objects.filter(pk__in=[in_grace.pk, running.pk], completed_at__isnull=False).exists())
+
+    def test_attempts_closed_but_not_graded_are_graded_later(self):
+        attempt = self.expire(self.make_attempt(self.make_user(1), 'AB', completed=False))
+        with mock.patch.object(autosubmit, 'grade_attempts', side_effect=DatabaseError):
+            with self.assertRaises(DatabaseError):
+                autosubmit.close_expired_attempts()
+        attempt.refresh_from_db()
+        self.assertIsNotNone(attempt.completed_at)
+        self.assertIsNone(attempt.graded_at)
+
+        self.assertEqual(autosubmit.grade_ungraded(), 0)  # Possibly still being graded by its own process
+        later = timezone.now() + autosubmit.REGRADE_DELAY
+        self.assertEqual(autosubmit.grade_ungraded(now=later), 1)
+        attempt.refresh_from_db()
+        self.assertEqual(attempt.score, 2 * 4.0)
+        self.assertIsNotNone(attempt.graded_at)
+        self.assertEqual(autosubmit.grade_ungraded(now=later), 0)
+
+    def test_closed_attempts_are_not_claimed_twice(self):
+        attempts = [self.expire(self.make_attempt(self.make_user(n), 'A', completed=False)) for n in (1, 2, 3)]
+        self.assertEqual(sorted(autosubmit.claim_expired()), sorted(a.pk for a in attempts))
+        self.assertEqual(autosubmit.claim_expired(), [])
+        out = StringIO()
+        call_command('autosubmit_attempts', '--once', stdout=out)
+        self.assertIn("Auto-submitted 0 expired attempts.", out.getvalue())
+
+    def test_answers_after_the_deadline_are_rejected(self):
+        attempt = self.expire(self.make_attempt(self.make_user(1), '', completed=False))
+        with self.assertRaisesMessage(submissions.SubmissionError, "Time is up"):
+            submissions.submit_answers(attempt, [(self.questions[0].pk, 'A')])
+
+
+class RequestProfilingTests(ExamFixtureMixin, TestCase):
+
+    def setUp(self):
+        super().setUp()
+        registry.clear()
+        Exam.objects.filter(pk=self.exam.pk).update(is_published=True)
+        self.url = reverse('exam_paper', args=[self.exam.pk])
+
+    def client_for(self, user):
+        client = APIClient()
+        client.force_authenticate(user)
+        return client
+
+    @override_settings(REQUEST_PROFILING={'METRICS_TOKEN': 'scrape'})
+    def test_server_timing_and_metrics(self):
+        response = self.client_for(self.creator).get(self.url)
+        self.assertRegex(response['Server-Timing'], r'^db;dur=[\d.]+;desc="\d+ queries, \d+ repeated", total;dur=[\d.]+$')
+
+        metrics = APIClient().get(reverse('metrics'), HTTP_AUTHORIZATION='Bearer scrape')
+        self.assertNotIn('Server-Timing', metrics)
+        body = metrics.content.decode()
+        self.assertIn('# TYPE http_request_duration_seconds histogram', body)
+        self.assertIn('http_request_duration_seconds_count{view="exam_paper",method="GET"} 1', body)
+        self.assertIn('http_request_queries_bucket{view="exam_paper",method="GET",le="+Inf"} 1', body)
+        self.assertNotIn('view="metrics"', body)
+
+    def test_repeated_sql_is_counted(self):
+        recorder = QueryRecorder()
+        with connection.execute_wrapper(recorder):
+            for question in self.questions:
+                Question.objects.filter(pk=question.pk).exists()
+        self.assertEqual((recorder.count, recorder.repeated), (4, 3))
+
+    @override_settings(REQUEST_PROFILING={'ROUTE_SAMPLE_RATES': {'exam_paper': 0}, 'METRICS_TOKEN': 'scrape'})
+    def test_route_sampling_and_metrics_token(self):
+        response = self.client_for(self.creator).get(self.url)
+        self.assertNotIn('Server-Timing', response)
+        self.assertEqual(APIClient().get(reverse('metrics')).status_code, 403)
+        metrics = APIClient().get(reverse('metrics'), HTTP_AUTHORIZATION='Bearer scrape')
+        self.assertNotIn('exam_paper', metrics.content.decode())
+
+    def test_asgi_requests_record_database_time(self):
+        token = AccessToken.for_user(self.creator)
+        response = async_to_sync(AsyncClient().get)(self.url, headers={"Authorization": f"Bearer {token}"})
+        self.assertEqual(response.status_code, 200)
+        self.assertRegex(response['Server-Timing'], r'^db;dur=[\d.]+;desc="[1-9]\d* queries')
+
+    def test_async_stack_is_profiled_without_a_thread_hop(self):
+        async def view(request):
+            await sync_to_async(Question.objects.count)()
+            return HttpResponse()
+
+        middleware = RequestProfilingMiddleware(view)
+        self.assertTrue(iscoroutinefunction(middleware))
+        install_query_recorder(connection)
+        response = async_to_sync(middleware)(AsyncRequestFactory().get('/'))
+        self.assertRegex(response['Server-Timing'], r'^db;dur=[\d.]+;desc="1 queries, 0 repeated"')
+
+    def test_metrics_are_denied_without_a_token(self):
+        self.assertEqual(APIClient().get(reverse('metrics')).status_code, 403)
+
+
+class DatabaseRoutingTests(ExamFixtureMixin, TestCase):
+
+    def test_connection_pragmas(self):
+        with connection.cursor() as cursor:
+            pragmas = {}
+            for name in ('busy_timeout', 'synchronous', 'foreign_keys', 'cache_size'):
+                cursor.execute(f"PRAGMA {name}")
+                pragmas[name] = cursor.fetchone()[0]
+        self.assertEqual(pragmas, {'busy_timeout': 5000, 'synchronous': 1, 'foreign_keys': 1, 'cache_size': -64000})
+
+    @override_settings(DATABASE_READ_REPLICAS=['replica1'])
+    def test_reads_use_replicas_only_when_opted_in(self):
+        router = PrimaryReplicaRouter()
+        with mock.patch.object(connection, 'in_atomic_block', False):
+            self.assertIsNone(router.db_for_read(Exam))
+            with replica_reads():
+                self.assertEqual(router.db_for_read(Exam), 'replica1')
+                self.assertEqual(replica_alias(), 'replica1')
+        with replica_reads():
+            # Inside a transaction on the primary, reads stay there to see its writes.
+            self.assertIsNone(router.db_for_read(Exam))
+        self.assertEqual(router.db_for_write(Exam), 'default')
+        self.assertFalse(router.allow_migrate('replica1', 'app'))
+
+    def test_without_replicas_reads_stay_on_primary(self):
+        with mock.patch.object(connection, 'in_atomic_block', False), replica_reads():
+            self.assertEqual(replica_alias(), 'default')
+
+    @override_settings(DATABASE_READ_REPLICAS=['replica1'])
+    def test_versioned_rebuilds_read_the_primary(self):
+        # 'replica1' is not a configured connection, so any read routed to it would fail.
+        with mock.patch.object(connection, 'in_atomic_block', False):
+            self.assertEqual(len(Leaderboard.build(self.exam.pk)), 0)
+            version = Exam.objects.values_list('paper_version', flat=True).get(pk=self.exam.pk)
+            self.assertEqual(papers.render_paper(self.exam.pk)[0], version)
+
+
+class ItemAnalysisTests(ExamFixtureMixin, TestCase):
+
+    def test_statistics_match_direct_computation(self):
+        choices = ['ABCD', 'ABCA', 'ABAA', 'AAAA', 'DBC', 'BBCD']
+        for n, row in enumerate(choices, start=1):
+            self.make_attempt(self.make_user(n), row)
+        self.make_attempt(self.make_user(99), 'DDDD', completed=False)
+
+        analysis = get_item_analysis(self.exam.pk, batch_size=4)
+        self.assertEqual(analysis.attempts, 6)
+
+        key = 'ABCD'
+        correct = np.array([[row[i:i + 1] == key[i] for i in range(4)] for row in choices], dtype=float)
+        np.testing.assert_allclose(analysis.difficulty(), correct.mean(axis=0))
+        rest = correct.sum(axis=1, keepdims=True) - correct
+        expected = [np.corrcoef(correct[:, i], rest[:, i])[0, 1] for i in range(4)]
+        np.testing.assert_allclose(analysis.discrimination(), expected)
+
+        first = analysis.summary()[0]
+        self.assertEqual(first["correct_option"], "A")
+        self.assertAlmostEqual(first["choices"]["B"], 1 / 6)
+        self.assertEqual(analysis.summary()[3]["choices"]["blank"], 1 / 6)
+
+    def test_incremental_update_reads_only_new_attempts(self):
+        self.make_attempt(self.make_user(1), 'ABCD')
+        self.make_attempt(self.make_user(2), 'AAAA')
+        get_item_analysis(self.exam.pk)
+        self.make_attempt(self.make_user(3), 'BBBB')
+
+        incremental = get_item_analysis(self.exam.pk)
+        cache.clear()
+        clear_local_answer_keys()
+        full = get_item_analysis(self.exam.pk)
+        self.assertEqual(incremental.attempts, 3)
+        np.testing.assert_allclose(incremental.difficulty(), full.difficulty())
+        np.testing.assert_allclose(incremental.discrimination(), full.discrimination())
+
+    def test_attempt_committed_late_is_counted_once(self):
+        self.make_attempt(self.make_user(1), 'ABCD')
+        get_item_analysis(self.exam.pk)
+        # Completed earlier than the attempt already counted, but only visible now.
+        late = self.make_attempt(self.make_user(2), 'AAAA')
+        ExamAttempt.objects.filter(pk=late.pk).update(completed_at=late.completed_at - timedelta(minutes=1))
+        self.assertEqual(get_item_analysis(self.exam.pk).attempts, 2)
+        self.assertEqual(get_item_analysis(self.exam.pk).attempts, 2)
+
+    def test_answer_key_change_rebuilds(self):
+        self.make_attempt(self.make_user(1), 'ABCD')
+        self.assertEqual(get_item_analysis(self.exam.pk).difficulty()[0], 1.0)
+        question = self.questions[0]
+        question.correct_option = 'B'
+        question.save()
+        self.assertEqual(get_item_analysis(self.exam.pk).difficulty()[0], 0.0)
+
+
+class QueryPlanTests(TestCase):
+    """
+    Every hot query must be answered through an index, on enough synthetic data
+    (and planner statistics) that SQLite would rather scan if no index fitted.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        rng = random.Random(0)
+        now = timezone.now()
+        users = User.objects.bulk_create(
+            User(email=f"plan{i}@example.com", phone=f"+9190{i:08d}", password='!') for i in range(1000)
+        )
+        series = TestSeries.objects.bulk_create(
+            TestSeries(creator=users[i], title=f"Series {i}", is_published=i % 2 == 0) for i in range(20)
+        )
+        exams = Exam.objects.bulk_create(
+            Exam(
+                test_series=series[i % 20], title=f"Exam {i}", duration_minutes=60,
+                is_published=i % 4 == 0, is_live=i % 40 == 0, scheduled_at=now + timedelta(days=i - 40),
+            )
+            for i in range(80)
+        )
+        questions = Question.objects.bulk_create(
+            Question(exam=exam, text=f"Q{i}", option_a='a', option_b='b', option_c='c', option_d='d', correct_option='A')
+            for exam in exams for i in range(10)
+        )
+        Purchase.objects.bulk_create(
+            Purchase(user=user, test_series=series[j]) for user in users for j in rng.sample(range(20), 3)
+        )
+        attempts = ExamAttempt.objects.bulk_create(
+            ExamAttempt(
+                user=user, exam=exam, deadline=now + timedelta(minutes=rng.randint(-60, 60)),
+                completed_at=now - timedelta(minutes=rng.randint(0, 10_000)) if rng.random() < 0.95 else None,
+            )
+            for user in users for exam in rng.sample(exams, 10)
+        )
+        Answer.objects.bulk_create(
+            Answer(attempt=attempt, question=question, selected_option='A')
+            for attempt in attempts[:2000] for question in questions if question.exam_id == attempt.exam_id
+        )
+        cls.exam = exams[0]
+        cls.attempt = next(attempt for attempt in attempts if attempt.exam_id == cls.exam.pk and attempt.completed_at)
+        cls.question = next(question for question in questions if question.exam_id == cls.exam.pk)
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+
+    def hot_queries(self):
+        attempt, exam = self.attempt, self.exam
+        attempts = ExamAttempt.objects.filter(exam_id=exam.pk, completed_at__isnull=False)
+        return [
+            # (name, queryset, index it must use or None for any, whether it must be read in index order)
+            ('own attempt', ExamAttempt.objects.filter(pk=attempt.pk, user_id=attempt.user_id), None, False),
+            ('user attempts at exam', ExamAttempt.objects.filter(user_id=attempt.user_id, exam_id=exam.pk),
+             'attempt_user_exam_idx', False),
+            ('user attempt history', ExamAttempt.objects.filter(user_id=attempt.user_id), None, False),
+            ('leaderboard rebuild', attempts.values_list('user_id', 'score'), 'attempt_exam_completed_idx', False),
+            ('item analysis batch', attempts.filter(completed_at__gte=attempt.completed_at).order_by('completed_at', 'pk')
+             .values_list('completed_at', 'pk'),
+             'attempt_exam_completed_idx', True),
+            ('grading', attempts.values_list('pk', flat=True), 'attempt_exam_completed_idx', False),
+            ('expired attempts', autosubmit.expired_attempts(), 'attempt_open_deadline_idx', False),
+            ('answers of attempts', Answer.objects.filter(attempt_id__in=[attempt.pk, attempt.pk + 1]), None, False),
+            ('answer upsert', Answer.objects.filter(attempt_id=attempt.pk, question_id=self.question.pk), None, False),
+            ('paper questions', Question.objects.filter(exam_id=exam.pk).order_by('pk'), None, True),
+            ('upcoming exams', Exam.objects.upcoming(), 'exam_published_schedule_idx', True),
+            ('live exams', Exam.objects.live(), 'exam_live_schedule_idx', True),
+            ('owned series', Purchase.objects.filter(user_id=attempt.user_id).values_list('test_series_id'), None, False),
+        ]
+
+    def test_hot_queries_use_indexes(self):
+        for name, queryset, index, ordered in self.hot_queries():
+            with self.subTest(name):
+                plan = queryset.explain()
+                self.assertNotRegex(plan, r'(?m)\bSCAN (TABLE )?\w+\s*$', f"table scan in:\n{plan}")
+                self.assertRegex(plan, r'USING (COVERING )?INDEX|USING INTEGER PRIMARY KEY', plan)
+                if index:
+                    self.assertIn(index, plan)
+                if ordered:
+                    self.assertNotIn('TEMP B-TREE', plan)
+
+
+class SeriesProgressTests(ExamFixtureMixin, TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        Exam.objects.create(test_series=cls.series, title='Mock 2', duration_minutes=60)
+        cls.student = cls.make_user(1)
+
+    def progress(self):
+        return dashboard(self.student.pk)[0]
+
+    def test_purchase_starts_progress_and_grading_updates_it(self):
+        Purchase.objects.create(user=self.student, test_series=self.series)
+        self.assertEqual(self.progress()["attempts_completed"], 0)
+        self.assertEqual(self.progress()["completion"], 0.0)
+
+        grade_attempts([self.make_attempt(self.student, 'ABCD'), self.make_attempt(self.student, 'AAAA')])
+        grade_attempts([self.make_attempt(self.student, 'DDDD', completed=False)])
+        self.assertEqual(self.progress(), {
+            "test_series": self.series.pk, "title": "Series", "exams_total": 2, "exams_attempted": 1,
+            "attempts_completed": 2, "best_score": 16.0, "average_score": 8.5, "completion": 50.0,
+        })
+
+    def test_regrade_rebuild_and_refund(self):
+        attempt = self.make_attempt(self.student, 'ABCD')
+        grade_attempts([attempt])
+        Purchase.objects.create(user=self.student, test_series=self.series)
+        self.assertEqual(self.progress()["best_score"], 16.0)  # attempts before the purchase count
+
+        question = self.questions[0]
+        question.correct_option = 'B'
+        question.save()
+        grade_exam(self.exam)
+        self.assertEqual(self.progress()["best_score"], 11.0)
+
+        SeriesProgress.objects.update(best_score=None, attempts_completed=0)
+        call_command('rebuild_progress', batch_size=1, stdout=StringIO())
+        self.assertEqual(self.progress()["best_score"], 11.0)
+        self.assertEqual(self.progress()["attempts_completed"], 1)
+
+        Purchase.objects.get().delete()
+        self.assertEqual(dashboard(self.student.pk), [])
+
+    def test_dashboard_is_one_query(self):
+        Purchase.objects.create(user=self.student, test_series=self.series)
+        other = TestSeries.objects.create(creator=self.creator, title='Other')
+        Purchase.objects.create(user=self.student, test_series=other)
+        client = APIClient()
+        client.force_authenticate(self.student)
+        with self.assertNumQueries(1):
+            response = client.get(reverse('series_progress'))
+        self.assertEqual([row["title"] for row in response.json()["series"]], ["Series", "Other"])
+        self.assertEqual(response.json()["series"][1]["exams_total"], 0)
+
+
+class QuestionSearchTests(ExamFixtureMixin, TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.photo = Question.objects.create(
+            exam=cls.exam, text="Which pigment absorbs light during photosynthesis?",
+            option_a="Chlorophyll", option_b="Keratin", option_c="Melanin", option_d="Insulin", correct_option='A',
+        )
+        cls.option_hit = Question.objects.create(
+            exam=cls.exam, text="Which organelle holds the pigment?",
+            option_a="Nucleus", option_b="Chloroplast for photosynthesis", option_c="Ribosome", option_d="Vacuole",
+            correct_option='B',
+        )
+        cls.other_exam = Exam.objects.create(test_series=cls.series, title='Mock 2', duration_minutes=60)
+        cls.stranger = cls.make_user(1)
+        stranger_series = TestSeries.objects.create(creator=cls.stranger, title='Elsewhere')
+        cls.stranger_exam = Exam.objects.create(test_series=stranger_series, title='Theirs', duration_minutes=60)
+
+    def ids(self, query, **kwargs):
+        return [row["id"] for row in search_questions(query, **kwargs)]
+
+    def test_ranking_prefix_and_filters(self):
+        # A hit in the text outranks one in an option.
+        self.assertEqual(self.ids("photosynthesis"), [self.photo.pk, self.option_hit.pk])
+        self.assertEqual(self.ids("which pig"), [self.photo.pk, self.option_hit.pk])
+        self.assertEqual(self.ids("PHOTOSYNTHESIS chlorophyll"), [self.photo.pk])
+        self.assertEqual(self.ids('keratin: ("*'), [self.photo.pk])  # FTS5 syntax is not interpreted
+        self.assertEqual(self.ids("photosynthesis", exam_id=self.other_exam.pk), [])
+        self.assertEqual(self.ids("photosynthesis", creator_id=self.stranger.pk), [])
+        self.assertIn("[photosynthesis]", search_questions("photosynthesis")[0]["snippet"])
+
+    def test_index_follows_updates_deletes_and_bulk_writes(self):
+        Question.objects.filter(pk=self.photo.pk).update(text="Which gas do plants release?")
+        self.assertEqual(self.ids("photosynthesis"), [self.option_hit.pk])
+        self.assertEqual(self.ids("plants"), [self.photo.pk])
+        self.option_hit.delete()
+        self.assertEqual(self.ids("photosynthesis"), [])
+        created = Question.objects.bulk_create([
+            Question(exam=self.exam, text="Define osmosis", option_a='a', option_b='b', option_c='c', option_d='d',
+                     correct_option='A'),
+        ])
+        self.assertEqual(self.ids("osmosis"), [created[0].pk])
+
+    def test_near_duplicates(self):
+        options = ["Chlorophyll", "Keratin", "Melanin", "Insulin"]
+        reworded = "Which  pigment absorbs LIGHT during photosynthesis ?"
+        self.assertEqual(similarity(minhash(reworded, options), minhash(self.photo.text, options)), 1.0)
+        matches = find_near_duplicates(reworded, options, creator_id=self.creator.pk)
+        self.assertEqual([pk for pk, _exam, _score in matches], [self.photo.pk])
+        self.assertEqual(find_near_duplicates(reworded, options, creator_id=self.stranger.pk), [])
+        self.assertEqual(find_near_duplicates("Name the capital of France", ["Paris", "Rome", "Oslo", "Bern"]), [])
+
+        # Edits through save() refresh the signature.
+        self.photo.text = "Name the capital of France"
+        self.photo.save()
+        self.assertEqual(find_near_duplicates(reworded, options), [])
+
+    def test_imported_questions_get_signatures(self):
+        row = {"text": "Which pigment absorbs light during photosynthesis in plants?", "option_a": "Chlorophyll",
+               "option_b": "Keratin", "option_c": "Melanin", "option_d": "Insulin", "correct_option": "A"}
+        QuestionImporter(self.stranger_exam).run([row])
+        imported = Question.objects.get(exam=self.stranger_exam)
+        self.assertEqual(imported.bands.count(), 8)
+        matches = find_near_duplicates(row["text"], [row[name] for name in ('option_a', 'option_b', 'option_c', 'option_d')])
+        self.assertEqual(matches[0][:2], (imported.pk, self.stranger_exam.pk))
+
+    def test_views_are_scoped_to_the_creator(self):
+        client = APIClient()
+        client.force_authenticate(self.stranger)
+        response = client.get(reverse('question_search'), {'q': 'photosynthesis'})
+        self.assertEqual(response.json()["results"], [])
+        response = client.post(
+            reverse('exam_question_duplicates', args=[self.exam.pk]), {'text': self.photo.text}, format='json',
+        )
+        self.assertEqual(response.status_code, 403)
+
+        client.force_authenticate(self.creator)
+        response = client.get(reverse('question_search'), {'q': 'photosynthesis', 'limit': 1})
+        self.assertEqual([row["id"] for row in response.json()["results"]], [self.photo.pk])
+        self.assertEqual(client.get(reverse('question_search')).status_code, 400)
+        response = client.post(reverse('exam_question_duplicates', args=[self.other_exam.pk]), {
+            'text': self.photo.text, 'option_a': 'Chlorophyll', 'option_b': 'Keratin', 'option_c': 'Melanin',
+            'option_d': 'Insulin',
+        }, format='json')
+        self.assertEqual(response.json()["duplicates"], [
+            {"id": self.photo.pk, "exam": self.exam.pk, "text": self.photo.text, "similarity": 1.0},
+        ])
@@ -0,0 +1,17 @@
+from django.urls import path
+from .views import (
+    AnswerBatchView, ExamPaperView, ExamResultsExportView, LeaderboardView, QuestionDuplicatesView,
+    QuestionImportView, QuestionSearchView, SeriesProgressView, SubmitAttemptView,
+)
+
+urlpatterns = [
+    path('attempts/<int:attempt_id>/answers/', AnswerBatchView.as_view(), name='attempt_answers'),
+    path('attempts/<int:attempt_id>/submit/', SubmitAttemptView.as_view(), name='attempt_submit'),
+    path('exams/<int:exam_id>/paper/', ExamPaperView.as_view(), name='exam_paper'),
+    path('exams/<int:exam_id>/leaderboard/', LeaderboardView.as_view(), name='exam_leaderboard'),
+    path('exams/<int:exam_id>/results/', ExamResultsExportView.as_view(), name='exam_results'),
+    path('exams/<int:exam_id>/questions/import/', QuestionImportView.as_view(), name='exam_question_import'),
+    path('exams/<int:exam_id>/questions/duplicates/', QuestionDuplicatesView.as_view(), name='exam_question_duplicates'),
+    path('questions/search/', QuestionSearchView.as_view(), name='question_search'),
+    path('progress/', SeriesProgressView.as_view(), name='series_progress'),
+]
@@ -1,3 +1,287 @@
-from django.shortcuts import render
+import csv
+import io
 
-# Create your views here.
+from django.contrib.auth import get_user_model
+from django.http import HttpResponse, HttpResponseNotModified, StreamingHttpResponse
+from django.shortcuts import get_object_or_404
+from django.utils import timezone
+from django.utils.http import parse_etags
+from rest_framework import generics, parsers, permissions, status
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from core.fast_serializers import CompiledSerializer
+
+from .entitlements import HasPurchasedSeries, IsSeriesCreator, get_exam_series
+from .exports import EXPORT_FORMATS, export_results
+from .leaderboard import get_leaderboard
+from .models import Exam, ExamAttempt, Question
+from .papers import get_paper_meta, get_snapshot
+from .progress import dashboard
+from .question_import import OPTION_FIELDS, QuestionImporter, read_rows
+from .search import SEARCH_LIMIT, find_near_duplicates, search_questions
+from .serializers import AnswerBatchSerializer, ExamAttemptSerializer
+from .submissions import SubmissionError, autosave_answers, finish_attempt, submit_answers
+
+User = get_user_model()
+
+attempt_payload = CompiledSerializer(ExamAttemptSerializer)
+
+
+class AttemptMixin:
+    """Looks up the requesting user's own exam attempt from the URL."""
+
+    def get_attempt(self):
+        return get_object_or_404(ExamAttempt, pk=self.kwargs['attempt_id'], user_id=self.request.user.pk)
+
+
+class AnswerBatchView(AttemptMixin, generics.GenericAPIView):
+    """
+    API view for submitting a batch of answers to an exam attempt.
+
+    Answers are upserted in bulk. With `autosave` set they are buffered and
+    written behind, at the flush interval or when the attempt is submitted.
+    """
+    serializer_class = AnswerBatchSerializer
+    permission_classes = [permissions.IsAuthenticated]
+
+    def post(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        attempt = self.get_attempt()
+        save = autosave_answers if serializer.validated_data['autosave'] else submit_answers
+        try:
+            written = save(attempt, serializer.get_pairs())
+        except SubmissionError as exc:
+            return Response({"error": str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+        return Response({
+            "received": len(serializer.validated_data['answers']),
+            "written": written,
+        }, status=status.HTTP_200_OK)
+
+
+class SubmitAttemptView(AttemptMixin, generics.GenericAPIView):
+    """
+    API view for submitting an exam attempt.
+
+    Flushes any buffered answers, marks the attempt completed and grades it.
+    """
+    serializer_class = ExamAttemptSerializer
+    permission_classes = [permissions.IsAuthenticated]
+
+    def post(self, request, *args, **kwargs):
+        try:
+            attempt = finish_attempt(self.get_attempt())
+        except SubmissionError as exc:
+            return Response({"error": str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(attempt_payload.to_representation(attempt), status=status.HTTP_200_OK)
+
+
+class LeaderboardView(APIView):
+    """
+    API view for an exam's leaderboard.
+
+    Returns the top `top` entries (default 10, at most 100) and the requesting
+    user's rank and percentile, served from the in-process rank index.
+    """
+    permission_classes = [permissions.IsAuthenticated, HasPurchasedSeries]
+
+    def get(self, request, exam_id, *args, **kwargs):
+        if not Exam.objects.filter(pk=exam_id).exists():
+            return Response({"error": "Exam not found"}, status=status.HTTP_404_NOT_FOUND)
+        try:
+            limit = min(max(int(request.query_params.get('top', 10)), 1), 100)
+        except ValueError:
+            return Response({"error": "top must be an integer"}, status=status.HTTP_400_BAD_REQUEST)
+
+        board = get_leaderboard(exam_id)
+        top = board.top(limit)
+        names = User.objects.only('first_name', 'last_name').in_bulk([user_id for _rank, user_id, _score in top])
+
+        score = board.score_of(request.user.pk)
+        return Response({
+            "total": len(board),
+            "top": [
+                {
+                    "rank": rank,
+                    "user": user_id,
+                    "name": names[user_id].get_full_name() if user_id in names else "",
+                    "score": score,
+                }
+                for rank, user_id, score in top
+            ],
+            "me": {
+                "rank": board.rank(request.user.pk),
+                "score": score,
+                "percentile": board.percentile(score) if score is not None else None,
+            },
+        }, status=status.HTTP_200_OK)
+
+
+class ExamPaperView(APIView):
+    """
+    API view for fetching a published exam's question paper, without answers.
+
+    Serves an immutable pre-rendered snapshot, gzip-compressed when the client
+    accepts it, with an ETag so unchanged papers revalidate with a 304.
+    """
+    permission_classes = [permissions.IsAuthenticated, HasPurchasedSeries]
+
+    def get(self, request, exam_id, *args, **kwargs):
+        meta = get_paper_meta(exam_id)
+        if meta is None or not meta['is_published']:
+            return Response({"error": "Exam not found"}, status=status.HTTP_404_NOT_FOUND)
+        if meta['scheduled_at'] is not None and meta['scheduled_at'] > timezone.now():
+            return Response({"error": "Exam has not started yet"}, status=status.HTTP_403_FORBIDDEN)
+
+        snapshot = get_snapshot(exam_id, meta['paper_version'])
+        if_none_match = parse_etags(request.headers.get('If-None-Match', ''))
+        if snapshot.etag in if_none_match or '*' in if_none_match:
+            response = HttpResponseNotModified()
+        elif 'gzip' in request.headers.get('Accept-Encoding', ''):
+            response = HttpResponse(snapshot.body, content_type="application/json")
+            response['Content-Encoding'] = 'gzip'
+        else:
+            response = HttpResponse(snapshot.json(), content_type="application/json")
+        response['ETag'] = snapshot.etag
+        response['Cache-Control'] = 'private, no-cache'
+        response['Vary'] = 'Accept-Encoding, Authorization'
+        return response
+
+
+class ExamResultsExportView(APIView):
+    """
+    API view for downloading an exam's result sheet, for the series creator.
+
+    Streams one row per attempt with the user's email, phone, score and chosen
+    option per question, as `?type=csv` (default) or `?type=ndjson`. Add
+    `completed=1` to leave out open attempts. Compressed on the fly when the
+    client accepts gzip.
+    """
+    permission_classes = [permissions.IsAuthenticated, IsSeriesCreator]
+    content_types = {'csv': 'text/csv; charset=utf-8', 'ndjson': 'application/x-ndjson'}
+
+    def get(self, request, exam_id, *args, **kwargs):
+        if not Exam.objects.filter(pk=exam_id).exists():
+            return Response({"error": "Exam not found"}, status=status.HTTP_404_NOT_FOUND)
+        fmt = request.query_params.get('type', 'csv')
+        if fmt not in EXPORT_FORMATS:
+            return Response({"error": f"type must be one of {', '.join(EXPORT_FORMATS)}"}, status=status.HTTP_400_BAD_REQUEST)
+
+        compress = 'gzip' in request.headers.get('Accept-Encoding', '')
+        response = StreamingHttpResponse(
+            export_results(exam_id, fmt, compress=compress, completed_only=request.query_params.get('completed') == '1'),
+            content_type=self.content_types[fmt],
+        )
+        if compress:
+            response['Content-Encoding'] = 'gzip'
+        response['Content-Disposition'] = f'attachment; filename="exam-{exam_id}-results.{fmt}"'
+        response['Vary'] = 'Accept-Encoding, Authorization'
+        return response
+
+
+class QuestionImportView(APIView):
+    """
+    API view for bulk importing questions into an exam, for the series creator.
+
+    Takes a multipart `file` of JSONL or CSV rows with text, option_a-option_d and
+    correct_option. The format follows the file extension unless `format` is given.
+    Invalid rows and duplicates of existing questions are skipped and reported.
+    """
+    permission_classes = [permissions.IsAuthenticated, IsSeriesCreator]
+    parser_classes = [parsers.MultiPartParser]
+    max_reported_errors = 1000
+
+    def post(self, request, exam_id, *args, **kwargs):
+        exam = Exam.objects.filter(pk=exam_id).first()
+        if exam is None:
+            return Response({"error": "Exam not found"}, status=status.HTTP_404_NOT_FOUND)
+        upload = request.FILES.get('file')
+        if upload is None:
+            return Response({"error": "file is required"}, status=status.HTTP_400_BAD_REQUEST)
+        fmt = request.data.get('format') or ('csv' if upload.name.endswith('.csv') else 'jsonl')
+        if fmt not in ('csv', 'jsonl'):
+            return Response({"error": "format must be csv or jsonl"}, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            lines = io.TextIOWrapper(upload, encoding='utf-8', newline='')
+            stats = QuestionImporter(exam).run(read_rows(lines, fmt))
+        except (UnicodeDecodeError, csv.Error) as exc:
+            return Response({"error": f"Unreadable file: {exc}"}, status=status.HTTP_400_BAD_REQUEST)
+        return Response({
+            "rows": stats["rows"],
+            "created": stats["created"],
+            "duplicates": stats["duplicates"],
+            "errors": [
+                {"row": line, "error": message} for line, message in stats["errors"][:self.max_reported_errors]
+            ],
+        }, status=status.HTTP_200_OK)
+
+
+class SeriesProgressView(APIView):
+    """
+    API view for the student dashboard.
+
+    Returns the requesting user's progress in each purchased test series from
+    the materialized progress rows, in a single query.
+    """
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get(self, request, *args, **kwargs):
+        return Response({"series": dashboard(request.user.pk)}, status=status.HTTP_200_OK)
+
+
+class QuestionSearchView(APIView):
+    """
+    API view for searching the question bank.
+
+    Ranks questions matching every word of `q` (the last one as a prefix) by
+    bm25 over the full-text index, hits in the question text weighing more than
+    hits in its options. Creators search the questions of their own test series,
+    staff search all of them. Narrow to one exam with `exam`; `limit` caps the
+    results (default 20, at most 100).
+    """
+    permission_classes = [permissions.IsAuthenticated]
+    max_limit = 100
+
+    def get(self, request, *args, **kwargs):
+        query = request.query_params.get('q', '').strip()
+        if not query:
+            return Response({"error": "q is required"}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            exam_id = int(request.query_params['exam']) if request.query_params.get('exam') else None
+            limit = min(int(request.query_params.get('limit', SEARCH_LIMIT)), self.max_limit)
+        except ValueError:
+            return Response({"error": "exam and limit must be integers"}, status=status.HTTP_400_BAD_REQUEST)
+        user = request.user
+        creator_id = None if user.is_staff or user.is_superuser else user.pk
+        results = search_questions(query, creator_id=creator_id, exam_id=exam_id, limit=max(limit, 1))
+        return Response({"results": results}, status=status.HTTP_200_OK)
+
+
+class QuestionDuplicatesView(APIView):
+    """
+    API view for checking a draft question against the series creator's question bank.
+
+    Takes `text` and option_a-option_d and returns the creator's existing
+    questions, in any of their exams, whose wording is estimated to overlap at
+    least the near-duplicate threshold, most similar first.
+    """
+    permission_classes = [permissions.IsAuthenticated, IsSeriesCreator]
+
+    def post(self, request, exam_id, *args, **kwargs):
+        series = get_exam_series(exam_id)
+        if series is None:
+            return Response({"error": "Exam not found"}, status=status.HTTP_404_NOT_FOUND)
+        text = str(request.data.get('text') or '').strip()
+        if not text:
+            return Response({"error": "text is required"}, status=status.HTTP_400_BAD_REQUEST)
+        options = [str(request.data.get(name) or '').strip() for name in OPTION_FIELDS]
+
+        matches = find_near_duplicates(text, options, creator_id=series[1])
+        texts = dict(Question.objects.filter(pk__in=[pk for pk, _exam, _score in matches]).values_list('pk', 'text'))
+        return Response({
+            "duplicates": [
+                {"id": pk, "exam": exam, "text": texts[pk], "similarity": score} for pk, exam, score in matches
+            ],
+        }, status=status.HTTP_200_OK)
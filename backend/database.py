@@ -0,0 +1,68 @@
+"""
+Database routing: writes go to the primary, opted-in reads to read replicas.
+
+Reads only leave the primary inside `replica_reads()`, which read-mostly code
+such as result exports wraps around its queries. Everything else, and any read
+made while the primary has a transaction open, stays on the primary, so requests
+always read their own writes. Code that stamps what it reads with a version, such
+as paper snapshots and leaderboard rebuilds, must not opt in: replica lag would
+pair old rows with a new version.
+"""
+
+import random
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+_replica_reads = ContextVar('replica_reads', default=False)
+
+
+def read_replicas():
+    return getattr(settings, 'DATABASE_READ_REPLICAS', [])
+
+
+@contextmanager
+def replica_reads():
+    """Let reads in this block (or decorated function) go to a read replica."""
+    token = _replica_reads.set(True)
+    try:
+        yield
+    finally:
+        _replica_reads.reset(token)
+
+
+def replica_alias():
+    """
+    The alias a replica_reads() block would read from right now.
+
+    For querysets evaluated outside the block, such as streamed responses, pass it to `.using()`.
+    """
+    with replica_reads():
+        return PrimaryReplicaRouter().db_for_read(None) or DEFAULT_DB_ALIAS
+
+
+class PrimaryReplicaRouter:
+    """Routes writes to the primary and reads inside replica_reads() to a random replica."""
+
+    def db_for_read(self, model, **hints):
+        replicas = read_replicas()
+        if not replicas or not _replica_reads.get():
+            return None
+        if connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return None
+        return random.choice(replicas)
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        databases = {DEFAULT_DB_ALIAS, *read_replicas()}
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Replicas hold the primary's schema; only the primary is migrated.
+        return db not in read_replicas()
@@ -0,0 +1,317 @@
+"""
+Always-on request profiling: wall time, database time and query counts per view.
+
+RequestProfilingMiddleware gives every database connection one permanent
+execute wrapper that times queries into the recorder of the current request,
+held in a context variable, and, for sampled requests, adds a Server-Timing
+header and folds the numbers into in-process histograms, which
+`metrics_view` renders in the Prometheus text format. Each worker process keeps
+its own histograms, so scrape every worker or aggregate across them.
+
+Settings, all optional, under REQUEST_PROFILING:
+
+    ENABLED             turn the middleware into a pass-through (default True)
+    SAMPLE_RATE         share of requests profiled (default 1.0)
+    ROUTE_SAMPLE_RATES  {url name: rate} overrides, e.g. {'metrics': 0}
+    SERVER_TIMING       add the Server-Timing header (default True)
+    BUCKETS             latency histogram bounds in seconds
+    METRICS_TOKEN       bearer token required by the metrics endpoint; without
+                        one the endpoint answers 403 to everyone
+"""
+
+import random
+import time
+from contextvars import ContextVar
+from threading import Lock
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.signals import request_started
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.http import HttpResponse, HttpResponseForbidden
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100)
+UNMATCHED_VIEW = '<unmatched>'
+
+
+def _options():
+    options = {
+        'ENABLED': True,
+        'SAMPLE_RATE': 1.0,
+        'ROUTE_SAMPLE_RATES': {'metrics': 0.0},
+        'SERVER_TIMING': True,
+        'BUCKETS': DEFAULT_BUCKETS,
+        'METRICS_TOKEN': None,
+    }
+    options.update(getattr(settings, 'REQUEST_PROFILING', {}))
+    return options
+
+
+class QueryRecorder:
+    """execute_wrapper callable that times queries and counts repeats of the same SQL."""
+
+    __slots__ = ('seconds', 'count', 'repeated', '_seen')
+
+    def __init__(self):
+        self.seconds = 0.0
+        self.count = 0
+        self.repeated = 0
+        self._seen = set()
+
+    def __call__(self, execute, sql, params, many, context):
+        # Same SQL with different parameters is the N+1 signature, so params are ignored.
+        if sql in self._seen:
+            self.repeated += 1
+        else:
+            self._seen.add(sql)
+        self.count += 1
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.seconds += time.perf_counter() - start
+
+
+_recorder = ContextVar('request_profiling_recorder', default=None)
+
+
+def record_queries(execute, sql, params, many, context):
+    """Execute wrapper that hands queries to the recorder of the request being profiled, if any."""
+    recorder = _recorder.get()
+    if recorder is None:
+        return execute(sql, params, many, context)
+    return recorder(execute, sql, params, many, context)
+
+
+def install_query_recorder(connection):
+    # Connections reopen after CONN_MAX_AGE on the same wrapper object, so install once.
+    if record_queries not in connection.execute_wrappers:
+        connection.execute_wrappers.insert(0, record_queries)
+
+
+def _connection_created(sender, connection, **kwargs):
+    install_query_recorder(connection)
+
+
+def _request_started(sender, **kwargs):
+    # Connections are per thread. Under ASGI this signal is sent in the thread that
+    # sync views and sync_to_async ORM calls run in, so it reaches the connections
+    # they use, including those opened before the middleware was loaded.
+    for connection in connections.all(initialized_only=True):
+        install_query_recorder(connection)
+
+
+class Histogram:
+    """Cumulative-bucket histogram in the Prometheus layout."""
+
+    __slots__ = ('bounds', 'counts', 'sum', 'count')
+
+    def __init__(self, bounds):
+        self.bounds = tuple(bounds)
+        self.counts = [0] * len(self.bounds)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        for index, bound in enumerate(self.bounds):
+            if value <= bound:
+                self.counts[index] += 1
+                break
+        self.sum += value
+        self.count += 1
+
+    def cumulative(self):
+        total = 0
+        for bound, count in zip(self.bounds, self.counts):
+            total += count
+            yield bound, total
+
+
+class ViewStats:
+    __slots__ = ('latency', 'queries', 'db_seconds', 'repeated_queries', 'errors')
+
+    def __init__(self, buckets):
+        self.latency = Histogram(buckets)
+        self.queries = Histogram(QUERY_BUCKETS)
+        self.db_seconds = 0.0
+        self.repeated_queries = 0
+        self.errors = 0
+
+
+class ProfileRegistry:
+    """Per-process aggregate of profiled requests, keyed by (view, method)."""
+
+    def __init__(self):
+        self._lock = Lock()
+        self._views = {}
+
+    def record(self, view, method, status, seconds, recorder, buckets):
+        with self._lock:
+            stats = self._views.get((view, method))
+            if stats is None:
+                stats = self._views[(view, method)] = ViewStats(buckets)
+            stats.latency.observe(seconds)
+            stats.queries.observe(recorder.count)
+            stats.db_seconds += recorder.seconds
+            stats.repeated_queries += recorder.repeated
+            if status >= 500:
+                stats.errors += 1
+
+    def clear(self):
+        with self._lock:
+            self._views.clear()
+
+    def snapshot(self):
+        with self._lock:
+            return {key: _copy(stats) for key, stats in self._views.items()}
+
+    def render(self):
+        """Return the metrics in the Prometheus text exposition format."""
+        views = sorted(self.snapshot().items())
+        lines = []
+
+        def family(name, kind, help_text, samples):
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            lines.extend(samples)
+
+        def labels(view, method, **extra):
+            pairs = {'view': view, 'method': method, **extra}
+            return '{' + ','.join(f'{key}="{_escape(value)}"' for key, value in pairs.items()) + '}'
+
+        def histogram_samples(name, attribute):
+            for (view, method), stats in views:
+                histogram = getattr(stats, attribute)
+                for bound, count in histogram.cumulative():
+                    yield f"{name}_bucket{labels(view, method, le=_number(bound))} {count}"
+                yield f"{name}_bucket{labels(view, method, le='+Inf')} {histogram.count}"
+                yield f"{name}_sum{labels(view, method)} {_number(histogram.sum)}"
+                yield f"{name}_count{labels(view, method)} {histogram.count}"
+
+        family('http_request_duration_seconds', 'histogram', "Wall time of profiled requests.",
+               histogram_samples('http_request_duration_seconds', 'latency'))
+        family('http_request_queries', 'histogram', "Database queries per profiled request.",
+               histogram_samples('http_request_queries', 'queries'))
+        family('http_request_db_seconds_total', 'counter', "Time spent in database queries.",
+               (f"http_request_db_seconds_total{labels(*key)} {_number(s.db_seconds)}" for key, s in views))
+        family('http_request_repeated_queries_total', 'counter', "Queries repeating SQL already run in the request.",
+               (f"http_request_repeated_queries_total{labels(*key)} {s.repeated_queries}" for key, s in views))
+        family('http_request_errors_total', 'counter', "Profiled requests answered with a 5xx status.",
+               (f"http_request_errors_total{labels(*key)} {s.errors}" for key, s in views))
+        return '\n'.join(lines) + '\n'
+
+
+def _copy(stats):
+    clone = ViewStats(stats.latency.bounds)
+    for name in ('latency', 'queries'):
+        source, target = getattr(stats, name), getattr(clone, name)
+        target.counts, target.sum, target.count = list(source.counts), source.sum, source.count
+    clone.db_seconds, clone.repeated_queries, clone.errors = stats.db_seconds, stats.repeated_queries, stats.errors
+    return clone
+
+
+def _number(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+registry = ProfileRegistry()
+
+
+class RequestProfilingMiddleware:
+    """
+    Profiles a sample of requests and reports them via Server-Timing and `registry`.
+
+    Queries are always timed, which costs a microsecond or so each; the sampling
+    decision is made afterwards from the resolved route, so no request is resolved
+    twice. Unsampled requests are not recorded.
+
+    Queries reach the request's recorder through a context variable, which
+    sync_to_async carries into the threads that async views run their queries
+    in, so the middleware runs natively under both WSGI and ASGI. The wrapper
+    is installed on every connection as it opens, and on the connections of the
+    request's thread when request_started is sent.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+        options = _options()
+        self.enabled = options['ENABLED']
+        self.sample_rate = options['SAMPLE_RATE']
+        self.route_rates = options['ROUTE_SAMPLE_RATES']
+        self.server_timing = options['SERVER_TIMING']
+        self.buckets = tuple(options['BUCKETS'])
+        if self.enabled:
+            connection_created.connect(_connection_created, dispatch_uid='request_profiling')
+            request_started.connect(_request_started, dispatch_uid='request_profiling')
+
+    def view_name(self, request):
+        match = getattr(request, 'resolver_match', None)
+        if match is None:
+            return UNMATCHED_VIEW
+        return match.view_name or match.route
+
+    def sampled(self, view):
+        rate = self.route_rates.get(view, self.sample_rate)
+        return rate >= 1 or (rate > 0 and random.random() < rate)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        if not self.enabled:
+            return self.get_response(request)
+
+        recorder, token = self.start()
+        start = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            _recorder.reset(token)
+        return self.finish(request, response, time.perf_counter() - start, recorder)
+
+    async def __acall__(self, request):
+        if not self.enabled:
+            return await self.get_response(request)
+
+        recorder, token = self.start()
+        start = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            _recorder.reset(token)
+        return self.finish(request, response, time.perf_counter() - start, recorder)
+
+    def start(self):
+        recorder = QueryRecorder()
+        return recorder, _recorder.set(recorder)
+
+    def finish(self, request, response, seconds, recorder):
+        view = self.view_name(request)
+        if not self.sampled(view):
+            return response
+        registry.record(view, request.method, response.status_code, seconds, recorder, self.buckets)
+        if self.server_timing:
+            response['Server-Timing'] = (
+                f'db;dur={recorder.seconds * 1000:.2f};desc="{recorder.count} queries, {recorder.repeated} repeated", '
+                f"total;dur={seconds * 1000:.2f}"
+            )
+        return response
+
+
+def metrics_view(request):
+    """Prometheus scrape endpoint for this process's request histograms, for holders of METRICS_TOKEN."""
+    token = _options()['METRICS_TOKEN']
+    if not token or request.headers.get('Authorization') != f"Bearer {token}":
+        return HttpResponseForbidden()
+    return HttpResponse(registry.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
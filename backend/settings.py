@@ -55,6 +55,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'backend.profiling.RequestProfilingMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     "corsheaders.middleware.CorsMiddleware",
@@ -65,6 +66,16 @@ MIDDLEWARE = [
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 
+# Per-request wall time, DB time and query counts, reported via Server-Timing and
+# /api/metrics/, which answers 403 unless METRICS_TOKEN is set and sent as a bearer
+# token. See backend/profiling.py for the options.
+
+REQUEST_PROFILING = {
+    'SAMPLE_RATE': float(os.getenv('PROFILING_SAMPLE_RATE', '1.0')),
+    'ROUTE_SAMPLE_RATES': {'metrics': 0.0},
+    'METRICS_TOKEN': os.getenv('METRICS_TOKEN') or None,
+}
+
 ROOT_URLCONF = 'backend.urls'
 
 TEMPLATES = [
@@ -88,13 +99,102 @@ WSGI_APPLICATION = 'backend.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
 
+# Every SQLite connection runs these pragmas. WAL lets readers work alongside the
+# single writer, and busy_timeout makes writers queue for the lock instead of
+# failing with "database is locked". IMMEDIATE transactions take the write lock up
+# front, so two transactions never deadlock upgrading from a read lock.
+
+SQLITE_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': os.getenv('SQLITE_SYNCHRONOUS', 'NORMAL'),
+    'mmap_size': int(os.getenv('SQLITE_MMAP_SIZE', 256 * 1024 * 1024)),
+    'cache_size': int(os.getenv('SQLITE_CACHE_SIZE', -64000)),  # negative means KiB
+    'busy_timeout': int(os.getenv('SQLITE_BUSY_TIMEOUT', 5000)),  # ms
+    'foreign_keys': 'ON',
+}
+
+# Connections are kept open for CONN_MAX_AGE seconds (None for ever) and checked
+# before reuse.
+
+DATABASE_CONN_MAX_AGE = int(os.getenv('DATABASE_CONN_MAX_AGE', 600))
+
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        'CONN_MAX_AGE': DATABASE_CONN_MAX_AGE,
+        'CONN_HEALTH_CHECKS': True,
+        'OPTIONS': {
+            'init_command': ';'.join(f"PRAGMA {name}={value}" for name, value in SQLITE_PRAGMAS.items()),
+            'transaction_mode': 'IMMEDIATE',
+        },
     }
 }
 
+# Read replicas, as a comma-separated list of SQLite files; "primary" opens a
+# read-only connection to the primary's own file. Code opts reads into them with
+# backend.database.replica_reads().
+
+DATABASE_READ_REPLICAS = []
+for index, replica in enumerate(filter(None, os.getenv('DATABASE_REPLICAS', '').split(',')), start=1):
+    alias = f'replica{index}'
+    replica_path = DATABASES['default']['NAME'] if replica.strip() == 'primary' else replica.strip()
+    replica_pragmas = {name: value for name, value in SQLITE_PRAGMAS.items() if name != 'journal_mode'}
+    DATABASES[alias] = {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': f"file:{replica_path}?mode=ro",
+        'CONN_MAX_AGE': DATABASE_CONN_MAX_AGE,
+        'CONN_HEALTH_CHECKS': True,
+        'OPTIONS': {
+            'init_command': ';'.join(f"PRAGMA {name}={value}" for name, value in replica_pragmas.items()),
+        },
+        'TEST': {'MIRROR': 'default'},
+    }
+    DATABASE_READ_REPLICAS.append(alias)
+
+DATABASE_ROUTERS = ['backend.database.PrimaryReplicaRouter']
+
+
+# Cache shared by every worker and by the management command loops. Autosave
+# buffers, leaderboard deltas, token revocations and the invalidation of cached
+# entitlements, answer keys and papers all depend on every process seeing the same
+# keys, so any deployment with more than one process must set CACHE_URL to a Redis
+# URL (redis://host:6379/0). Without it each process gets its own local-memory
+# cache, which is only right for runserver and the tests; gunicorn.conf.py refuses
+# to start several workers on it.
+
+CACHE_URL = os.getenv('CACHE_URL', '')
+if CACHE_URL:
+    CACHES = {'default': {'BACKEND': 'django.core.cache.backends.redis.RedisCache', 'LOCATION': CACHE_URL}}
+else:
+    CACHES = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+
+
+# Password hashing
+# PBKDF2 iterations are tunable; hashes made with another count are upgraded on login.
+
+PASSWORD_HASHERS = [
+    'core.hashers.TunablePBKDF2PasswordHasher',
+    'django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher',
+    'django.contrib.auth.hashers.Argon2PasswordHasher',
+    'django.contrib.auth.hashers.BCryptSHA256PasswordHasher',
+    'django.contrib.auth.hashers.ScryptPasswordHasher',
+]
+
+PASSWORD_PBKDF2_ITERATIONS = int(os.getenv("PASSWORD_PBKDF2_ITERATIONS", 1_000_000))
+
+# Bounded pool the async login/register views hash on. KIND is 'thread' or 'process'.
+
+PASSWORD_HASH_POOL = {
+    'KIND': os.getenv("PASSWORD_HASH_POOL_KIND", 'thread'),
+    'WORKERS': int(os.getenv("PASSWORD_HASH_POOL_WORKERS", 4)),
+    'MAX_QUEUE': int(os.getenv("PASSWORD_HASH_POOL_MAX_QUEUE", 64)),
+}
+
+# Serve /api/register/ and /api/login/ with the async views (for backend.asgi).
+
+ASYNC_AUTH_VIEWS = os.getenv("ASYNC_AUTH_VIEWS", "False") == "True"
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -143,10 +243,14 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'core.authentication.CachedJWTAuthentication',
     ),
 }
 
+# Seconds a user's is_active/is_verified snapshot is trusted by CachedJWTAuthentication.
+
+AUTH_SNAPSHOT_TIMEOUT = 60
+
 
 # SimpleJWT config (optional, but good for production)
 
@@ -156,8 +260,33 @@ SIMPLE_JWT = {
     'ROTATE_REFRESH_TOKENS': True,
     'BLACKLIST_AFTER_ROTATION': True,
     'AUTH_HEADER_TYPES': ('Bearer',),
+    'TOKEN_OBTAIN_SERIALIZER': 'core.tokens.RoleTokenObtainPairSerializer',
+    'TOKEN_REFRESH_SERIALIZER': 'core.tokens.RoleTokenRefreshSerializer',
+}
+
+# Rotated and revoked refresh tokens are kept by jti until they expire (core.revocation),
+# instead of in the blacklist app's tables. With CACHE, revocations are also marked in
+# the shared cache, so replays and repeated checks skip the database; a cache miss
+# always checks the table. Run `manage.py sweep_revoked_tokens` to delete expired entries.
+
+TOKEN_REVOCATION = {
+    'CACHE': os.getenv("TOKEN_REVOCATION_CACHE", "False") == "True",
+    'SWEEP_BATCH_SIZE': 10_000,
+    'SWEEP_INTERVAL': 60 * 60,
 }
 
+# Role based access control: access tokens carry the user's permission bitset in
+# this claim so permission checks need no query. Set to None to disable.
+
+RBAC_TOKEN_CLAIM = 'perms'
+RBAC_CACHE_TIMEOUT = 15 * 60
+
+# Seconds a user's set of purchased test series stays cached. Purchases move the user
+# to a new cache version in the shared cache; the short timeout bounds how long a
+# process can act on a set cached from a lagging read.
+
+ENTITLEMENT_CACHE_TIMEOUT = 5 * 60
+
 # Cross-Origin Resource Sharing (CORS) Setup
 
 CORS_ALLOWED_ORIGINS = [
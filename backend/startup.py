@@ -0,0 +1,45 @@
+"""
+One-time process warm-up, for servers that load the app before forking workers.
+
+phonenumbers already loads region metadata lazily, on first use per region, but
+every worker then pays for it again on its first request. `warm_up()` does that
+work, and the URLconf import that pulls in every view, once in the parent so
+forked workers share the pages copy-on-write. Only the regions the project's
+phone fields are configured with are loaded.
+"""
+
+from django.apps import apps
+from django.conf import settings
+from django.db import connections
+from django.urls import get_resolver
+
+
+def phone_regions():
+    """Regions of every PhoneNumberField in the project, plus PHONENUMBER_DEFAULT_REGION."""
+    from phonenumber_field.modelfields import PhoneNumberField
+
+    regions = {getattr(settings, 'PHONENUMBER_DEFAULT_REGION', None)}
+    for model in apps.get_models():
+        for field in model._meta.get_fields():
+            if isinstance(field, PhoneNumberField):
+                regions.add(field.region)
+    regions.discard(None)
+    return sorted(regions)
+
+
+def warm_phone_metadata(regions):
+    """Load and exercise the metadata of `regions` so parsing and validation need no further loading."""
+    import phonenumbers
+
+    for region in regions:
+        example = phonenumbers.example_number(region)
+        if example is not None:
+            number = phonenumbers.format_number(example, phonenumbers.PhoneNumberFormat.E164)
+            phonenumbers.is_valid_number(phonenumbers.parse(number, region))
+
+
+def warm_up():
+    """Import every view and load phone metadata, then drop any database connection opened on the way."""
+    get_resolver().url_patterns
+    warm_phone_metadata(phone_regions())
+    connections.close_all()
@@ -1,7 +1,11 @@
 from django.contrib import admin
 from django.urls import path, include
 
+from .profiling import metrics_view
+
 urlpatterns = [
     path('admin/', admin.site.urls),
+    path('api/metrics/', metrics_view, name='metrics'),
     path('api/', include('core.urls')),
+    path('api/', include('app.urls')),
 ]
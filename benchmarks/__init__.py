@@ -0,0 +1,6 @@
+"""
+Standalone benchmarks for the backend.
+
+Each module is runnable with ``python -m benchmarks.<name>`` from the project root.
+They run against a throwaway SQLite database, never ``db.sqlite3``.
+"""
@@ -0,0 +1,59 @@
+"""
+Compare stock JWTAuthentication with CachedJWTAuthentication on an authenticated read.
+
+    python -m benchmarks.authentication --requests 5000
+"""
+
+import argparse
+
+from .common import seed_users, setup_django, timer
+
+
+def run(view, request_factory, token, count):
+    from django.db import connection
+    from django.test.utils import CaptureQueriesContext
+
+    with CaptureQueriesContext(connection) as queries, timer() as elapsed:
+        for _ in range(count):
+            request = request_factory.get('/api/ping/', HTTP_AUTHORIZATION=f"Bearer {token}")
+            response = view(request)
+            assert response.status_code == 200, response.data
+    return count / elapsed['seconds'], len(queries) / count
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--requests', type=int, default=5000)
+    args = parser.parse_args()
+
+    setup_django()
+    from rest_framework import permissions
+    from rest_framework.response import Response
+    from rest_framework.test import APIRequestFactory
+    from rest_framework.views import APIView
+    from rest_framework_simplejwt.authentication import JWTAuthentication
+
+    from core.authentication import CachedJWTAuthentication
+    from core.tokens import RoleRefreshToken
+
+    def make_view(authentication_class):
+        class PingView(APIView):
+            authentication_classes = [authentication_class]
+            permission_classes = [permissions.IsAuthenticated]
+
+            def get(self, request):
+                return Response({"id": request.user.pk})
+
+        return PingView.as_view()
+
+    user = seed_users(1)[0]
+    token = str(RoleRefreshToken.for_user(user).access_token)
+    factory = APIRequestFactory()
+
+    for name, cls in [('JWTAuthentication', JWTAuthentication), ('CachedJWTAuthentication', CachedJWTAuthentication)]:
+        rps, queries = run(make_view(cls), factory, token, args.requests)
+        print(f"{name:<24} {rps:8.0f} req/s  {queries:.2f} queries/request")
+
+
+if __name__ == '__main__':
+    main()
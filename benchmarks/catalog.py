@@ -0,0 +1,61 @@
+"""
+Compare a catalog page ordered by effective price: SQL annotation versus Python.
+
+    python -m benchmarks.catalog --series 100000
+"""
+
+import argparse
+import random
+from datetime import timedelta
+from decimal import Decimal
+
+from .common import seed_users, setup_django, timer
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--series', type=int, default=100000)
+    parser.add_argument('--page-size', type=int, default=20)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    setup_django()
+    from django.utils import timezone
+
+    from app.models import TestSeries
+
+    creator = seed_users(1)[0]
+    now = timezone.now()
+    rng = random.Random(0)
+    TestSeries.objects.bulk_create([
+        TestSeries(
+            creator=creator, title=f"Series {i}", is_published=True,
+            price=Decimal(rng.randint(0, 500000)) / 100,
+            discount_type=rng.choice([None, 'percent', 'fixed']),
+            discount_value=Decimal(rng.randint(1, 5000)) / 100,
+            discount_start=now - timedelta(days=rng.choice([-2, -1, 1, 2])),
+            discount_end=now + timedelta(days=rng.choice([-2, -1, 1, 2])),
+        )
+        for i in range(args.series)
+    ], batch_size=5000)
+
+    page = args.page_size
+    offset = args.series // 2
+    published = TestSeries.objects.filter(is_published=True)
+
+    with timer() as python:
+        for _ in range(args.repeat):
+            rows = sorted(published, key=lambda s: (s.get_discounted_price(), s.pk))[offset:offset + page]
+
+    with timer() as sql:
+        for _ in range(args.repeat):
+            annotated = list(published.with_effective_price(now).order_by('effective_price', 'pk')[offset:offset + page])
+
+    assert [s.pk for s in rows] == [s.pk for s in annotated]
+    print(f"series:             {args.series}")
+    print(f"python sort page:   {python['seconds'] / args.repeat * 1000:8.1f} ms")
+    print(f"sql annotated page: {sql['seconds'] / args.repeat * 1000:8.1f} ms")
+
+
+if __name__ == '__main__':
+    main()
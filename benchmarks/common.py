@@ -0,0 +1,101 @@
+"""Shared setup and data seeding for the benchmarks."""
+
+import os
+import tempfile
+import time
+from contextlib import contextmanager
+
+
+def setup_django(db_name=None, migrate=True, **database):
+    """Configure Django against a fresh SQLite file and migrate it; `database` overrides the default alias."""
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'backend.settings')
+    os.environ.setdefault('SECRET_KEY', 'benchmark-secret-key')
+
+    from django.conf import settings
+
+    if db_name is None:
+        db_name = os.path.join(tempfile.mkdtemp(prefix='bench-'), 'bench.sqlite3')
+    settings.DATABASES['default']['NAME'] = db_name
+    settings.DATABASES['default'].update(database)
+    settings.DEBUG = False
+
+    import django
+    from django.core.management import call_command
+
+    django.setup()
+    if migrate:
+        call_command('migrate', verbosity=0)
+    return db_name
+
+
+@contextmanager
+def timer():
+    """Yield a dict whose 'seconds' key is filled in when the block exits."""
+    result = {}
+    start = time.perf_counter()
+    try:
+        yield result
+    finally:
+        result['seconds'] = time.perf_counter() - start
+
+
+def seed_users(count, prefix='bench'):
+    """Bulk create `count` users with unusable passwords and return them."""
+    from django.contrib.auth import get_user_model
+
+    User = get_user_model()
+    existing = User.objects.count()
+    users = [
+        User(
+            email=f"{prefix}{existing + i}@example.com",
+            phone=f"+9190{existing + i:08d}",
+            password='!',
+        )
+        for i in range(count)
+    ]
+    return User.objects.bulk_create(users, batch_size=1000)
+
+
+def seed_exam(questions=50, creator=None, **exam_fields):
+    """Create a test series with one exam of `questions` questions and return the exam."""
+    from app.models import Exam, Question, TestSeries
+
+    if creator is None:
+        creator = seed_users(1, prefix='creator')[0]
+    series = TestSeries.objects.create(creator=creator, title='Benchmark series', is_published=True)
+    exam_fields.setdefault('duration_minutes', 60)
+    exam = Exam.objects.create(test_series=series, title='Benchmark exam', is_published=True, **exam_fields)
+    Question.objects.bulk_create([
+        Question(
+            exam=exam,
+            text=f"Question {i}",
+            option_a=f"A{i}", option_b=f"B{i}", option_c=f"C{i}", option_d=f"D{i}",
+            correct_option='ABCD'[i % 4],
+        )
+        for i in range(questions)
+    ])
+    return exam
+
+
+def seed_attempts(exam, users, completed=True, seed=0):
+    """Create one attempt per user on `exam`, each answering every question at random."""
+    import random
+
+    from django.utils import timezone
+
+    from app.models import Answer, ExamAttempt
+
+    rng = random.Random(seed)
+    now = timezone.now() if completed else None
+    attempts = ExamAttempt.objects.bulk_create(
+        [ExamAttempt(user=user, exam=exam, completed_at=now) for user in users],
+        batch_size=1000,
+    )
+    question_ids = list(exam.questions.order_by('pk').values_list('pk', flat=True))
+    answers = [
+        Answer(attempt=attempt, question_id=question_id, selected_option=rng.choice('ABCD'))
+        for attempt in attempts
+        for question_id in question_ids
+    ]
+    Answer.objects.bulk_create(answers, batch_size=2000)
+    return attempts
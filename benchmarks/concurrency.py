@@ -0,0 +1,113 @@
+"""
+Hammer one SQLite file from several processes with stock and tuned connection settings.
+
+    python -m benchmarks.concurrency --writers 4 --readers 4 --seconds 10
+
+Writers upsert an answer inside a transaction that first reads the attempt, the
+way a submission does; readers fetch exam papers. "stock" is Django's default
+SQLite setup (rollback journal, deferred transactions, no pragmas); "tuned" is
+the project's: WAL, synchronous=NORMAL, mmap, a larger cache, busy_timeout and
+IMMEDIATE transactions.
+"""
+
+import argparse
+import multiprocessing
+import os
+import random
+import tempfile
+import time
+
+from .common import seed_exam, seed_users, setup_django
+
+QUESTIONS = 50
+ATTEMPTS = 200
+
+
+def database_settings(mode):
+    """Overrides of the project's database settings, which are the tuned ones."""
+    if mode == 'tuned':
+        return {}
+    return {'OPTIONS': {}, 'CONN_MAX_AGE': 0}
+
+
+def prepare(mode, path):
+    setup_django(path, **database_settings(mode))
+    from app.models import ExamAttempt
+
+    exam = seed_exam(QUESTIONS)
+    users = seed_users(ATTEMPTS)
+    ExamAttempt.objects.bulk_create(ExamAttempt(user=user, exam=exam) for user in users)
+
+
+def worker(role, mode, path, seconds, results):
+    setup_django(path, migrate=False, **database_settings(mode))
+    from django.db import OperationalError, transaction
+
+    from app.models import Answer, ExamAttempt, Question
+
+    attempt_ids = list(ExamAttempt.objects.values_list('pk', flat=True))
+    question_ids = list(Question.objects.values_list('pk', flat=True))
+    exam_id = Question.objects.values_list('exam_id', flat=True).first()
+    rng = random.Random(os.getpid())
+    done = errors = 0
+    deadline = time.monotonic() + seconds
+    while time.monotonic() < deadline:
+        try:
+            if role == 'writer':
+                with transaction.atomic():
+                    attempt = ExamAttempt.objects.only('pk', 'completed_at').get(pk=rng.choice(attempt_ids))
+                    Answer.objects.bulk_create(
+                        [Answer(attempt=attempt, question_id=rng.choice(question_ids), selected_option=rng.choice('ABCD'))],
+                        update_conflicts=True, unique_fields=['attempt', 'question'], update_fields=['selected_option'],
+                    )
+            else:
+                list(Question.objects.filter(exam_id=exam_id).values('pk', 'text', 'option_a', 'option_b'))
+            done += 1
+        except OperationalError as exc:
+            if 'locked' not in str(exc):
+                raise
+            errors += 1
+    results.put((role, done, errors))
+
+
+def run(mode, args):
+    context = multiprocessing.get_context('spawn')
+    path = os.path.join(tempfile.mkdtemp(prefix='bench-'), 'bench.sqlite3')
+    setup = context.Process(target=prepare, args=(mode, path))
+    setup.start()
+    setup.join()
+
+    results = context.Queue()
+    roles = ['writer'] * args.writers + ['reader'] * args.readers
+    processes = [context.Process(target=worker, args=(role, mode, path, args.seconds, results)) for role in roles]
+    for process in processes:
+        process.start()
+    totals = {'writer': [0, 0], 'reader': [0, 0]}
+    for _ in processes:
+        role, done, errors = results.get()
+        totals[role][0] += done
+        totals[role][1] += errors
+    for process in processes:
+        process.join()
+
+    writes, write_errors = totals['writer']
+    reads, read_errors = totals['reader']
+    error_rate = (write_errors + read_errors) / max(writes + reads + write_errors + read_errors, 1)
+    print(
+        f"{mode:>6}: {writes / args.seconds:8.1f} writes/s  {reads / args.seconds:8.1f} reads/s  "
+        f"lock errors {write_errors + read_errors} ({error_rate:.1%})"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--writers', type=int, default=4)
+    parser.add_argument('--readers', type=int, default=4)
+    parser.add_argument('--seconds', type=float, default=10)
+    args = parser.parse_args()
+    for mode in ('stock', 'tuned'):
+        run(mode, args)
+
+
+if __name__ == '__main__':
+    main()
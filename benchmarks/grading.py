@@ -0,0 +1,35 @@
+"""
+Measure how many exam attempts per second the bulk grader scores.
+
+    python -m benchmarks.grading --attempts 5000 --questions 100
+"""
+
+import argparse
+
+from .common import seed_attempts, seed_exam, seed_users, setup_django, timer
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--attempts', type=int, default=2000)
+    parser.add_argument('--questions', type=int, default=100)
+    parser.add_argument('--batch-size', type=int, default=500)
+    args = parser.parse_args()
+
+    setup_django()
+    from app.grading import grade_exam
+
+    exam = seed_exam(args.questions, negative_marking=True, negative_marks_per_question=0.25)
+    seed_attempts(exam, seed_users(args.attempts))
+
+    with timer() as elapsed:
+        graded = grade_exam(exam, batch_size=args.batch_size)
+
+    print(f"attempts graded: {graded}")
+    print(f"answers graded:  {graded * args.questions}")
+    print(f"seconds:         {elapsed['seconds']:.3f}")
+    print(f"attempts/sec:    {graded / elapsed['seconds']:.0f}")
+
+
+if __name__ == '__main__':
+    main()
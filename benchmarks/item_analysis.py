@@ -0,0 +1,56 @@
+"""
+Time item analysis over an exam's answers, vectorized versus a Python ORM loop.
+
+    python -m benchmarks.item_analysis --attempts 10000 --questions 100   # 1M answers
+"""
+
+import argparse
+
+from .common import seed_attempts, seed_exam, seed_users, setup_django, timer
+
+
+def naive_difficulty(exam):
+    """What a straightforward implementation would do: walk Answer objects one by one."""
+    from app.models import Answer
+
+    correct, seen = {}, {}
+    for answer in Answer.objects.filter(attempt__exam=exam, attempt__completed_at__isnull=False).select_related('question'):
+        seen[answer.question_id] = seen.get(answer.question_id, 0) + 1
+        if answer.selected_option == answer.question.correct_option:
+            correct[answer.question_id] = correct.get(answer.question_id, 0) + 1
+    return {pk: correct.get(pk, 0) / count for pk, count in seen.items()}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--attempts', type=int, default=10000)
+    parser.add_argument('--questions', type=int, default=100)
+    parser.add_argument('--naive', action='store_true', help="Also time the ORM loop (difficulty only).")
+    args = parser.parse_args()
+
+    setup_django()
+    from app.item_analysis import get_item_analysis
+
+    exam = seed_exam(args.questions)
+    users = seed_users(args.attempts)
+    seed_attempts(exam, users[: args.attempts - args.attempts // 10])
+
+    answers = args.attempts * args.questions
+    with timer() as full:
+        analysis = get_item_analysis(exam.pk)
+    print(f"answers:               {answers - (args.attempts // 10) * args.questions}")
+    print(f"full analysis:         {full['seconds']:.2f} s  ({analysis.attempts} attempts)")
+
+    seed_attempts(exam, users[args.attempts - args.attempts // 10:], seed=1)
+    with timer() as incremental:
+        analysis = get_item_analysis(exam.pk)
+    print(f"incremental (+10%):    {incremental['seconds']:.2f} s  ({analysis.attempts} attempts)")
+
+    if args.naive:
+        with timer() as naive:
+            naive_difficulty(exam)
+        print(f"naive ORM difficulty:  {naive['seconds']:.2f} s")
+
+
+if __name__ == '__main__':
+    main()
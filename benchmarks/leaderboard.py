@@ -0,0 +1,82 @@
+"""
+Measure leaderboard query latency at increasing sizes.
+
+    python -m benchmarks.leaderboard --sizes 10000 100000 1000000 --db-size 10000
+
+The in-memory index is built directly from synthetic scores. With --db-size the
+ORDER BY / OFFSET queries it replaces are timed against SQLite for comparison.
+"""
+
+import argparse
+import random
+import time
+
+from .common import setup_django
+
+
+def per_call_us(fn, calls):
+    start = time.perf_counter()
+    for i in range(calls):
+        fn(i)
+    return (time.perf_counter() - start) / calls * 1e6
+
+
+def bench_index(size, calls=10000):
+    from app.leaderboard import Leaderboard
+
+    rng = random.Random(size)
+    board = Leaderboard(1, {user_id: rng.randint(-50, 400) * 0.25 for user_id in range(size)})
+    users = [rng.randrange(size) for _ in range(calls)]
+    scores = [rng.uniform(-12.5, 100) for _ in range(calls)]
+    return {
+        'rank': per_call_us(lambda i: board.rank(users[i]), calls),
+        'top10': per_call_us(lambda i: board.top(10), calls),
+        'percentile': per_call_us(lambda i: board.percentile(scores[i]), calls),
+        'record': per_call_us(lambda i: board.record(size + i, scores[i]), calls),
+    }
+
+
+def bench_db(size, calls=200):
+    from django.utils import timezone
+
+    from app.models import ExamAttempt
+    from .common import seed_exam, seed_users
+
+    exam = seed_exam(questions=1)
+    rng = random.Random(0)
+    now = timezone.now()
+    attempts = ExamAttempt.objects.bulk_create(
+        [ExamAttempt(user=user, exam=exam, completed_at=now, score=rng.randint(-50, 400) * 0.25)
+         for user in seed_users(size)],
+        batch_size=2000,
+    )
+    ranked = ExamAttempt.objects.filter(exam=exam, completed_at__isnull=False)
+
+    def rank(i):
+        attempt = attempts[i % size]
+        return ranked.filter(score__gt=attempt.score).count() + 1
+
+    return {
+        'rank': per_call_us(rank, calls),
+        'top10': per_call_us(lambda i: list(ranked.order_by('-score', 'user_id')[:10]), calls),
+        'page@50%': per_call_us(lambda i: list(ranked.order_by('-score', 'user_id')[size // 2:size // 2 + 10]), calls),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10000, 100000, 1000000])
+    parser.add_argument('--db-size', type=int, default=0)
+    args = parser.parse_args()
+
+    setup_django()
+    for size in args.sizes:
+        results = bench_index(size)
+        print(f"index {size:>8}: " + "  ".join(f"{name} {us:7.2f}us" for name, us in results.items()))
+    if args.db_size:
+        results = bench_db(args.db_size)
+        print(f"sql   {args.db_size:>8}: " + "  ".join(f"{name} {us:9.1f}us" for name, us in results.items()))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,464 @@
+"""
+End-to-end load test of the exam lifecycle through the project's WSGI or ASGI application.
+
+    python -m benchmarks.load --server wsgi --users 200 --concurrency 8 --hash-iterations 10000 --output before.json
+    python -m benchmarks.load --server wsgi --users 200 --concurrency 8 --hash-iterations 10000 --output after.json
+    python -m benchmarks.load --compare before.json after.json --threshold 20
+
+Seeds `--exams` published exams of `--questions` questions, each already taken
+and graded by `--background-users` users, then runs `--users` virtual students,
+`--concurrency` at a time. Each one registers, logs in, refreshes its token,
+buys an exam's series, fetches the paper and revalidates it with its ETag,
+autosaves its answers in batches of `--batch`, submits, and reads the exam
+leaderboard and its progress dashboard. Purchases and attempt creation have no
+endpoints and are done through the ORM, untimed.
+
+Requests go through backend.wsgi.application (one thread per concurrent user)
+or backend.asgi.application (one event loop, the async auth views) in process:
+the whole middleware stack, routing, authentication and views, without
+sockets. Queries are counted per request by an execute wrapper on every
+connection that charges the request in a context variable, which
+sync_to_async carries into the threads ASGI runs sync views in.
+
+The JSON result (`--output`, "-" for stdout) has, per endpoint, the request
+and error counts, latency percentiles in milliseconds, throughput over the
+whole run in requests per second and queries per request. `--compare` reads
+two results and exits 1 if an endpoint's p95 grew by more than `--threshold`
+percent or its queries per request went up.
+"""
+
+import argparse
+import asyncio
+import contextvars
+import io
+import json
+import platform
+import random
+import sqlite3
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+
+from .common import seed_attempts, seed_exam, seed_users, setup_django, timer
+
+HOST = 'localhost'
+PASSWORD = 'load-password-1'
+ENDPOINTS = (
+    'register', 'login', 'token_refresh', 'paper', 'paper_revalidate', 'answers', 'submit', 'leaderboard', 'progress',
+)
+
+_request = contextvars.ContextVar('load_request', default=None)
+
+
+def count_queries(execute, sql, params, many, context):
+    counter = _request.get()
+    if counter is not None:
+        counter[0] += 1
+    return execute(sql, params, many, context)
+
+
+def install_query_counter(sender=None, connection=None, **kwargs):
+    # Connections reopen after CONN_MAX_AGE on the same wrapper object; install once. At the front,
+    # clear of execute_wrapper() blocks, which pop the last wrapper when they exit.
+    if count_queries not in connection.execute_wrappers:
+        connection.execute_wrappers.insert(0, count_queries)
+
+
+class Recorder:
+    """Latency and query samples per endpoint; appended to from many threads, which list.append tolerates."""
+
+    def __init__(self):
+        self.samples = {name: [] for name in ENDPOINTS}
+        self.errors = {name: 0 for name in ENDPOINTS}
+        self.failures = []
+
+    def add(self, endpoint, status, seconds, queries, expected):
+        self.samples[endpoint].append((seconds, queries))
+        if status not in expected:
+            self.errors[endpoint] += 1
+            return False
+        return True
+
+
+def _headers(token, body, extra):
+    headers = [('host', HOST), ('content-type', 'application/json'), ('content-length', str(len(body)))]
+    if token:
+        headers.append(('authorization', f'Bearer {token}'))
+    headers.extend(extra)
+    return headers
+
+
+class WSGIClient:
+    """Calls backend.wsgi.application on a pool of `concurrency` threads."""
+
+    def __init__(self, concurrency):
+        from backend.wsgi import application
+
+        self.application = application
+        self.pool = ThreadPoolExecutor(concurrency)
+
+    def _call(self, method, path, body, token, extra):
+        environ = {
+            'REQUEST_METHOD': method, 'PATH_INFO': path, 'QUERY_STRING': '', 'SCRIPT_NAME': '',
+            'SERVER_NAME': HOST, 'SERVER_PORT': '80', 'SERVER_PROTOCOL': 'HTTP/1.1', 'REMOTE_ADDR': '127.0.0.1',
+            'wsgi.version': (1, 0), 'wsgi.url_scheme': 'http', 'wsgi.input': io.BytesIO(body),
+            'wsgi.errors': sys.stderr, 'wsgi.multithread': True, 'wsgi.multiprocess': False, 'wsgi.run_once': False,
+        }
+        for name, value in _headers(token, body, extra):
+            key = name.upper().replace('-', '_')
+            environ[key if key in ('CONTENT_TYPE', 'CONTENT_LENGTH') else f'HTTP_{key}'] = value
+        response = {}
+
+        def start_response(status, headers, exc_info=None):
+            response['status'] = int(status.split(' ', 1)[0])
+            response['headers'] = {name.lower(): value for name, value in headers}
+
+        counter = [0]
+        context = _request.set(counter)
+        start = time.perf_counter()
+        try:
+            chunks = self.application(environ, start_response)
+            try:
+                content = b''.join(chunks)
+            finally:
+                if hasattr(chunks, 'close'):
+                    chunks.close()
+        finally:
+            seconds = time.perf_counter() - start
+            _request.reset(context)
+        return response['status'], response['headers'], content, seconds, counter[0]
+
+    async def request(self, method, path, body, token, extra):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.pool, self._call, method, path, body, token, extra)
+
+    async def run_sync(self, function, *args):
+        return await asyncio.get_running_loop().run_in_executor(self.pool, function, *args)
+
+    def close(self):
+        self.pool.shutdown()
+
+
+class ASGIClient:
+    """Awaits backend.asgi.application directly on the running event loop."""
+
+    def __init__(self, concurrency):
+        from asgiref.sync import sync_to_async
+
+        from backend.asgi import application
+
+        self.application = application
+        self.sync_to_async = sync_to_async
+
+    async def request(self, method, path, body, token, extra):
+        scope = {
+            'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1', 'method': method, 'scheme': 'http',
+            'path': path, 'raw_path': path.encode(), 'query_string': b'', 'root_path': '',
+            'headers': [(name.encode(), value.encode()) for name, value in _headers(token, body, extra)],
+            'client': ('127.0.0.1', 0), 'server': (HOST, 80),
+        }
+        received = asyncio.Event()
+        response = {'body': []}
+
+        async def receive():
+            if not received.is_set():
+                received.set()
+                return {'type': 'http.request', 'body': body, 'more_body': False}
+            # Nothing else arrives; Django cancels this wait once the response is sent.
+            await asyncio.Future()
+
+        async def send(message):
+            if message['type'] == 'http.response.start':
+                response['status'] = message['status']
+                response['headers'] = {name.decode().lower(): value.decode() for name, value in message['headers']}
+            elif message['type'] == 'http.response.body':
+                response['body'].append(message.get('body', b''))
+
+        counter = [0]
+        context = _request.set(counter)
+        start = time.perf_counter()
+        try:
+            await self.application(scope, receive, send)
+        finally:
+            seconds = time.perf_counter() - start
+            _request.reset(context)
+        return response['status'], response['headers'], b''.join(response['body']), seconds, counter[0]
+
+    async def run_sync(self, function, *args):
+        return await self.sync_to_async(function, thread_sensitive=True)(*args)
+
+    def close(self):
+        pass
+
+
+class StepFailed(Exception):
+    pass
+
+
+class Student:
+    """One virtual user walking through the exam lifecycle; stops at the first failed step."""
+
+    def __init__(self, client, recorder, index, exam, batch):
+        self.client = client
+        self.recorder = recorder
+        self.index = index
+        self.exam = exam
+        self.batch = batch
+        self.access = self.refresh = None
+
+    async def call(self, endpoint, method, path, payload=None, expected=(200,), headers=()):
+        body = json.dumps(payload).encode() if payload is not None else b''
+        status, response_headers, content, seconds, queries = await self.client.request(
+            method, path, body, self.access, list(headers),
+        )
+        if not self.recorder.add(endpoint, status, seconds, queries, expected):
+            raise StepFailed(f"{endpoint} returned {status}: {content[:200]!r}")
+        return response_headers, json.loads(content) if content else None
+
+    async def run(self):
+        try:
+            await self.lifecycle()
+        except StepFailed as exc:
+            self.recorder.failures.append(f"student {self.index}: {exc}")
+
+    async def lifecycle(self):
+        email = f"load{self.index}@example.com"
+        credentials = {'email': email, 'password': PASSWORD}
+        await self.call('register', 'POST', '/api/register/', {
+            **credentials, 'phone': f"+9192{self.index:08d}", 'first_name': 'Load', 'last_name': str(self.index),
+        }, expected=(201,))
+        _, data = await self.call('login', 'POST', '/api/login/', credentials)
+        self.access, self.refresh = data['tokens']['access'], data['tokens']['refresh']
+        _, data = await self.call('token_refresh', 'POST', '/api/token/refresh/', {'refresh': self.refresh})
+        self.access, self.refresh = data['access'], data.get('refresh', self.refresh)
+
+        attempt_id = await self.client.run_sync(buy_and_start, email, self.exam)
+        paper = f'/api/exams/{self.exam.pk}/paper/'
+        headers, data = await self.call('paper', 'GET', paper)
+        question_ids = [question['id'] for question in data['questions']]
+        await self.call(
+            'paper_revalidate', 'GET', paper, expected=(304,), headers=[('if-none-match', headers['etag'])],
+        )
+
+        rng = random.Random(self.index)
+        for start in range(0, len(question_ids), self.batch):
+            answers = [
+                {'question': question_id, 'selected_option': rng.choice('ABCD')}
+                for question_id in question_ids[start:start + self.batch]
+            ]
+            await self.call('answers', 'POST', f'/api/attempts/{attempt_id}/answers/', {
+                'answers': answers, 'autosave': True,
+            })
+        await self.call('submit', 'POST', f'/api/attempts/{attempt_id}/submit/')
+        await self.call('leaderboard', 'GET', f'/api/exams/{self.exam.pk}/leaderboard/')
+        await self.call('progress', 'GET', '/api/progress/')
+
+
+def buy_and_start(email, exam):
+    """Purchase the exam's series and open an attempt, as the checkout and exam start would; returns the attempt id."""
+    from app.models import ExamAttempt, Purchase
+    from core.models import User
+
+    user_id = User.objects.values_list('pk', flat=True).get(email=email)
+    Purchase.objects.create(user_id=user_id, test_series_id=exam.test_series_id)
+    return ExamAttempt.objects.create(user_id=user_id, exam=exam).pk
+
+
+def seed(args):
+    from app.grading import grade_exam
+
+    creator = seed_users(1, prefix='creator')[0]
+    background = seed_users(args.background_users, prefix='background')
+    exams = []
+    for _ in range(args.exams):
+        exam = seed_exam(questions=args.questions, creator=creator)
+        seed_attempts(exam, background)
+        grade_exam(exam)
+        exams.append(exam)
+    return exams
+
+
+async def drive(client, recorder, exams, args):
+    semaphore = asyncio.Semaphore(args.concurrency)
+    rng = random.Random(0)
+
+    async def one(index):
+        async with semaphore:
+            await Student(client, recorder, index, rng.choice(exams), args.batch).run()
+
+    await asyncio.gather(*(one(index) for index in range(args.users)))
+
+
+def percentile(ordered, share):
+    """Nearest-rank percentile of an ascending list."""
+    return ordered[min(len(ordered) - 1, max(0, round(share * len(ordered)) - 1))]
+
+
+def summarize(recorder, seconds):
+    endpoints = {}
+    for name in ENDPOINTS:
+        samples = recorder.samples[name]
+        if not samples:
+            continue
+        latencies = sorted(latency * 1000 for latency, _queries in samples)
+        queries = [count for _latency, count in samples]
+        endpoints[name] = {
+            'requests': len(samples),
+            'errors': recorder.errors[name],
+            'throughput': round(len(samples) / seconds, 2),
+            'latency_ms': {
+                'p50': round(percentile(latencies, 0.50), 3),
+                'p95': round(percentile(latencies, 0.95), 3),
+                'p99': round(percentile(latencies, 0.99), 3),
+                'mean': round(sum(latencies) / len(latencies), 3),
+                'max': round(latencies[-1], 3),
+            },
+            'queries': {'mean': round(sum(queries) / len(queries), 2), 'max': max(queries)},
+        }
+    requests = sum(endpoint['requests'] for endpoint in endpoints.values())
+    return {
+        'seconds': round(seconds, 3),
+        'requests': requests,
+        'errors': sum(recorder.errors.values()),
+        'throughput': round(requests / seconds, 2),
+        'failed_students': len(recorder.failures),
+    }, endpoints
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(args):
+    setup_django()
+    import django
+    from django.conf import settings
+    from django.db import connections
+    from django.db.backends.signals import connection_created
+
+    from core.hashers import TunablePBKDF2PasswordHasher
+
+    settings.ALLOWED_HOSTS = [HOST]
+    # The URLconf picks the login and register views when first loaded, so this must precede any request.
+    settings.ASYNC_AUTH_VIEWS = args.server == 'asgi'
+    if args.hash_iterations:
+        TunablePBKDF2PasswordHasher.iterations = args.hash_iterations
+    connection_created.connect(install_query_counter)
+    for connection in connections.all():
+        install_query_counter(connection=connection)
+
+    with timer() as seeding:
+        exams = seed(args)
+    print(f"seeded {args.exams} exams x {args.questions} questions, {args.background_users} graded attempts each "
+          f"in {seeding['seconds']:.1f}s", file=sys.stderr)
+
+    client = (ASGIClient if args.server == 'asgi' else WSGIClient)(args.concurrency)
+    recorder = Recorder()
+    with timer() as elapsed:
+        asyncio.run(drive(client, recorder, exams, args))
+    client.close()
+
+    totals, endpoints = summarize(recorder, elapsed['seconds'])
+    return {
+        'meta': {
+            'commit': git_commit(),
+            'started_at': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+            'server': args.server,
+            'users': args.users,
+            'concurrency': args.concurrency,
+            'exams': args.exams,
+            'questions': args.questions,
+            'background_users': args.background_users,
+            'batch': args.batch,
+            'hash_iterations': TunablePBKDF2PasswordHasher.iterations,
+            'python': platform.python_version(),
+            'django': django.get_version(),
+            'sqlite': sqlite3.sqlite_version,
+        },
+        'totals': totals,
+        'endpoints': endpoints,
+        'failures': recorder.failures[:20],
+    }
+
+
+def print_table(result, out):
+    totals = result['totals']
+    print(f"{'endpoint':<17}{'requests':>9}{'errors':>7}{'req/s':>9}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}"
+          f"{'queries':>9}", file=out)
+    for name, stats in result['endpoints'].items():
+        latency = stats['latency_ms']
+        print(f"{name:<17}{stats['requests']:>9}{stats['errors']:>7}{stats['throughput']:>9.1f}{latency['p50']:>9.2f}"
+              f"{latency['p95']:>9.2f}{latency['p99']:>9.2f}{stats['queries']['mean']:>9.1f}", file=out)
+    print(f"{totals['requests']} requests in {totals['seconds']:.1f}s, {totals['throughput']:.1f} req/s, "
+          f"{totals['errors']} errors, {totals['failed_students']} students stopped early", file=out)
+    for failure in result['failures'][:5]:
+        print(f"  {failure}", file=out)
+
+
+def compare(base, new, threshold):
+    """Print per-endpoint changes between two results; return True if any endpoint regressed."""
+    regressed = False
+    print(f"{base['meta']['commit']} -> {new['meta']['commit']}")
+    differing = [
+        f"{key} {base['meta'].get(key)} -> {value}" for key, value in new['meta'].items()
+        if key not in ('commit', 'started_at') and base['meta'].get(key) != value
+    ]
+    if differing:
+        print(f"runs differ in configuration: {', '.join(differing)}")
+    for name, after in new['endpoints'].items():
+        before = base['endpoints'].get(name)
+        if before is None:
+            print(f"{name:<17} new endpoint")
+            continue
+        p95_before, p95_after = before['latency_ms']['p95'], after['latency_ms']['p95']
+        change = (p95_after - p95_before) / p95_before * 100 if p95_before else 0.0
+        queries_before, queries_after = before['queries']['mean'], after['queries']['mean']
+        flags = []
+        if change > threshold:
+            flags.append('SLOWER')
+        if queries_after > queries_before:
+            flags.append('MORE QUERIES')
+        regressed = regressed or bool(flags)
+        print(f"{name:<17} p95 {p95_before:9.2f} -> {p95_after:9.2f} ms ({change:+6.1f}%)  "
+              f"queries {queries_before:5.1f} -> {queries_after:5.1f}  {' '.join(flags)}")
+    return regressed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--server', choices=['wsgi', 'asgi'], default='wsgi')
+    parser.add_argument('--users', type=int, default=200, help="Virtual students walking through the lifecycle.")
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--exams', type=int, default=5)
+    parser.add_argument('--questions', type=int, default=50, help="Questions per exam.")
+    parser.add_argument('--background-users', type=int, default=1000, help="Graded attempts per exam before the run.")
+    parser.add_argument('--batch', type=int, default=10, help="Answers per autosave request.")
+    parser.add_argument('--hash-iterations', type=int, help="PBKDF2 iterations (default: the project's).")
+    parser.add_argument('--output', help="Write the JSON result to this file, or '-' for stdout.")
+    parser.add_argument('--compare', nargs=2, metavar=('BASE', 'NEW'), help="Compare two JSON results and exit.")
+    parser.add_argument('--threshold', type=float, default=20.0, help="p95 growth in percent that counts as a regression.")
+    args = parser.parse_args()
+
+    if args.compare:
+        with open(args.compare[0]) as base, open(args.compare[1]) as new:
+            sys.exit(1 if compare(json.load(base), json.load(new), args.threshold) else 0)
+
+    result = run(args)
+    print_table(result, sys.stderr if args.output == '-' else sys.stdout)
+    if args.output == '-':
+        json.dump(result, sys.stdout, indent=2)
+        print()
+    elif args.output:
+        with open(args.output, 'w') as handle:
+            json.dump(result, handle, indent=2)
+
+
+if __name__ == '__main__':
+    main()
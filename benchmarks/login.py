@@ -0,0 +1,65 @@
+"""
+Measure async login throughput against password hash pool size.
+
+    python -m benchmarks.login --logins 200 --concurrency 50 --workers 1 2 4 8
+
+Each configuration fires `--concurrency` logins at once on one event loop,
+the way a login storm reaches an ASGI worker, until `--logins` have completed.
+"""
+
+import argparse
+import asyncio
+import json
+
+from .common import setup_django, timer
+
+
+async def storm(view, factory, logins, concurrency):
+    body = json.dumps({"email": "storm@example.com", "password": "storm-password"})
+    semaphore = asyncio.Semaphore(concurrency)
+    statuses = {}
+
+    async def one():
+        async with semaphore:
+            request = factory.post('/api/login/', body, content_type='application/json')
+            response = await view(request)
+            statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+
+    await asyncio.gather(*(one() for _ in range(logins)))
+    return statuses
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--logins', type=int, default=200)
+    parser.add_argument('--concurrency', type=int, default=50)
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4, 8])
+    parser.add_argument('--kind', choices=['thread', 'process'], default='thread')
+    parser.add_argument('--max-queue', type=int, default=1000)
+    parser.add_argument('--iterations', type=int, default=100_000, help="PBKDF2 iterations.")
+    args = parser.parse_args()
+
+    setup_django()
+    from django.conf import settings
+    from django.test import AsyncRequestFactory
+
+    from core.hashers import TunablePBKDF2PasswordHasher, reset_hash_pool
+    from core.models import User
+    from core.views import AsyncLoginView
+
+    TunablePBKDF2PasswordHasher.iterations = args.iterations
+    User.objects.create_user(email="storm@example.com", password="storm-password", phone="+919811111111")
+    view = AsyncLoginView.as_view()
+    factory = AsyncRequestFactory()
+
+    for workers in args.workers:
+        settings.PASSWORD_HASH_POOL = {'KIND': args.kind, 'WORKERS': workers, 'MAX_QUEUE': args.max_queue}
+        reset_hash_pool()
+        with timer() as elapsed:
+            statuses = asyncio.run(storm(view, factory, args.logins, args.concurrency))
+        print(f"workers {workers:>2}: {args.logins / elapsed['seconds']:7.1f} logins/s  statuses {statuses}")
+    reset_hash_pool()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,53 @@
+"""
+Measure what the request profiling middleware adds to a request that runs a few queries.
+
+    python -m benchmarks.profiling --requests 5000 --queries 5
+"""
+
+import argparse
+
+from .common import seed_exam, setup_django, timer
+
+
+def run(view, count):
+    from django.test import RequestFactory
+
+    factory = RequestFactory()
+    with timer() as elapsed:
+        for _ in range(count):
+            response = view(factory.get('/api/exams/1/paper/'))
+            assert response.status_code == 200
+    return elapsed['seconds'] / count * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--requests', type=int, default=5000)
+    parser.add_argument('--queries', type=int, default=5, help="Queries the benchmark view runs per request.")
+    args = parser.parse_args()
+
+    setup_django()
+    from django.db import connection
+    from django.http import HttpResponse
+
+    from app.models import Question
+    from backend.profiling import RequestProfilingMiddleware, install_query_recorder
+
+    exam = seed_exam(args.queries)
+    question_ids = list(Question.objects.filter(exam=exam).values_list('pk', flat=True))
+
+    def view(request):
+        for pk in question_ids:
+            Question.objects.filter(pk=pk).exists()
+        return HttpResponse("ok")
+
+    plain = run(view, args.requests)
+    # Done by request_started in a real handler, which this benchmark bypasses.
+    install_query_recorder(connection)
+    profiled = run(RequestProfilingMiddleware(view), args.requests)
+    print(f"without middleware:  {plain:8.1f} us/request")
+    print(f"with middleware:     {profiled:8.1f} us/request  (+{profiled - plain:.1f} us)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,117 @@
+"""
+Compare the materialized progress dashboard with aggregating attempts on the fly.
+
+    python -m benchmarks.progress --users 5000 --series 50 --exams 10 --purchases 5 --attempts 20
+
+"live" builds the same rows per request: the user's purchases, one grouped
+aggregate over their completed attempts and one exam count query. "materialized"
+is app.progress.dashboard(). Also times the full rebuild and the incremental
+refresh that follows grading one attempt.
+"""
+
+import argparse
+import random
+
+from .common import seed_users, setup_django, timer
+
+
+def seed(args):
+    from django.utils import timezone
+
+    from app.models import Exam, ExamAttempt, Purchase, TestSeries
+
+    rng = random.Random(0)
+    users = seed_users(args.users)
+    series = TestSeries.objects.bulk_create(
+        TestSeries(creator=users[0], title=f"Series {i}", is_published=True) for i in range(args.series)
+    )
+    exams = Exam.objects.bulk_create(
+        Exam(test_series=item, title=f"Exam {i}", duration_minutes=60, is_published=True)
+        for item in series for i in range(args.exams)
+    )
+    by_series = {}
+    for exam in exams:
+        by_series.setdefault(exam.test_series_id, []).append(exam)
+
+    now = timezone.now()
+    purchases, attempts = [], []
+    for user in users:
+        owned = rng.sample(series, args.purchases)
+        purchases.extend(Purchase(user=user, test_series=item) for item in owned)
+        for _ in range(args.attempts):
+            exam = rng.choice(by_series[rng.choice(owned).pk])
+            attempts.append(ExamAttempt(user=user, exam=exam, completed_at=now, deadline=now, score=rng.randint(0, 100)))
+    # bulk_create sends no signals, so the progress rows start empty until the rebuild.
+    Purchase.objects.bulk_create(purchases, batch_size=1000)
+    ExamAttempt.objects.bulk_create(attempts, batch_size=1000)
+    return [user.pk for user in users]
+
+
+def live_dashboard(user_id):
+    from django.db.models import Count
+
+    from app.models import Exam, Purchase
+    from app.progress import EMPTY_PROGRESS, aggregate_progress
+
+    purchases = list(Purchase.objects.filter(user_id=user_id).values_list('test_series_id', 'test_series__title'))
+    progress = aggregate_progress((user_id, series_id) for series_id, _title in purchases)
+    totals = dict(
+        Exam.objects.filter(test_series_id__in=[series_id for series_id, _title in purchases])
+        .values('test_series_id').annotate(total=Count('pk')).values_list('test_series_id', 'total')
+    )
+    rows = []
+    for series_id, title in sorted(purchases):
+        values = progress.get((user_id, series_id), EMPTY_PROGRESS)
+        total = totals.get(series_id, 0)
+        rows.append({
+            'test_series': series_id, 'title': title, 'exams_total': total, **values,
+            'completion': round(100 * values['exams_attempted'] / total, 1) if total else 0.0,
+        })
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--users', type=int, default=5000)
+    parser.add_argument('--series', type=int, default=50)
+    parser.add_argument('--exams', type=int, default=10, help="Exams per series.")
+    parser.add_argument('--purchases', type=int, default=5, help="Series bought per user.")
+    parser.add_argument('--attempts', type=int, default=20, help="Completed attempts per user.")
+    parser.add_argument('--requests', type=int, default=2000)
+    args = parser.parse_args()
+
+    setup_django()
+    from django.db import connection
+    from django.test.utils import CaptureQueriesContext
+
+    from app.progress import dashboard, rebuild_progress, record_attempts
+
+    user_ids = seed(args)
+    with timer() as elapsed:
+        processed = rebuild_progress()
+    print(f"rebuild: {processed} purchases in {elapsed['seconds']:.2f}s ({processed / elapsed['seconds']:.0f}/s)")
+
+    sample = random.Random(1).choices(user_ids, k=args.requests)
+    assert all(live_dashboard(user_id) == dashboard(user_id) for user_id in sample[:50])
+    for label, build in (('live', live_dashboard), ('materialized', dashboard)):
+        with CaptureQueriesContext(connection) as queries:
+            build(sample[0])
+        with timer() as elapsed:
+            for user_id in sample:
+                build(user_id)
+        print(
+            f"{label:<13} {args.requests / elapsed['seconds']:8.0f} dashboards/s  "
+            f"{elapsed['seconds'] / args.requests * 1e6:7.0f} us each  {len(queries)} queries"
+        )
+
+    from app.models import ExamAttempt
+
+    graded = list(ExamAttempt.objects.order_by('?').values_list('user_id', 'exam_id')[:args.requests])
+    with timer() as elapsed:
+        for pair in graded:
+            record_attempts([pair])
+    print(f"incremental refresh after grading: {elapsed['seconds'] / len(graded) * 1e6:.0f} us per attempt")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,72 @@
+"""
+Time the bulk question importer against saving questions one at a time.
+
+    python -m benchmarks.question_import --questions 20000 --batch-size 500
+"""
+
+import argparse
+import json
+
+from .common import seed_exam, setup_django, timer
+
+
+def make_rows(count, duplicate_every=20, invalid_every=50):
+    """JSONL lines with a duplicate and an invalid row sprinkled in at fixed intervals."""
+    lines = []
+    for i in range(count):
+        n = i - 1 if i and i % duplicate_every == 0 else i
+        row = {
+            "text": f"Imported question {n}",
+            "option_a": f"a{n}", "option_b": f"b{n}", "option_c": f"c{n}", "option_d": f"d{n}",
+            "correct_option": 'ABCD'[n % 4] if i % invalid_every else 'E',
+        }
+        lines.append(json.dumps(row) + "\n")
+    return lines
+
+
+def naive_import(exam, lines):
+    """One validated save per row, as the admin does."""
+    from django.core.exceptions import ValidationError
+
+    from app.models import Question
+
+    for line in lines:
+        question = Question(exam=exam, **json.loads(line))
+        try:
+            question.full_clean()
+        except ValidationError:
+            continue
+        question.save()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--questions', type=int, default=20000)
+    parser.add_argument('--batch-size', type=int, default=500)
+    parser.add_argument('--naive', type=int, default=2000, help="Rows for the row-by-row baseline (0 to skip).")
+    args = parser.parse_args()
+
+    setup_django()
+    from app.question_import import QuestionImporter, read_rows
+
+    lines = make_rows(args.questions)
+    exam = seed_exam(0)
+    with timer() as bulk:
+        stats = QuestionImporter(exam, batch_size=args.batch_size).run(read_rows(lines))
+    print(f"rows:               {stats['rows']}")
+    print(f"created:            {stats['created']}  duplicates {stats['duplicates']}  errors {len(stats['errors'])}")
+    print(f"bulk import:        {bulk['seconds']:.2f} s  ({stats['rows'] / bulk['seconds']:.0f} rows/s)")
+
+    with timer() as again:
+        stats = QuestionImporter(exam, batch_size=args.batch_size).run(read_rows(lines))
+    print(f"re-import (dupes):  {again['seconds']:.2f} s  ({stats['duplicates']} duplicates)")
+
+    if args.naive:
+        exam = seed_exam(0)
+        with timer() as naive:
+            naive_import(exam, lines[:args.naive])
+        print(f"row-by-row saves:   {naive['seconds']:.2f} s  ({args.naive / naive['seconds']:.0f} rows/s)")
+
+
+if __name__ == '__main__':
+    main()
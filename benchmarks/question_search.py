@@ -0,0 +1,191 @@
+"""
+Measure question bank search and near-duplicate detection at scale.
+
+    python -m benchmarks.question_search --questions 500000 --creators 50 --queries 200
+
+Seeds `--questions` synthetic questions spread over `--creators` authors, one
+in a hundred being a reworded copy of an earlier question by the same
+author. Times:
+
+- bulk inserting them (the FTS5 triggers run inside the INSERTs) and
+  computing their MinHash signatures;
+- app.search.search_questions() against the ORM's `icontains` filters for the
+  same words, over the whole bank, for two words of a question picked as its
+  rarest ("specific") and its most common ("broad"). The icontains baseline
+  is unranked and stops at the first 20 rows, which flatters it on broad
+  queries;
+- find_near_duplicates() within an author's bank against a brute-force
+  Jaccard comparison with each of the author's questions, along with how
+  many planted copies each one finds.
+"""
+
+import argparse
+import random
+import statistics
+
+from .common import seed_users, setup_django, timer
+
+VOCABULARY = 5000
+WORDS_PER_QUESTION = (15, 30)
+
+
+def words(rng):
+    # Zipf-like word frequencies, so common words are shared by many questions, as in real text.
+    # Fixed-width tokens, so a prefix query for one word does not also match longer ones.
+    return [f"w{int(rng.paretovariate(1.1)) % VOCABULARY:04d}{rng.randrange(40):02d}" for _ in range(rng.randint(*WORDS_PER_QUESTION))]
+
+
+def reword(rng, text):
+    """A near copy, as a careless re-entry would make: different case and spacing, the last word replaced."""
+    tokens = text.upper().split()
+    tokens[-1] = f"changed{rng.randrange(100)}"
+    return '  '.join(tokens)
+
+
+def seed(args):
+    from app.models import Exam, Question, TestSeries
+    from app.search import index_questions
+
+    rng = random.Random(0)
+    creators = seed_users(args.creators, prefix='author')
+    series = TestSeries.objects.bulk_create(TestSeries(creator=user, title=f"Series {user.pk}") for user in creators)
+    exams = Exam.objects.bulk_create(
+        Exam(test_series=item, title=f"Exam {i}", duration_minutes=60) for item in series for i in range(10)
+    )
+    by_creator = {}
+    for exam, item in zip(exams, [item for item in series for _ in range(10)]):
+        by_creator.setdefault(item.creator_id, []).append(exam)
+
+    planted = []  # (creator_id, copy text, options, original index)
+    texts = []
+    inserted = indexed = 0.0
+    batch_size = 5000
+    for start in range(0, args.questions, batch_size):
+        batch = []
+        for i in range(start, min(start + batch_size, args.questions)):
+            creator = creators[i % len(creators)]
+            if i % 100 == 99 and texts:
+                original = rng.randrange(max(0, len(texts) - 5000), len(texts))
+                creator_id, text, options = texts[original]
+                creator, text = next(user for user in creators if user.pk == creator_id), reword(rng, text)
+                planted.append((creator_id, text, options, original))
+            else:
+                text, options = ' '.join(words(rng)), [' '.join(words(rng)[:3]) for _ in range(4)]
+            texts.append((creator.pk, text, options))
+            batch.append(Question(
+                exam=rng.choice(by_creator[creator.pk]), text=text, correct_option='A',
+                option_a=options[0], option_b=options[1], option_c=options[2], option_d=options[3],
+            ))
+        with timer() as elapsed:
+            Question.objects.bulk_create(batch, batch_size=1000)
+        inserted += elapsed['seconds']
+        with timer() as elapsed:
+            index_questions(batch)
+        indexed += elapsed['seconds']
+    print(
+        f"seeded {args.questions} questions: insert with FTS triggers {inserted:.1f}s, "
+        f"signatures {indexed:.1f}s ({args.questions / indexed:.0f}/s)"
+    )
+    return texts, planted
+
+
+def percentiles(samples):
+    samples = sorted(samples)
+    return statistics.median(samples) * 1e3, samples[int(len(samples) * 0.95)] * 1e3
+
+
+def time_each(function, inputs):
+    samples, results = [], []
+    for value in inputs:
+        with timer() as elapsed:
+            results.append(function(value))
+        samples.append(elapsed['seconds'])
+    return samples, results
+
+
+def bench_search(args, texts):
+    from django.db.models import Q
+
+    from app.models import Question
+    from app.search import search_questions
+
+    frequency = {}
+    for _creator_id, text, _options in texts:
+        for word in text.split():
+            frequency[word] = frequency.get(word, 0) + 1
+    rng = random.Random(1)
+    query_sets = {'specific': [], 'broad': []}
+    for _ in range(args.queries):
+        tokens = sorted(set(rng.choice(texts)[1].split()), key=frequency.__getitem__)
+        query_sets['specific'].append(' '.join(tokens[:2]))
+        query_sets['broad'].append(' '.join(tokens[-2:]))
+
+    def icontains(query):
+        condition = Q()
+        for word in query.split():
+            condition &= Q(text__icontains=word) | Q(option_a__icontains=word) | Q(option_b__icontains=word) \
+                | Q(option_c__icontains=word) | Q(option_d__icontains=word)
+        return list(Question.objects.filter(condition).values_list('pk', flat=True)[:20])
+
+    for kind, queries in query_sets.items():
+        for label, function in (('fts5 bm25', search_questions), ('icontains', icontains)):
+            samples, results = time_each(function, queries)
+            p50, p95 = percentiles(samples)
+            hits = statistics.mean(len(result) for result in results)
+            print(f"search {kind:<8} {label:<10} p50 {p50:8.2f} ms  p95 {p95:8.2f} ms  {hits:.1f} hits/query")
+
+
+def bench_duplicates(args, planted):
+    from app.search import find_near_duplicates, shingles
+
+    from app.models import Question
+
+    checks = planted[:args.queries]
+
+    def lsh(check):
+        creator_id, text, options, original = check
+        return original, [pk for pk, _exam, _score in find_near_duplicates(text, options, creator_id=creator_id)]
+
+    def brute_force(check):
+        # Reads the author's bank and compares shingle sets with each question: no index to help.
+        creator_id, text, options, original = check
+        query = shingles(text, options)
+        bank = Question.objects.filter(exam__test_series__creator_id=creator_id).values_list(
+            'pk', 'text', 'option_a', 'option_b', 'option_c', 'option_d',
+        )
+        matches = []
+        for pk, other_text, *other_options in bank.iterator(chunk_size=2000):
+            other = shingles(other_text, other_options)
+            if len(query & other) / len(query | other) >= 0.8:
+                matches.append(pk)
+        return original, matches
+
+    first_pk = min_pk()
+    for label, function in (('minhash lsh', lsh), ('brute force', brute_force)):
+        samples, results = time_each(function, checks)
+        p50, p95 = percentiles(samples)
+        found = sum(first_pk + original in matches for original, matches in results)
+        print(f"duplicates {label:<12} p50 {p50:8.2f} ms  p95 {p95:8.2f} ms  found {found}/{len(checks)} planted copies")
+
+
+def min_pk():
+    from app.models import Question
+
+    return Question.objects.order_by('pk').values_list('pk', flat=True).first()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--questions', type=int, default=500_000)
+    parser.add_argument('--creators', type=int, default=50)
+    parser.add_argument('--queries', type=int, default=200)
+    args = parser.parse_args()
+
+    setup_django()
+    texts, planted = seed(args)
+    bench_search(args, texts)
+    bench_duplicates(args, planted)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,170 @@
+"""
+Compare registration with per-field exists() checks against constraint-based uniqueness.
+
+    python -m benchmarks.registration --signups 500 --racers 4 --accounts 200
+
+"exists" is the previous UserSerializer: a uniqueness query per field (email
+was checked twice, by the model field's UniqueValidator and validate_email)
+before the INSERT. "constraints" relies on the unique constraints alone, and
+"precheck" adds REGISTRATION_PRECHECK's single combined query. Each mode times
+sequential signups through RegisterView and counts the queries of one, then
+races `--racers` processes registering the same `--accounts` payloads and
+reports the response statuses and how many accounts exist afterwards.
+"""
+
+import argparse
+import multiprocessing
+import os
+import random
+import sqlite3
+import subprocess
+import sys
+import tempfile
+from contextlib import closing
+
+from .common import setup_django, timer
+
+MODES = ('exists', 'constraints', 'precheck')
+
+
+def payload(index):
+    return {
+        "first_name": "Bench", "last_name": "User", "email": f"signup{index}@example.com",
+        "phone": f"+9191{index:08d}", "password": "bench-password-1",
+    }
+
+
+def register_view(mode):
+    from rest_framework import serializers
+
+    from core import serializers as user_serializers
+    from core.models import User
+    from core.views import RegisterView
+
+    user_serializers.REGISTRATION_PRECHECK = mode == 'precheck'
+    if mode != 'exists':
+        return RegisterView.as_view()
+
+    class ExistsUserSerializer(user_serializers.UserSerializer):
+        class Meta(user_serializers.UserSerializer.Meta):
+            extra_kwargs = {"password": {"write_only": True}}
+
+        def create(self, validated_data):
+            return User.objects.create_user(**validated_data)
+
+        def validate_email(self, value):
+            if User.objects.filter(email=value).exists():
+                raise serializers.ValidationError("A user with this email already exists.")
+            return value
+
+        def validate_phone(self, value):
+            if User.objects.filter(phone=value).exists():
+                raise serializers.ValidationError("A user with this phone already exists.")
+            return value
+
+    return RegisterView.as_view(serializer_class=ExistsUserSerializer)
+
+
+def configure(path, migrate):
+    setup_django(path, migrate=migrate)
+    from core.hashers import TunablePBKDF2PasswordHasher
+
+    # Hashing is the same in every mode; keep it from drowning the difference.
+    TunablePBKDF2PasswordHasher.iterations = 1000
+
+
+def post(view, factory, data):
+    try:
+        return view(factory.post('/api/register/', data, format='json')).status_code
+    except Exception as exc:  # what the client would see as a 500
+        return type(exc).__name__
+
+
+def sequential(mode, signups):
+    configure(None, migrate=True)
+    from django.db import connection
+    from django.test.utils import CaptureQueriesContext
+    from rest_framework.test import APIRequestFactory
+
+    view, factory = register_view(mode), APIRequestFactory()
+    with CaptureQueriesContext(connection) as queries:
+        assert post(view, factory, payload(signups)) == 201
+    with timer() as elapsed:
+        for index in range(signups):
+            post(view, factory, payload(index))
+    with timer() as duplicate:
+        for index in range(signups):
+            post(view, factory, payload(index))
+    return len(queries), signups / elapsed['seconds'], signups / duplicate['seconds']
+
+
+def racer(mode, path, accounts, start, results):
+    configure(path, migrate=False)
+    from rest_framework.test import APIRequestFactory
+
+    view, factory = register_view(mode), APIRequestFactory()
+    order = list(range(accounts))
+    random.Random(os.getpid()).shuffle(order)
+    statuses = {}
+    start.wait()
+    for index in order:
+        status = post(view, factory, payload(index))
+        statuses[status] = statuses.get(status, 0) + 1
+    results.put(statuses)
+
+
+def race(mode, racers, accounts):
+    context = multiprocessing.get_context('spawn')
+    path = os.path.join(tempfile.mkdtemp(prefix='bench-'), 'bench.sqlite3')
+    setup = context.Process(target=configure, args=(path, True))
+    setup.start()
+    setup.join()
+
+    start, results = context.Event(), context.Queue()
+    processes = [
+        context.Process(target=racer, args=(mode, path, accounts, start, results)) for _ in range(racers)
+    ]
+    for process in processes:
+        process.start()
+    start.set()
+    statuses = {}
+    for _ in processes:
+        for status, count in results.get().items():
+            statuses[status] = statuses.get(status, 0) + count
+    for process in processes:
+        process.join()
+
+    with closing(sqlite3.connect(path)) as database:
+        (count,), = database.execute('SELECT COUNT(*) FROM core_user')
+    return statuses, count
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--signups', type=int, default=500)
+    parser.add_argument('--racers', type=int, default=4)
+    parser.add_argument('--accounts', type=int, default=200)
+    parser.add_argument('--mode', choices=MODES, help="Run a single mode (each mode needs a fresh process).")
+    args = parser.parse_args()
+
+    if args.mode is None:
+        # Settings are configured once per interpreter, so every mode runs in its own.
+        for mode in MODES:
+            subprocess.run(
+                [sys.executable, '-m', 'benchmarks.registration', '--mode', mode, '--signups', str(args.signups),
+                 '--racers', str(args.racers), '--accounts', str(args.accounts)],
+                check=True,
+            )
+        return
+
+    queries, signups_per_second, duplicates_per_second = sequential(args.mode, args.signups)
+    statuses, accounts = race(args.mode, args.racers, args.accounts)
+    print(
+        f"{args.mode:<12} {queries} queries/signup  {signups_per_second:7.1f} signups/s  "
+        f"{duplicates_per_second:7.1f} duplicates rejected/s"
+    )
+    print(f"{'':<12} race: {statuses}  accounts {accounts}/{args.accounts}")
+
+
+if __name__ == '__main__':
+    main()
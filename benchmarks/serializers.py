@@ -0,0 +1,65 @@
+"""
+Compare DRF serializers with their compiled read paths, rendered to JSON.
+
+    python -m benchmarks.serializers --repeat 20000 --rows 500
+"""
+
+import argparse
+
+from .common import seed_attempts, seed_exam, seed_users, setup_django, timer
+
+
+def rate(fn, repeat):
+    with timer() as elapsed:
+        for _ in range(repeat):
+            fn()
+    return repeat / elapsed['seconds']
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--repeat', type=int, default=20000, help="Single-object responses per measurement.")
+    parser.add_argument('--rows', type=int, default=500, help="Rows per list response.")
+    args = parser.parse_args()
+
+    setup_django()
+    from django.contrib.auth import get_user_model
+    from rest_framework.renderers import JSONRenderer
+
+    from app.models import ExamAttempt
+    from app.serializers import ExamAttemptSerializer
+    from core.fast_serializers import CompiledSerializer
+    from core.serializers import UserSerializer
+
+    User = get_user_model()
+    users = seed_users(args.rows)
+    seed_attempts(seed_exam(10), users)
+    render = JSONRenderer().render
+    user = User.objects.order_by('pk').first()
+    compiled_user = CompiledSerializer(UserSerializer)
+    compiled_attempt = CompiledSerializer(ExamAttemptSerializer)
+    attempt = ExamAttempt.objects.first()
+
+    assert render(compiled_user.to_representation(user)) == render(UserSerializer(user).data)
+    cases = [
+        ("user payload", args.repeat,
+         lambda: render(UserSerializer(user).data),
+         lambda: render(compiled_user.to_representation(user))),
+        ("attempt payload", args.repeat,
+         lambda: render(ExamAttemptSerializer(attempt).data),
+         lambda: render(compiled_attempt.to_representation(attempt))),
+        (f"user list ({args.rows})", max(args.repeat // args.rows, 5),
+         lambda: render(UserSerializer(User.objects.order_by('pk'), many=True).data),
+         lambda: render(compiled_user.rows(User.objects.order_by('pk')))),
+        (f"attempt list ({args.rows})", max(args.repeat // args.rows, 5),
+         lambda: render(ExamAttemptSerializer(ExamAttempt.objects.order_by('pk'), many=True).data),
+         lambda: render(compiled_attempt.rows(ExamAttempt.objects.order_by('pk')))),
+    ]
+    for label, repeat, drf, compiled in cases:
+        assert drf() == compiled(), label
+        slow, fast = rate(drf, repeat), rate(compiled, repeat)
+        print(f"{label:<20} serializer {slow:9.0f}/s   compiled {fast:9.0f}/s   x{fast / slow:.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,153 @@
+"""
+Measure worker startup: import time of the app and memory per forked worker.
+
+    python -m benchmarks.startup --workers 4
+
+The import report runs `python -X importtime` over Django setup plus the URLconf
+and lists the slowest top-level packages. The memory report forks workers the
+way gunicorn does, once with the app preloaded and warmed up in the parent
+(preload_app) and once with each worker loading it itself, and prints each
+worker's RSS, PSS and private memory after its first phone number parse.
+"""
+
+import argparse
+import gc
+import json
+import os
+import subprocess
+import sys
+
+BOOT = (
+    "import django; django.setup(); "
+    "from django.urls import get_resolver; get_resolver().url_patterns"
+)
+
+
+def environment():
+    env = dict(os.environ)
+    env.setdefault('DJANGO_SETTINGS_MODULE', 'backend.settings')
+    env.setdefault('SECRET_KEY', 'benchmark-secret-key')
+    return env
+
+
+def import_report(top):
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', BOOT],
+        env=environment(), capture_output=True, text=True, check=True,
+    )
+    packages = {}
+    total = 0
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, _cumulative, name = (part.strip() for part in line[len('import time:'):].split('|'))
+        total += int(self_us)
+        package = name.split('.')[0]
+        packages[package] = packages.get(package, 0) + int(self_us)
+
+    print(f"import time:   {total / 1000:7.1f} ms total")
+    for package, micros in sorted(packages.items(), key=lambda item: -item[1])[:top]:
+        print(f"  {package:<28} {micros / 1000:7.1f} ms")
+
+
+def memory():
+    """RSS, PSS and private (USS) memory of this process in MiB, from smaps_rollup."""
+    fields = {}
+    with open('/proc/self/smaps_rollup') as handle:
+        for line in handle:
+            parts = line.split()
+            if len(parts) == 3 and parts[2] == 'kB':
+                fields[parts[0].rstrip(':')] = int(parts[1]) / 1024
+    private = fields.get('Private_Clean', 0) + fields.get('Private_Dirty', 0)
+    return {'rss': fields.get('Rss', 0), 'pss': fields.get('Pss', 0), 'private': private}
+
+
+def boot():
+    import django
+
+    django.setup()
+
+
+def first_request():
+    """What a worker's first request touches: the URLconf and a phone number parse."""
+    from django.urls import get_resolver
+    from phonenumber_field.phonenumber import to_python
+
+    get_resolver().url_patterns
+    assert to_python('98000 00001', region='IN').is_valid()
+
+
+def probe(preload, workers):
+    """Fork `workers` children and print their memory as JSON lines; run in a fresh interpreter."""
+    os.environ.update(environment())
+    if preload:
+        boot()
+        from backend.startup import warm_up
+
+        warm_up()
+        gc.freeze()
+
+    # Children measure only once all have forked and stay alive until all have reported,
+    # so PSS splits shared pages between every sibling. Each barrier is a pipe whose
+    # write end the parent closes; children wait for the end of file.
+    start_read, start_write = os.pipe()
+    release_read, release_write = os.pipe()
+    pipes = []
+    for _ in range(workers):
+        read_end, write_end = os.pipe()
+        pid = os.fork()
+        if pid == 0:
+            os.close(read_end)
+            os.close(start_write)
+            os.close(release_write)
+            if not preload:
+                boot()
+            first_request()
+            os.read(start_read, 1)
+            os.write(write_end, json.dumps(memory()).encode())
+            os.close(write_end)
+            os.read(release_read, 1)
+            os._exit(0)
+        os.close(write_end)
+        pipes.append((pid, read_end))
+
+    os.close(start_write)
+    for _pid, read_end in pipes:
+        with os.fdopen(read_end) as handle:
+            print(handle.read())
+    os.close(release_write)
+    for pid, _read_end in pipes:
+        os.waitpid(pid, 0)
+
+
+def memory_report(workers):
+    for preload in (False, True):
+        result = subprocess.run(
+            [sys.executable, '-m', 'benchmarks.startup', '--probe', '1' if preload else '0', '--workers', str(workers)],
+            env=environment(), capture_output=True, text=True, check=True,
+        )
+        samples = [json.loads(line) for line in result.stdout.splitlines() if line.strip()]
+        average = {key: sum(sample[key] for sample in samples) / len(samples) for key in samples[0]}
+        label = 'preloaded' if preload else 'per worker'
+        print(
+            f"{label:>10}: rss {average['rss']:6.1f} MiB  pss {average['pss']:6.1f} MiB  "
+            f"private {average['private']:6.1f} MiB  (average of {len(samples)} workers)"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--top', type=int, default=12)
+    parser.add_argument('--probe', choices=['0', '1'], help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.probe is not None:
+        probe(args.probe == '1', args.workers)
+        return
+    import_report(args.top)
+    memory_report(args.workers)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,57 @@
+"""
+Compare answer writes per second: one row per click versus batched upserts.
+
+    python -m benchmarks.submissions --attempts 200 --questions 100 --batch 20
+"""
+
+import argparse
+import random
+
+from .common import seed_exam, seed_users, setup_django, timer
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--attempts', type=int, default=200)
+    parser.add_argument('--questions', type=int, default=100)
+    parser.add_argument('--batch', type=int, default=20, help="Answers per submission request.")
+    args = parser.parse_args()
+
+    setup_django()
+    from app.models import Answer, ExamAttempt
+    from app.submissions import submit_answers
+
+    exam = seed_exam(args.questions)
+    question_ids = list(exam.questions.values_list('pk', flat=True))
+    rng = random.Random(0)
+
+    def new_attempts():
+        return ExamAttempt.objects.bulk_create(
+            [ExamAttempt(user=user, exam=exam) for user in seed_users(args.attempts)]
+        )
+
+    total = args.attempts * args.questions
+
+    attempts = new_attempts()
+    with timer() as single:
+        for attempt in attempts:
+            for question_id in question_ids:
+                Answer.objects.update_or_create(
+                    attempt=attempt, question_id=question_id,
+                    defaults={'selected_option': rng.choice('ABCD')},
+                )
+
+    attempts = new_attempts()
+    with timer() as batched:
+        for attempt in attempts:
+            for start in range(0, len(question_ids), args.batch):
+                chunk = question_ids[start:start + args.batch]
+                submit_answers(attempt, [(pk, rng.choice('ABCD')) for pk in chunk])
+
+    print(f"answers per run:         {total}")
+    print(f"single-row writes/sec:   {total / single['seconds']:.0f}")
+    print(f"batched ({args.batch:>3}) writes/sec: {total / batched['seconds']:.0f}")
+
+
+if __name__ == '__main__':
+    main()
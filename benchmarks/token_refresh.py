@@ -0,0 +1,160 @@
+"""
+Measure /api/token/refresh/ throughput after many rotations, per revocation backend.
+
+    python -m benchmarks.token_refresh --rotations 1000000 --refreshes 2000
+
+"stock" installs simplejwt's token_blacklist app and its refresh serializer
+(outstanding and blacklisted token tables, one row each per rotation); "store"
+is core.revocation's jti table; "cache" adds TOKEN_REVOCATION['CACHE'], which
+marks revocations in the cache but still INSERTs each rotation. Each
+mode first loads `--rotations` past rotations, half of them already expired,
+then times a chain of refreshes through the view, counts the queries of one,
+and reports the database size before and after sweeping expired entries.
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+import uuid
+from datetime import timedelta
+
+from .common import seed_users, setup_django, timer
+
+MODES = ('stock', 'store', 'cache')
+BLACKLIST_APP = 'rest_framework_simplejwt.token_blacklist'
+
+
+def configure(mode):
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'backend.settings')
+    os.environ.setdefault('SECRET_KEY', 'benchmark-secret-key')
+    from django.conf import settings
+
+    if mode == 'stock':
+        settings.INSTALLED_APPS = [*settings.INSTALLED_APPS, BLACKLIST_APP]
+        settings.SIMPLE_JWT = {
+            **settings.SIMPLE_JWT, 'TOKEN_REFRESH_SERIALIZER': 'rest_framework_simplejwt.serializers.TokenRefreshSerializer',
+        }
+    settings.TOKEN_REVOCATION = {**settings.TOKEN_REVOCATION, 'CACHE': mode == 'cache'}
+    return setup_django()
+
+
+def seed(mode, user, rotations):
+    """Load `rotations` past rotations in bulk; half have expired already."""
+    from django.utils import timezone
+
+    now = timezone.now()
+    batch_size = 10_000
+    for start in range(0, rotations, batch_size):
+        expiries = [now + timedelta(days=(-1 if i % 2 else 3)) for i in range(start, min(start + batch_size, rotations))]
+        jtis = [uuid.uuid4().hex for _ in expiries]
+        if mode == 'stock':
+            from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken, OutstandingToken
+
+            outstanding = OutstandingToken.objects.bulk_create(
+                OutstandingToken(user=user, jti=jti, token='x' * 250, created_at=now, expires_at=expires_at)
+                for jti, expires_at in zip(jtis, expiries)
+            )
+            BlacklistedToken.objects.bulk_create(BlacklistedToken(token=token) for token in outstanding)
+        else:
+            from core.models import RevokedToken
+
+            RevokedToken.objects.bulk_create(
+                RevokedToken(jti=jti, expires_at=expires_at) for jti, expires_at in zip(jtis, expiries)
+            )
+
+
+def database_size():
+    from django.db import connection
+
+    with connection.cursor() as cursor:
+        cursor.execute('PRAGMA page_count')
+        (pages,) = cursor.fetchone()
+        cursor.execute('PRAGMA page_size')
+        (page_size,) = cursor.fetchone()
+    return pages * page_size / 2 ** 20
+
+
+def sweep(mode):
+    from django.db import connection
+
+    if mode == 'stock':
+        from django.core.management import call_command
+
+        call_command('flushexpiredtokens')
+    else:
+        from core.revocation import sweep_expired
+
+        sweep_expired()
+    with connection.cursor() as cursor:
+        cursor.execute('VACUUM')
+
+
+def run(mode, rotations, refreshes):
+    configure(mode)
+    from django.db import connection
+    from django.test.utils import CaptureQueriesContext
+    from rest_framework.test import APIRequestFactory
+    from rest_framework_simplejwt.views import TokenRefreshView
+
+    from core.authentication import get_user_snapshot
+    from core.rbac import get_permission_bits
+    from core.tokens import RoleRefreshToken
+
+    user = seed_users(1)[0]
+    with timer() as seeding:
+        seed(mode, user, rotations)
+    # A refresh follows a login, which has already cached these.
+    get_user_snapshot(user.pk)
+    get_permission_bits(user.pk)
+
+    if mode == 'stock':
+        from rest_framework_simplejwt.tokens import RefreshToken
+
+        token = str(RefreshToken.for_user(user))
+    else:
+        token = str(RoleRefreshToken.for_user(user))
+    view, factory = TokenRefreshView.as_view(), APIRequestFactory()
+
+    def refresh(token):
+        response = view(factory.post('/api/token/refresh/', {'refresh': token}, format='json'))
+        assert response.status_code == 200, response.data
+        return response.data['refresh']
+
+    with CaptureQueriesContext(connection) as queries:
+        token = refresh(token)
+    with timer() as elapsed:
+        for _ in range(refreshes):
+            token = refresh(token)
+
+    size = database_size()
+    with timer() as swept:
+        sweep(mode)
+    print(
+        f"{mode:<6} {refreshes / elapsed['seconds']:7.0f} refreshes/s  {len(queries)} queries/refresh  "
+        f"db {size:6.1f} MiB -> {database_size():6.1f} MiB after sweep ({swept['seconds']:.1f}s)  "
+        f"[seeded {rotations} in {seeding['seconds']:.0f}s]"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--rotations', type=int, default=1_000_000)
+    parser.add_argument('--refreshes', type=int, default=2000)
+    parser.add_argument('--mode', choices=MODES, help="Run a single mode (each mode needs a fresh process).")
+    args = parser.parse_args()
+
+    if args.mode is None:
+        # Installed apps differ between modes, so every mode runs in its own interpreter.
+        for mode in MODES:
+            subprocess.run(
+                [sys.executable, '-m', 'benchmarks.token_refresh', '--mode', mode,
+                 '--rotations', str(args.rotations), '--refreshes', str(args.refreshes)],
+                check=True,
+            )
+        return
+    run(args.mode, args.rotations, args.refreshes)
+
+
+if __name__ == '__main__':
+    main()
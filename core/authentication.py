@@ -0,0 +1,82 @@
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import transaction
+from django.utils.functional import cached_property
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.models import TokenUser
+from rest_framework_simplejwt.settings import api_settings
+
+AUTH_SNAPSHOT_TIMEOUT = getattr(settings, 'AUTH_SNAPSHOT_TIMEOUT', 60)
+SNAPSHOT_FIELDS = ('email', 'is_active', 'is_verified', 'is_staff', 'is_superuser')
+
+
+def _snapshot_key(user_id):
+    return f"auth_user:{user_id}"
+
+
+def get_user_snapshot(user_id):
+    """Return the cached {field: value} snapshot of a user's status, or None if the user is gone."""
+    key = _snapshot_key(user_id)
+    snapshot = cache.get(key)
+    if snapshot is None:
+        snapshot = get_user_model().objects.filter(pk=user_id).values(*SNAPSHOT_FIELDS).first()
+        if snapshot is None:
+            return None
+        cache.set(key, snapshot, AUTH_SNAPSHOT_TIMEOUT)
+    return snapshot
+
+
+def evict_user_snapshot(user_id):
+    """Drop the user's snapshot now and again once the transaction commits."""
+    cache.delete(_snapshot_key(user_id))
+    # A request authenticated meanwhile caches the row as it was before the commit.
+    transaction.on_commit(lambda: cache.delete(_snapshot_key(user_id)))
+
+
+class SnapshotUser(TokenUser):
+    """
+    Lightweight stand-in for `core.User` built from a validated token and a cached snapshot.
+
+    Code that needs the real model row can use `instance`, which loads it on first access.
+    Filter related rows by `user_id=request.user.pk` rather than `user=request.user`.
+    """
+
+    def __init__(self, token, snapshot):
+        super().__init__(token)
+        self.email = snapshot['email']
+        self.is_active = snapshot['is_active']
+        self.is_verified = snapshot['is_verified']
+        self.is_staff = snapshot['is_staff']
+        self.is_superuser = snapshot['is_superuser']
+
+    def __str__(self):
+        return self.email
+
+    @cached_property
+    def instance(self):
+        return get_user_model().objects.get(pk=self.pk)
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    """
+    JWT authentication that does not load the user row on every request.
+
+    The user is rebuilt from token claims plus a snapshot of `is_active` and
+    `is_verified` cached for AUTH_SNAPSHOT_TIMEOUT seconds. Saving a user evicts
+    the snapshot, so deactivation takes effect on the next request.
+    """
+
+    def get_user(self, validated_token):
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise InvalidToken("Token contained no recognizable user identification")
+
+        snapshot = get_user_snapshot(user_id)
+        if snapshot is None:
+            raise AuthenticationFailed("User not found", code="user_not_found")
+        if api_settings.CHECK_USER_IS_ACTIVE and not snapshot['is_active']:
+            raise AuthenticationFailed("User is inactive", code="user_inactive")
+        return SnapshotUser(validated_token, snapshot)
@@ -0,0 +1,127 @@
+from functools import lru_cache
+
+from django.conf import settings
+from django.db.models import CharField
+from django.db.models.functions import Cast
+from django.utils import timezone
+from phonenumber_field.modelfields import PhoneNumberField
+from phonenumber_field.phonenumber import PhoneNumber, to_python
+from phonenumber_field.serializerfields import PhoneNumberField as PhoneNumberSerializerField
+from phonenumbers import PhoneNumber as BasePhoneNumber
+from rest_framework import ISO_8601, serializers
+from rest_framework.settings import api_settings
+
+PHONE_FORMAT_CACHE_SIZE = 65536
+
+
+@lru_cache(maxsize=PHONE_FORMAT_CACHE_SIZE)
+def _format_number(country_code, national_number, extension, italian_leading_zero, leading_zeros):
+    number = PhoneNumber(
+        country_code=country_code, national_number=national_number, extension=extension,
+        italian_leading_zero=italian_leading_zero, number_of_leading_zeros=leading_zeros,
+    )
+    return str(number) if number.is_valid() else None
+
+
+def format_phone(value):
+    """str(value) for a PhoneNumber, with validation and formatting cached per number."""
+    if not isinstance(value, BasePhoneNumber):
+        return str(value)
+    formatted = _format_number(
+        value.country_code, value.national_number, value.extension,
+        value.italian_leading_zero, value.number_of_leading_zeros,
+    )
+    return value.raw_input if formatted is None else formatted
+
+
+@lru_cache(maxsize=PHONE_FORMAT_CACHE_SIZE)
+def format_stored_phone(stored, region=None):
+    """What the serializer prints for a phone column holding `stored`, cached per stored value."""
+    return str(to_python(stored, region=region))
+
+
+def _datetime_converter(field):
+    """ISO 8601 output of an aware datetime as DRF's DateTimeField renders it, else the field's own method."""
+    output_format = getattr(field, 'format', api_settings.DATETIME_FORMAT)
+    if not settings.USE_TZ or hasattr(field, 'timezone') or not isinstance(output_format, str) \
+            or output_format.lower() != ISO_8601:
+        return field.to_representation
+
+    def convert(value):
+        if getattr(value, 'tzinfo', None) is None:
+            return field.to_representation(value)
+        value = value.astimezone(timezone.get_current_timezone()).isoformat()
+        return value[:-6] + 'Z' if value.endswith('+00:00') else value
+
+    return convert
+
+
+class CompiledSerializer:
+    """
+    Read-only fast path producing exactly what `serializer_class(instance).data` does.
+
+    The serializer's readable fields are resolved once, each into the model
+    attribute it reads and a converter: a builtin for plain values, the cached
+    phone formatter for phone numbers, an inlined ISO 8601 formatter for aware
+    datetimes, and the DRF field's own to_representation for anything else.
+    `rows()` reads a queryset with values_list and casts phone columns to text
+    in SQL, so no model instances or PhoneNumbers are built.
+    """
+
+    simple_converters = (
+        (serializers.BooleanField, bool),
+        (serializers.IntegerField, int),
+        (serializers.FloatField, float),
+    )
+
+    def __init__(self, serializer_class):
+        serializer = serializer_class()
+        self.model = serializer.Meta.model
+        self.fields = []
+        for name, field in serializer.fields.items():
+            if field.write_only:
+                continue
+            model_field = self.model._meta.get_field(field.source)
+            self.fields.append((name, model_field, self._converter(field)))
+        self.attnames = [model_field.attname for _name, model_field, _converter in self.fields]
+
+    def _converter(self, field):
+        if isinstance(field, PhoneNumberSerializerField):
+            return format_phone
+        if type(field) is serializers.DateTimeField:
+            return _datetime_converter(field)
+        if isinstance(field, serializers.PrimaryKeyRelatedField):
+            return None  # the attname already holds the primary key
+        if type(field) in (serializers.CharField, serializers.EmailField):
+            return str
+        for field_class, converter in self.simple_converters:
+            if type(field) is field_class:
+                return converter
+        return field.to_representation
+
+    def to_representation(self, instance):
+        data = {}
+        for (name, _model_field, converter), attname in zip(self.fields, self.attnames):
+            value = getattr(instance, attname)
+            data[name] = value if value is None or converter is None else converter(value)
+        return data
+
+    def rows(self, queryset):
+        """Return one representation dict per row of `queryset`."""
+        columns, converters = [], []
+        for (name, model_field, converter), attname in zip(self.fields, self.attnames):
+            if isinstance(model_field, PhoneNumberField):
+                columns.append(Cast(attname, CharField()))
+                region = model_field.region
+                converters.append(lambda stored, region=region: format_stored_phone(stored, region))
+            else:
+                columns.append(attname)
+                converters.append(converter)
+        names = [name for name, _model_field, _converter in self.fields]
+        return [
+            {
+                name: value if value is None or converter is None else converter(value)
+                for name, converter, value in zip(names, converters, row)
+            }
+            for row in queryset.values_list(*columns)
+        ]
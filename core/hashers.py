@@ -0,0 +1,94 @@
+import asyncio
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from threading import Lock
+
+from django.conf import settings
+from django.contrib.auth import hashers
+
+
+class TunablePBKDF2PasswordHasher(hashers.PBKDF2PasswordHasher):
+    """
+    PBKDF2-SHA256 with the work factor taken from PASSWORD_PBKDF2_ITERATIONS.
+
+    It keeps Django's algorithm name, so existing hashes still verify. Hashes made
+    with a different iteration count report `must_update` and are rehashed on login.
+    """
+    iterations = getattr(settings, 'PASSWORD_PBKDF2_ITERATIONS', hashers.PBKDF2PasswordHasher.iterations)
+
+
+class HashPoolBusy(Exception):
+    """Raised when the password hash pool already has its maximum of queued jobs."""
+
+
+def setup_worker():
+    import django
+
+    django.setup()
+
+
+class PasswordHashPool:
+    """
+    Bounded executor for password hashing so CPU-heavy hashes stay off the event loop.
+
+    At most `workers` hashes run at once and at most `max_queue` more wait; anything
+    beyond that fails fast with HashPoolBusy instead of piling up behind a login storm.
+    hashlib's PBKDF2 releases the GIL, so threads scale across cores; use processes
+    for hashers that do not.
+    """
+
+    def __init__(self, kind='thread', workers=4, max_queue=64):
+        if kind == 'process':
+            self.executor = ProcessPoolExecutor(workers, initializer=setup_worker)
+        else:
+            self.executor = ThreadPoolExecutor(workers, thread_name_prefix='password-hash')
+        self.workers = workers
+        self.max_pending = workers + max_queue
+        self._pending = 0
+        self._lock = Lock()
+
+    async def run(self, fn, *args):
+        with self._lock:
+            if self._pending >= self.max_pending:
+                raise HashPoolBusy()
+            self._pending += 1
+        try:
+            return await asyncio.wrap_future(self.executor.submit(fn, *args))
+        finally:
+            with self._lock:
+                self._pending -= 1
+
+    async def make_password(self, raw_password):
+        return await self.run(hashers.make_password, raw_password)
+
+    async def verify_password(self, raw_password, encoded):
+        """Return (is_correct, must_update). A None `encoded` still costs one hash."""
+        return await self.run(hashers.verify_password, raw_password, encoded)
+
+    def shutdown(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+
+_pool = None
+_pool_lock = Lock()
+
+
+def get_hash_pool():
+    """Return this process's pool, created on first use so forked workers get their own."""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            options = getattr(settings, 'PASSWORD_HASH_POOL', {})
+            _pool = PasswordHashPool(
+                kind=options.get('KIND', 'thread'),
+                workers=options.get('WORKERS', 4),
+                max_queue=options.get('MAX_QUEUE', 64),
+            )
+        return _pool
+
+
+def reset_hash_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown()
+        _pool = None
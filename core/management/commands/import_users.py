@@ -0,0 +1,46 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core.user_import import UserImporter, read_rows
+
+
+class Command(BaseCommand):
+    help = "Bulk import users from a CSV or JSONL file with columns email, phone, password, first_name, last_name."
+
+    def add_arguments(self, parser):
+        parser.add_argument('path')
+        parser.add_argument('--format', choices=['csv', 'jsonl'], help="Defaults to the file extension.")
+        parser.add_argument('--chunk-size', type=int, default=1000)
+        parser.add_argument(
+            '--workers', type=int, default=None,
+            help="Password hashing processes (default: CPU count, 0 hashes in-process).",
+        )
+        parser.add_argument('--checkpoint', help="Checkpoint file (default: <path>.checkpoint).")
+        parser.add_argument('--resume', action='store_true', help="Skip rows recorded in the checkpoint.")
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+
+        def report(stats):
+            rate = stats["created"] / max(time.perf_counter() - started, 1e-9)
+            self.stdout.write(
+                f"rows {stats['rows']}  created {stats['created']}  skipped {stats['skipped']}  ({rate:.0f} users/s)"
+            )
+
+        importer = UserImporter(
+            chunk_size=options['chunk_size'],
+            workers=options['workers'],
+            checkpoint=options['checkpoint'] or f"{options['path']}.checkpoint",
+            report=report,
+        )
+        try:
+            stats = importer.run(read_rows(options['path'], options['format']), resume=options['resume'])
+        except OSError as exc:
+            raise CommandError(str(exc))
+
+        for line, message in stats["errors"]:
+            self.stderr.write(f"row {line}: {message}")
+        self.stdout.write(self.style.SUCCESS(
+            f"Imported {stats['created']} users, skipped {stats['skipped']} of {stats['rows']} rows."
+        ))
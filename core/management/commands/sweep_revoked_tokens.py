@@ -0,0 +1,33 @@
+import asyncio
+import signal
+
+from django.core.management.base import BaseCommand
+
+from core.revocation import SWEEP_BATCH_SIZE, SWEEP_INTERVAL, run_sweeper, sweep_expired
+
+
+class Command(BaseCommand):
+    help = (
+        "Delete revoked refresh tokens that have expired. Runs until stopped, "
+        "or sweeps once with --once (for cron)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help="Sweep once and exit.")
+        parser.add_argument('--interval', type=float, default=SWEEP_INTERVAL, help="Seconds between sweeps.")
+        parser.add_argument('--batch-size', type=int, default=SWEEP_BATCH_SIZE, help="Rows deleted per statement.")
+
+    def handle(self, *args, **options):
+        if options['once']:
+            deleted = sweep_expired(options['batch_size'])
+            self.stdout.write(self.style.SUCCESS(f"Deleted {deleted} expired revocations."))
+            return
+        asyncio.run(self.serve(options['interval'], options['batch_size']))
+
+    async def serve(self, interval, batch_size):
+        stop = asyncio.Event()
+        loop = asyncio.get_running_loop()
+        for signum in (signal.SIGINT, signal.SIGTERM):
+            loop.add_signal_handler(signum, stop.set)
+        self.stdout.write(f"Sweeping expired token revocations every {interval:g}s")
+        await run_sweeper(interval, batch_size, stop)
@@ -0,0 +1,35 @@
+import phonenumber_field.modelfields
+from django.db import migrations
+
+
+def backfill_phones(apps, schema_editor):
+    # Accounts created before phone numbers were required get a distinct placeholder,
+    # which is not a valid number, so the unique constraint can be added. They have
+    # to enter a real number before anything validates their phone.
+    User = apps.get_model('core', 'User')
+    users = list(User.objects.filter(phone__isnull=True).only('pk'))
+    for user in users:
+        user.phone = f"unset-{user.pk}"
+    User.objects.bulk_update(users, ['phone'], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0001_initial'),
+    ]
+
+    operations = [
+        # Added nullable and non-unique first: existing rows cannot all share one default.
+        migrations.AddField(
+            model_name='user',
+            name='phone',
+            field=phonenumber_field.modelfields.PhoneNumberField(max_length=128, null=True, region='IN'),
+        ),
+        migrations.RunPython(backfill_phones, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='user',
+            name='phone',
+            field=phonenumber_field.modelfields.PhoneNumberField(max_length=128, region='IN', unique=True),
+        ),
+    ]
@@ -5,8 +5,8 @@ from phonenumber_field.modelfields import PhoneNumberField
 class UserManager(BaseUserManager):
     """Custom user manager for user model"""
 
-    def create_user(self, email, password=None, phone=None, **extra_fields):
-        """Create and return a regular user with an email, password, and optional phone."""
+    def build_user(self, email, phone=None, **extra_fields):
+        """Return an unsaved user with a normalized email and optional phone."""
         if not email:
             raise ValueError("The Email field must be set")
 
@@ -14,11 +14,22 @@ class UserManager(BaseUserManager):
         if phone:
             extra_fields['phone'] = phone  # Explicitly set phone if passed
 
-        user = self.model(email=email, **extra_fields)
+        return self.model(email=email, **extra_fields)
+
+    def create_user(self, email, password=None, phone=None, **extra_fields):
+        """Create and return a regular user with an email, password, and optional phone."""
+        user = self.build_user(email, phone=phone, **extra_fields)
         user.set_password(password)
         user.save(using=self._db)
         return user
 
+    def create_user_with_hash(self, email, password_hash, phone=None, **extra_fields):
+        """Create and return a regular user whose password was already hashed with make_password()."""
+        user = self.build_user(email, phone=phone, **extra_fields)
+        user.password = password_hash
+        user.save(using=self._db)
+        return user
+
     def create_superuser(self, email, password=None, phone=None, **extra_fields):
         """Create and return a superuser with email, password, and optional phone."""
         extra_fields.setdefault("is_staff", True)
@@ -76,3 +87,17 @@ class UserRole(models.Model):
 
     def __str__(self):
         return f"{self.user.email} → {self.role.name}"
+
+
+class RevokedToken(models.Model):
+    """
+    A refresh token that may no longer be used, identified by its `jti` claim.
+
+    Rows are only needed until the token would have expired anyway, so the
+    table holds at most one refresh lifetime of revocations; see core.revocation.
+    """
+    jti = models.CharField(max_length=64, primary_key=True)
+    expires_at = models.DateTimeField(db_index=True)
+
+    def __str__(self):
+        return self.jti
@@ -0,0 +1,138 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from rest_framework import permissions
+
+from .models import Permission
+
+RBAC_CACHE_TIMEOUT = getattr(settings, 'RBAC_CACHE_TIMEOUT', 15 * 60)
+RBAC_TOKEN_CLAIM = getattr(settings, 'RBAC_TOKEN_CLAIM', 'perms')
+
+_GENERATION_KEY = 'rbac:generation'
+
+# Process-local copy of the permission code -> bit table, tagged with its generation.
+_local_bits = (None, {})
+
+
+def _generation():
+    return cache.get_or_set(_GENERATION_KEY, 1, None)
+
+
+def bump_generation():
+    """
+    Invalidate every cached permission set at once, e.g. when a Permission row changes.
+
+    Bumped again once the transaction commits, past anything cached from the old rows meanwhile.
+    """
+    _bump_generation()
+    transaction.on_commit(_bump_generation)
+
+
+def _bump_generation():
+    try:
+        cache.incr(_GENERATION_KEY)
+    except ValueError:
+        cache.add(_GENERATION_KEY, 1, None)
+
+
+def permission_bits_table():
+    """
+    Return {permission code: bit number}.
+
+    A permission's bit is its primary key, so bit positions are stable across
+    processes and inside already issued tokens.
+    """
+    global _local_bits
+    generation = _generation()
+    if _local_bits[0] == generation:
+        return _local_bits[1]
+    key = f"rbac:{generation}:codes"
+    table = cache.get(key)
+    if table is None:
+        table = dict(Permission.objects.values_list('code', 'pk'))
+        cache.set(key, table, RBAC_CACHE_TIMEOUT)
+    _local_bits = (generation, table)
+    return table
+
+
+def _user_key(generation, user_id):
+    return f"rbac:{generation}:user:{user_id}"
+
+
+def get_permission_bits(user_id):
+    """Return the user's flattened permissions as an int bitset, from cache or one query."""
+    generation = _generation()
+    key = _user_key(generation, user_id)
+    bits = cache.get(key)
+    if bits is None:
+        bits = 0
+        permission_ids = (
+            Permission.objects.filter(roles__user_roles__user_id=user_id)
+            .values_list('pk', flat=True)
+            .distinct()
+        )
+        for pk in permission_ids:
+            bits |= 1 << pk
+        cache.set(key, bits, RBAC_CACHE_TIMEOUT)
+    return bits
+
+
+def invalidate_users(user_ids):
+    """Drop the users' cached permission sets, now and again once the transaction commits."""
+    user_ids = list(user_ids)
+    _delete_users(user_ids)
+    # A token minted meanwhile caches the bits of the rows as they were before the commit.
+    transaction.on_commit(lambda: _delete_users(user_ids))
+
+
+def _delete_users(user_ids):
+    generation = _generation()
+    cache.delete_many([_user_key(generation, user_id) for user_id in user_ids])
+
+
+def bits_have(bits, *codes):
+    """True if every permission code is set in `bits`. Unknown codes are never granted."""
+    table = permission_bits_table()
+    for code in codes:
+        bit = table.get(code)
+        if bit is None or not bits >> bit & 1:
+            return False
+    return True
+
+
+def user_has_permission(user, *codes):
+    if user.is_superuser:
+        return True
+    return bits_have(get_permission_bits(user.pk), *codes)
+
+
+def encode_bits(bits):
+    return format(bits, 'x')
+
+
+def decode_bits(value):
+    return int(value, 16)
+
+
+class HasRolePermission(permissions.BasePermission):
+    """
+    Allows access when the user holds every code in the view's `required_permissions`.
+
+    The permission set is read from the access token claim when present, so no
+    query is needed; otherwise it comes from the cached resolver.
+    """
+    message = "You do not have permission to perform this action."
+
+    def has_permission(self, request, view):
+        required = getattr(view, 'required_permissions', ())
+        user = request.user
+        if not user or not user.is_authenticated:
+            return False
+        if user.is_superuser or not required:
+            return True
+
+        claim = None
+        if RBAC_TOKEN_CLAIM and request.auth is not None:
+            claim = request.auth.get(RBAC_TOKEN_CLAIM)
+        bits = decode_bits(claim) if claim is not None else get_permission_bits(user.pk)
+        return bits_have(bits, *required)
@@ -0,0 +1,129 @@
+"""
+Revocation store for refresh tokens, keyed by the token's `jti` claim.
+
+Only revoked tokens are stored, each until its own expiry; after that the
+token's `exp` claim rejects it anyway and `sweep_expired()` deletes the row.
+Revoking is also the membership check: a refresh token is consumed by
+claiming its jti, and a claim that finds the jti already present means the
+token was used before.
+
+A claim is a single INSERT that fails on the primary key. The table is the
+only authority: with TOKEN_REVOCATION['CACHE'], revocations are also marked in
+the shared cache, so replays of a revoked token and repeated checks of it are
+answered without a query, but a cache miss always falls through to the table.
+A cache restart or eviction therefore costs queries, never a replayed token.
+"""
+
+import asyncio
+import logging
+from contextlib import nullcontext
+from datetime import datetime, timezone as dt_timezone
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.db import IntegrityError, close_old_connections, router, transaction
+from django.utils import timezone
+
+from .models import RevokedToken
+
+logger = logging.getLogger(__name__)
+
+_options = getattr(settings, 'TOKEN_REVOCATION', {})
+REVOCATION_CACHE = _options.get('CACHE', False)
+SWEEP_BATCH_SIZE = _options.get('SWEEP_BATCH_SIZE', 10_000)
+SWEEP_INTERVAL = _options.get('SWEEP_INTERVAL', 60 * 60)
+
+
+def _cache_key(jti):
+    return f"revoked:{jti}"
+
+
+def _expiry(exp):
+    """The `exp` claim (epoch seconds) as an aware datetime."""
+    return datetime.fromtimestamp(exp, tz=dt_timezone.utc)
+
+
+def _remember(jti, expires_at):
+    """Mark `jti` revoked in the cache until the token expires."""
+    ttl = (expires_at - timezone.now()).total_seconds()
+    if ttl > 0:
+        cache.set(_cache_key(jti), 1, int(ttl) + 1)
+
+
+def is_revoked(jti):
+    """Whether `jti` has been revoked; with the cache on, a cached revocation needs no query."""
+    if REVOCATION_CACHE:
+        if cache.get(_cache_key(jti)) is not None:
+            return True
+        expires_at = RevokedToken.objects.filter(jti=jti).values_list('expires_at', flat=True).first()
+        if expires_at is None:
+            return False
+        _remember(jti, expires_at)
+        return True
+    return RevokedToken.objects.filter(jti=jti).exists()
+
+
+def revoke(jti, exp):
+    """
+    Revoke the token with this `jti` and `exp` claim. Returns False if it already was.
+
+    Tokens already past their expiry are reported as newly revoked without
+    being stored: nothing will accept them again.
+    """
+    expires_at = _expiry(exp)
+    if expires_at <= timezone.now():
+        return True
+    if REVOCATION_CACHE and cache.get(_cache_key(jti)) is not None:
+        return False
+
+    using = router.db_for_write(RevokedToken)
+    # A failed INSERT poisons an enclosing transaction, so it gets a savepoint there.
+    savepoint = transaction.atomic(using=using) if transaction.get_connection(using).in_atomic_block else nullcontext()
+    try:
+        with savepoint:
+            RevokedToken.objects.create(jti=jti, expires_at=expires_at)
+    except IntegrityError:
+        revoked = False
+    else:
+        revoked = True
+    if REVOCATION_CACHE:
+        _remember(jti, expires_at)
+    return revoked
+
+
+def sweep_expired(batch_size=SWEEP_BATCH_SIZE, now=None):
+    """Delete revocations of tokens that have expired, in batches over the expires_at index. Returns rows deleted."""
+    now = now or timezone.now()
+    deleted = 0
+    while True:
+        batch = list(RevokedToken.objects.filter(expires_at__lte=now).values_list('pk', flat=True)[:batch_size])
+        if not batch:
+            return deleted
+        deleted += RevokedToken.objects.filter(pk__in=batch).delete()[0]
+
+
+def _sweep(batch_size):
+    close_old_connections()
+    try:
+        return sweep_expired(batch_size)
+    finally:
+        close_old_connections()
+
+
+async def run_sweeper(interval=SWEEP_INTERVAL, batch_size=SWEEP_BATCH_SIZE, stop=None):
+    """Sweep expired revocations every `interval` seconds until `stop` (an asyncio.Event) is set."""
+    stop = stop or asyncio.Event()
+    sweep = sync_to_async(_sweep, thread_sensitive=True)
+    while not stop.is_set():
+        try:
+            deleted = await sweep(batch_size)
+        except Exception:
+            logger.exception("Revoked token sweep failed")
+        else:
+            if deleted:
+                logger.info("Swept %d expired token revocations", deleted)
+        try:
+            await asyncio.wait_for(stop.wait(), timeout=interval)
+        except asyncio.TimeoutError:
+            pass
@@ -1,10 +1,67 @@
+from contextlib import nullcontext
+
 from rest_framework import serializers
-from rest_framework_simplejwt.tokens import RefreshToken
 from phonenumber_field.serializerfields import PhoneNumberField as PhoneNumberSerializerField
+from django.conf import settings
 from django.contrib.auth import get_user_model
+from django.db import IntegrityError, router, transaction
+from django.db.models import Q
+from .tokens import RoleRefreshToken
 
 User = get_user_model()
 
+# Check email and phone with one query during validation, so a duplicate is
+# rejected before its password is hashed. Off by default: the unique constraints
+# alone decide, and a clean signup costs a single INSERT.
+REGISTRATION_PRECHECK = getattr(settings, 'REGISTRATION_PRECHECK', False)
+
+# The texts the API has always returned: Django's unique message for the model's
+# email field, and the one the phone validator used to raise.
+UNIQUE_FIELD_MESSAGES = {
+    "email": "user with this email already exists.",
+    "phone": "A user with this phone already exists.",
+}
+
+
+def taken_fields(email=None, phone=None):
+    """Return {field: [message]} for each of `email` and `phone` another user already has, in one query."""
+    email = email and User.objects.normalize_email(email)
+    lookups = Q()
+    if email:
+        lookups |= Q(email=email)
+    if phone:
+        lookups |= Q(phone=phone)
+    if not lookups:
+        return {}
+    taken = {}
+    for existing_email, existing_phone in User.objects.filter(lookups).values_list("email", "phone"):
+        if email and existing_email == email:
+            taken["email"] = [UNIQUE_FIELD_MESSAGES["email"]]
+        if phone and existing_phone == phone:
+            taken["phone"] = [UNIQUE_FIELD_MESSAGES["phone"]]
+    return taken
+
+
+def create_unique_user(create, **fields):
+    """
+    Call `create(**fields)` and turn a unique constraint violation into field errors.
+
+    The constraints on email and phone are the only uniqueness check, so two
+    concurrent signups cannot both pass it. A violation is looked up with one
+    query to report the same errors validation used to; the savepoint is only
+    needed inside an outer transaction, which a failed INSERT would poison.
+    """
+    using = router.db_for_write(User)
+    savepoint = transaction.atomic(using=using) if transaction.get_connection(using).in_atomic_block else nullcontext()
+    try:
+        with savepoint:
+            return create(**fields)
+    except IntegrityError:
+        taken = taken_fields(fields.get("email"), fields.get("phone"))
+        if not taken:
+            raise
+        raise serializers.ValidationError(taken)
+
 class UserSerializer(serializers.ModelSerializer):
     """Serializer for user registration in the system"""
     
@@ -14,11 +71,14 @@ class UserSerializer(serializers.ModelSerializer):
         model = User
         fields = ["id", "first_name", "last_name", "email", "phone", "password"]
         extra_kwargs = {
-            "password": {"write_only": True}
+            "password": {"write_only": True},
+            # Uniqueness is enforced by the database constraint, see create_unique_user().
+            "email": {"validators": []},
         }
 
-    def get_tokens(self, user):
-        refresh = RefreshToken.for_user(user)
+    @staticmethod
+    def get_tokens(user):
+        refresh = RoleRefreshToken.for_user(user)
         return {
             "refresh": str(refresh),
             "access": str(refresh.access_token),
@@ -26,20 +86,15 @@ class UserSerializer(serializers.ModelSerializer):
 
     def create(self, validated_data):
         """Create a new user with hashed password."""
-        user = User.objects.create_user(**validated_data)
-        return user
-
-    def validate_email(self, value):
-        """Ensure email is unique."""
-        if User.objects.filter(email=value).exists():
-            raise serializers.ValidationError("A user with this email already exists.")
-        return value
-    
-    def validate_phone(self, value):
-        """Ensure phone is unique."""
-        if User.objects.filter(phone=value).exists():
-            raise serializers.ValidationError("A user with this phone already exists.")
-        return value
+        return create_unique_user(User.objects.create_user, **validated_data)
+
+    def validate(self, attrs):
+        """Optionally reject a taken email or phone up front, see REGISTRATION_PRECHECK."""
+        if REGISTRATION_PRECHECK:
+            taken = taken_fields(attrs.get("email"), attrs.get("phone"))
+            if taken:
+                raise serializers.ValidationError(taken)
+        return attrs
 
 class LoginSerializer(serializers.Serializer):
     """Serializer for User to login in the system"""
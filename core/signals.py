@@ -0,0 +1,36 @@
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+
+from .authentication import evict_user_snapshot
+from .models import Permission, Role, User, UserRole
+from .rbac import bump_generation, invalidate_users
+
+
+@receiver([post_save, post_delete], sender=UserRole)
+def user_role_changed(sender, instance, **kwargs):
+    invalidate_users([instance.user_id])
+
+
+@receiver(m2m_changed, sender=Role.permissions.through)
+def role_permissions_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    if reverse:
+        if pk_set is None:
+            # permission.roles.clear(): the affected roles are no longer known.
+            bump_generation()
+            return
+        roles = pk_set
+    else:
+        roles = [instance.pk]
+    invalidate_users(UserRole.objects.filter(role__in=roles).values_list('user_id', flat=True).distinct())
+
+
+@receiver([post_save, post_delete], sender=Permission)
+def permission_changed(sender, instance, **kwargs):
+    bump_generation()
+
+
+@receiver([post_save, post_delete], sender=User)
+def user_changed(sender, instance, **kwargs):
+    evict_user_snapshot(instance.pk)
@@ -1,3 +1,408 @@
+import os
+import tempfile
+from io import StringIO
+from datetime import timedelta
+from types import SimpleNamespace
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.exceptions import ValidationError
+from rest_framework_simplejwt.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.tokens import AccessToken
+
+from . import rbac, revocation, serializers as user_serializers
+from .authentication import CachedJWTAuthentication, SnapshotUser, evict_user_snapshot, get_user_snapshot
+from .hashers import HashPoolBusy, PasswordHashPool, TunablePBKDF2PasswordHasher
+from .models import Permission, RevokedToken, Role, UserRole
+from .rbac import HasRolePermission, decode_bits, get_permission_bits, user_has_permission
+from .tokens import RoleRefreshToken
+
+User = get_user_model()
+
+
+class RBACTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(email="tutor@example.com", phone="+919800000001")
+        cls.create = Permission.objects.create(code='create_test_series', name='Create test series')
+        cls.publish = Permission.objects.create(code='publish_exam', name='Publish exam')
+        cls.tutor = Role.objects.create(name='Tutor')
+        cls.tutor.permissions.add(cls.create)
+
+    def setUp(self):
+        cache.clear()
+
+    def check(self, request):
+        view = SimpleNamespace(required_permissions=('create_test_series',))
+        return HasRolePermission().has_permission(request, view)
+
+    def test_permission_set_is_cached(self):
+        UserRole.objects.create(user=self.user, role=self.tutor)
+        self.assertTrue(user_has_permission(self.user, 'create_test_series'))
+        with self.assertNumQueries(0):
+            self.assertTrue(user_has_permission(self.user, 'create_test_series'))
+            self.assertFalse(user_has_permission(self.user, 'publish_exam'))
+            self.assertFalse(user_has_permission(self.user, 'unknown_code'))
+
+    def test_user_role_changes_invalidate(self):
+        self.assertFalse(user_has_permission(self.user, 'create_test_series'))
+        user_role = UserRole.objects.create(user=self.user, role=self.tutor)
+        self.assertTrue(user_has_permission(self.user, 'create_test_series'))
+        user_role.delete()
+        self.assertFalse(user_has_permission(self.user, 'create_test_series'))
+
+    def test_role_permission_changes_invalidate(self):
+        UserRole.objects.create(user=self.user, role=self.tutor)
+        self.assertFalse(user_has_permission(self.user, 'publish_exam'))
+        self.tutor.permissions.add(self.publish)
+        self.assertTrue(user_has_permission(self.user, 'publish_exam'))
+        self.publish.roles.remove(self.tutor)
+        self.assertFalse(user_has_permission(self.user, 'publish_exam'))
+        self.create.roles.clear()
+        self.assertEqual(get_permission_bits(self.user.pk), 0)
+
+    def test_bits_cached_before_commit_are_dropped(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            UserRole.objects.create(user=self.user, role=self.tutor)
+            # A token minted in another process before the commit caches the old, empty set.
+            cache.set(rbac._user_key(rbac._generation(), self.user.pk), 0)
+        self.assertTrue(user_has_permission(self.user, 'create_test_series'))
+
+    def test_access_token_carries_permission_claim(self):
+        UserRole.objects.create(user=self.user, role=self.tutor)
+        access = AccessToken(str(RoleRefreshToken.for_user(self.user).access_token))
+        self.assertEqual(decode_bits(access['perms']), 1 << self.create.pk)
+
+        request = SimpleNamespace(user=self.user, auth=access)
+        self.assertTrue(self.check(request))
+        with self.assertNumQueries(0):
+            self.assertTrue(self.check(request))
+
+    def test_permission_class_without_claim_uses_resolver(self):
+        request = SimpleNamespace(user=self.user, auth=None)
+        self.assertFalse(self.check(request))
+        UserRole.objects.create(user=self.user, role=self.tutor)
+        self.assertTrue(self.check(request))
+
+
+class CachedJWTAuthenticationTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(email="student@example.com", phone="+919800000002")
+
+    def setUp(self):
+        cache.clear()
+        self.token = AccessToken(str(RoleRefreshToken.for_user(self.user).access_token))
+
+    def test_warm_authentication_does_not_query(self):
+        auth = CachedJWTAuthentication()
+        with self.assertNumQueries(1):
+            user = auth.get_user(self.token)
+        with self.assertNumQueries(0):
+            user = auth.get_user(self.token)
+        self.assertIsInstance(user, SnapshotUser)
+        self.assertEqual((user.pk, user.email, user.is_verified), (self.user.pk, self.user.email, False))
+        self.assertEqual(user.instance, self.user)
+
+    def test_deactivation_evicts_snapshot(self):
+        auth = CachedJWTAuthentication()
+        auth.get_user(self.token)
+        self.user.is_active = False
+        self.user.save()
+        with self.assertRaises(AuthenticationFailed):
+            auth.get_user(self.token)
+
+    def test_snapshot_cached_before_commit_is_dropped(self):
+        auth = CachedJWTAuthentication()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.is_active = False
+            self.user.save()
+            # A request in another process authenticates before the commit and caches the active row.
+            cache.set(f"auth_user:{self.user.pk}", {**get_user_snapshot(self.user.pk), 'is_active': True})
+        with self.assertRaises(AuthenticationFailed):
+            auth.get_user(self.token)
+
+    def test_deleted_user_is_rejected(self):
+        self.user.delete()
+        with self.assertRaises(AuthenticationFailed):
+            CachedJWTAuthentication().get_user(self.token)
+
+
+@mock.patch.object(TunablePBKDF2PasswordHasher, 'iterations', 1000)
+class AuthViewTests(TestCase):
+
+    register_payload = {
+        "first_name": "Asha", "last_name": "Rao", "email": "asha@example.com",
+        "phone": "+919812345678", "password": "s3cret-pass",
+    }
+
+    def register(self, url_name):
+        return self.client.post(reverse(url_name), self.register_payload, content_type="application/json")
+
+    def login(self, url_name, password="s3cret-pass"):
+        return self.client.post(
+            reverse(url_name), {"email": "asha@example.com", "password": password}, content_type="application/json",
+        )
+
+    def test_sync_register_and_login(self):
+        self.assertEqual(self.register('register').status_code, 201)
+        response = self.login('login')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(set(response.json()["tokens"]), {"refresh", "access"})
+
+    def test_async_views_match_sync_responses(self):
+        registered = self.register('async_register')
+        self.assertEqual(registered.status_code, 201)
+        user = User.objects.get(email="asha@example.com")
+        self.assertTrue(user.check_password("s3cret-pass"))
+        self.assertEqual(registered.json()["user"], {
+            "id": user.pk, "first_name": "Asha", "last_name": "Rao",
+            "email": "asha@example.com", "phone": "+919812345678",
+        })
+        self.assertEqual(self.register('async_register').status_code, 400)
+
+        logged_in = self.login('async_login')
+        self.assertEqual(logged_in.status_code, 200)
+        self.assertEqual(logged_in.json()["user"], self.login('login').json()["user"])
+        self.assertEqual(self.login('async_login', password="wrong").status_code, 401)
+
+    duplicate_errors = {
+        "email": ["user with this email already exists."],
+        "phone": ["A user with this phone already exists."],
+    }
+
+    def test_register_relies_on_unique_constraints(self):
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(self.register('register').status_code, 201)
+        user_queries = [query["sql"] for query in queries if '"core_user"' in query["sql"]]
+        self.assertEqual(len(user_queries), 1)
+        self.assertTrue(user_queries[0].startswith("INSERT"))
+
+        for url_name in ('register', 'async_register'):
+            response = self.register(url_name)
+            self.assertEqual(response.status_code, 400)
+            self.assertEqual(response.json(), self.duplicate_errors)
+        self.assertEqual(User.objects.count(), 1)
+
+    def test_precheck_rejects_before_hashing(self):
+        self.register('register')
+        with mock.patch.object(user_serializers, 'REGISTRATION_PRECHECK', True), \
+                mock.patch.object(TunablePBKDF2PasswordHasher, 'encode') as encode, \
+                self.assertNumQueries(1):
+            response = self.register('register')
+        self.assertEqual(response.json(), self.duplicate_errors)
+        encode.assert_not_called()
+
+    def test_concurrent_signups_create_one_account(self):
+        # Both requests validate before either inserts, as two racing signups would.
+        with mock.patch.object(user_serializers, 'REGISTRATION_PRECHECK', True):
+            racing = [user_serializers.UserSerializer(data=self.register_payload) for _ in range(2)]
+            self.assertTrue(all(serializer.is_valid() for serializer in racing))
+        racing[0].save()
+        with self.assertRaises(ValidationError) as raised:
+            racing[1].save()
+        self.assertEqual(raised.exception.detail, self.duplicate_errors)
+        self.assertEqual(User.objects.count(), 1)
+
+    def test_async_login_rehashes_outdated_hash(self):
+        self.register('async_register')
+        with mock.patch.object(TunablePBKDF2PasswordHasher, 'iterations', 1200):
+            self.assertEqual(self.login('async_login').status_code, 200)
+        self.assertTrue(User.objects.get().password.startswith("pbkdf2_sha256$1200$"))
+
+    def test_full_pool_returns_503(self):
+        self.register('async_register')
+        with mock.patch.object(PasswordHashPool, 'run', side_effect=HashPoolBusy):
+            response = self.login('async_login')
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response["Retry-After"], "1")
+
+
+@mock.patch.object(TunablePBKDF2PasswordHasher, 'iterations', 1000)
+class ImportUsersCommandTests(TestCase):
+
+    def write(self, name, content):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(lambda: [os.remove(os.path.join(directory, f)) for f in os.listdir(directory)])
+        path = os.path.join(directory, name)
+        with open(path, 'w') as handle:
+            handle.write(content)
+        return path
+
+    def run_import(self, path, *args):
+        out, err = StringIO(), StringIO()
+        call_command('import_users', path, '--workers', '0', '--chunk-size', '2', *args, stdout=out, stderr=err)
+        return out.getvalue(), err.getvalue()
+
+    def test_csv_import_normalizes_and_skips_duplicates(self):
+        User.objects.create_user(email="taken@example.com", phone="+919800000009")
+        path = self.write("users.csv", (
+            "email,phone,password,first_name,last_name\n"
+            "a@EXAMPLE.com,98000 00001,pw1,A,One\n"
+            "b@example.com,+91 98000 00001,pw2,B,Two\n"
+            "taken@example.com,9800000003,pw3,C,Three\n"
+            "d@example.com,not-a-phone,pw4,D,Four\n"
+            "e@example.com,9800000005,,E,Five\n"
+        ))
+        out, err = self.run_import(path)
+        self.assertIn("Imported 2 users, skipped 3 of 5 rows.", out)
+        self.assertIn("row 2: Duplicate phone +919800000001", err)
+        self.assertIn("row 3: Duplicate email taken@example.com", err)
+        self.assertIn("row 4: Invalid phone number", err)
+
+        user = User.objects.get(email="a@example.com")
+        self.assertEqual(str(user.phone), "+919800000001")
+        self.assertTrue(user.check_password("pw1"))
+        self.assertFalse(User.objects.get(email="e@example.com").has_usable_password())
+
+    def test_jsonl_import_resumes_from_checkpoint(self):
+        path = self.write("users.jsonl", "".join(
+            f'{{"email": "u{i}@example.com", "phone": "98000000{i:02d}", "password": "pw"}}\n' for i in range(1, 6)
+        ))
+        with open(f"{path}.checkpoint", 'w') as handle:
+            handle.write('{"rows": 4}')
+        out, _err = self.run_import(path, '--resume')
+        self.assertIn("Imported 1 users, skipped 0 of 5 rows.", out)
+        self.assertEqual(list(User.objects.values_list("email", flat=True)), ["u5@example.com"])
+        self.assertFalse(os.path.exists(f"{path}.checkpoint"))
+
+    def test_malformed_rows_are_reported_not_fatal(self):
+        path = self.write("users.jsonl", (
+            '{"email": "u1@example.com", "phone": "9800000001"}\n'
+            '{"email": "u2@example.com", "phone": 9800000002}\n'
+            '{"email": "u3@example.com", \n'
+            '["u4@example.com"]\n'
+            '{"email": "u5@example.com", "phone": "9800000005", "password": 5}\n'
+            '{"email": "u6@example.com", "phone": "9800000006"}\n'
+        ))
+        out, err = self.run_import(path)
+        self.assertIn("Imported 2 users, skipped 4 of 6 rows.", out)
+        self.assertIn("row 2: Invalid phone 9800000002: expected a string", err)
+        self.assertIn("row 3: Invalid JSON", err)
+        self.assertIn("row 4: Invalid row", err)
+        self.assertIn("row 5: Invalid password", err)
+
+    def test_user_created_meanwhile_fails_only_its_row(self):
+        path = self.write("users.csv", (
+            "email,phone,password\n"
+            "u1@example.com,9800000001,pw\n"
+            "u2@example.com,9800000002,pw\n"
+        ))
+
+        def sign_up_meanwhile(password):
+            # Someone registers u2 between the duplicate check and the insert.
+            if not User.objects.filter(email="u2@example.com").exists():
+                User.objects.create_user(email="u2@example.com", phone="+919800000099")
+            return make_password(password)
+
+        with mock.patch('core.user_import.make_password', side_effect=sign_up_meanwhile):
+            out, err = self.run_import(path)
+        self.assertIn("Imported 1 users, skipped 1 of 2 rows.", out)
+        self.assertIn("row 2: Already exists", err)
+        self.assertEqual(User.objects.filter(phone="+919800000001").count(), 1)
+
+
+class StartupWarmUpTests(TestCase):
+
+    def test_warm_up_loads_only_configured_phone_regions(self):
+        from phonenumbers.phonemetadata import PhoneMetadata
+
+        from backend.startup import phone_regions, warm_up
+
+        self.assertEqual(phone_regions(), ['IN'])
+        before = set(PhoneMetadata._region_metadata)
+        warm_up()
+        self.assertEqual(set(PhoneMetadata._region_metadata) - before, {'IN'} - before)
+        self.assertIn('IN', PhoneMetadata._region_metadata)
+
+
+class CompiledSerializerTests(TestCase):
+
+    def test_output_is_byte_identical_to_user_serializer(self):
+        from rest_framework.renderers import JSONRenderer
+
+        from .fast_serializers import CompiledSerializer
+        from .serializers import UserSerializer
+
+        User.objects.create_user(email="a@example.com", phone="+919800000001", first_name="Ä", last_name="B")
+        User.objects.create_user(email="b@example.com", phone="98000 00002")
+        User.objects.create_user(email="c@example.com", phone="+14155552671")
+        compiled = CompiledSerializer(UserSerializer)
+        render = JSONRenderer().render
+        users = list(User.objects.order_by('pk'))
+
+        for user in users:
+            self.assertEqual(render(compiled.to_representation(user)), render(UserSerializer(user).data))
+        self.assertEqual(
+            render(compiled.rows(User.objects.order_by('pk'))),
+            render(UserSerializer(users, many=True).data),
+        )
+        self.assertNotIn("password", compiled.to_representation(users[0]))
+
+
+class TokenRevocationTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(email="student@example.com", phone="+919800000001")
+
+    def setUp(self):
+        cache.clear()
+        self.refresh = str(RoleRefreshToken.for_user(self.user))
+        # Warm the auth snapshot and permission caches, as any earlier request would.
+        get_user_snapshot(self.user.pk)
+        get_permission_bits(self.user.pk)
+
+    def post(self, url_name, token):
+        return self.client.post(reverse(url_name), {"refresh": token}, content_type="application/json")
+
+    def test_rotation_revokes_the_used_token_with_one_insert(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.post('token_refresh', self.refresh)
+        self.assertEqual(response.status_code, 200)
+        statements = [query["sql"] for query in queries if "SAVEPOINT" not in query["sql"]]
+        self.assertEqual(len(statements), 1)
+        self.assertTrue(statements[0].startswith('INSERT INTO "core_revokedtoken"'))
+
+        self.assertEqual(self.post('token_refresh', self.refresh).status_code, 401)
+        self.assertEqual(self.post('token_refresh', response.json()["refresh"]).status_code, 200)
+
+    def test_cache_answers_replays_and_misses_fall_back_to_the_table(self):
+        jti = RoleRefreshToken(self.refresh)["jti"]
+        with mock.patch.object(revocation, 'REVOCATION_CACHE', True):
+            self.assertEqual(self.post('token_refresh', self.refresh).status_code, 200)
+            self.assertTrue(RevokedToken.objects.filter(jti=jti).exists())
+            with self.assertNumQueries(0):
+                self.assertEqual(self.post('token_refresh', self.refresh).status_code, 401)
+                self.assertTrue(revocation.is_revoked(jti))
+
+            cache.clear()  # A restarted or evicting cache
+            self.assertTrue(revocation.is_revoked(jti))
+            cache.clear()
+            self.assertEqual(self.post('token_refresh', self.refresh).status_code, 401)
+
+    def test_revoke_view_and_sweep(self):
+        self.assertEqual(self.post('token_revoke', self.refresh).status_code, 200)
+        self.assertEqual(self.post('token_revoke', self.refresh).status_code, 200)
+        self.assertEqual(self.post('token_refresh', self.refresh).status_code, 401)
+
+        self.assertEqual(revocation.sweep_expired(), 0)
+        later = timezone.now() + timedelta(days=8)
+        with mock.patch('django.utils.timezone.now', return_value=later):
+            call_command('sweep_revoked_tokens', '--once', stdout=StringIO())
+        self.assertFalse(RevokedToken.objects.exists())
 
-# Create your tests here.
+    def test_inactive_user_cannot_refresh(self):
+        User.objects.filter(pk=self.user.pk).update(is_active=False)
+        evict_user_snapshot(self.user.pk)
+        self.assertEqual(self.post('token_refresh', self.refresh).status_code, 401)
@@ -0,0 +1,75 @@
+from rest_framework import serializers
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, TokenError
+from rest_framework_simplejwt.serializers import TokenObtainPairSerializer, TokenRefreshSerializer
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from .authentication import get_user_snapshot
+from .rbac import RBAC_TOKEN_CLAIM, encode_bits, get_permission_bits
+from .revocation import is_revoked, revoke
+
+
+class RoleRefreshToken(RefreshToken):
+    """
+    Refresh token whose access tokens carry the user's permission bitset.
+
+    The claim is recomputed (from the RBAC cache) every time an access token is
+    minted, so role changes reach clients within one access token lifetime.
+    """
+
+    @property
+    def access_token(self):
+        if RBAC_TOKEN_CLAIM:
+            user_id = self.payload.get(api_settings.USER_ID_CLAIM)
+            if user_id is not None:
+                self[RBAC_TOKEN_CLAIM] = encode_bits(get_permission_bits(user_id))
+        return super().access_token
+
+
+class RoleTokenObtainPairSerializer(TokenObtainPairSerializer):
+    token_class = RoleRefreshToken
+
+
+class RoleTokenRefreshSerializer(TokenRefreshSerializer):
+    """
+    Token refresh backed by the jti revocation store instead of the blacklist app.
+
+    With rotation the presented token is revoked by claiming its jti, which also
+    rejects a token that was already used. The user's active flag comes from
+    the cached auth snapshot, so a warm refresh needs at most one INSERT.
+    """
+    token_class = RoleRefreshToken
+
+    def validate(self, attrs):
+        refresh = self.token_class(attrs["refresh"])
+
+        user_id = refresh.payload.get(api_settings.USER_ID_CLAIM)
+        if user_id is not None:
+            snapshot = get_user_snapshot(user_id)
+            if snapshot is None or (api_settings.CHECK_USER_IS_ACTIVE and not snapshot["is_active"]):
+                raise AuthenticationFailed(self.error_messages["no_active_account"], "no_active_account")
+
+        jti = refresh.payload[api_settings.JTI_CLAIM]
+        if api_settings.ROTATE_REFRESH_TOKENS and api_settings.BLACKLIST_AFTER_ROTATION:
+            if not revoke(jti, refresh.payload["exp"]):
+                raise TokenError("Token is blacklisted")
+        elif is_revoked(jti):
+            raise TokenError("Token is blacklisted")
+
+        data = {"access": str(refresh.access_token)}
+        if api_settings.ROTATE_REFRESH_TOKENS:
+            refresh.set_jti()
+            refresh.set_exp()
+            refresh.set_iat()
+            data["refresh"] = str(refresh)
+        return data
+
+
+class RoleTokenRevokeSerializer(serializers.Serializer):
+    """Revoke a refresh token, e.g. on logout. Revoking it twice is not an error."""
+    refresh = serializers.CharField(write_only=True)
+
+    def validate(self, attrs):
+        refresh = RoleRefreshToken(attrs["refresh"])
+        revoke(refresh.payload[api_settings.JTI_CLAIM], refresh.payload["exp"])
+        return {}
@@ -1,13 +1,20 @@
+from django.conf import settings
 from django.urls import path
-from .views import RegisterView, LoginView
+from .views import AsyncLoginView, AsyncRegisterView, RegisterView, LoginView, TokenRevokeView
 from rest_framework_simplejwt.views import (
     TokenObtainPairView,
     TokenRefreshView,
 )
 
+# Under ASGI the async views keep password hashing off the event loop.
+async_auth = getattr(settings, 'ASYNC_AUTH_VIEWS', False)
+
 urlpatterns = [
-    path('register/', RegisterView.as_view(), name='register'),
-    path("login/", LoginView.as_view(), name="login"),
+    path('register/', (AsyncRegisterView if async_auth else RegisterView).as_view(), name='register'),
+    path("login/", (AsyncLoginView if async_auth else LoginView).as_view(), name="login"),
+    path('async/register/', AsyncRegisterView.as_view(), name='async_register'),
+    path('async/login/', AsyncLoginView.as_view(), name='async_login'),
     path('token/', TokenObtainPairView.as_view(), name='token_obtain_pair'),
     path('token/refresh/', TokenRefreshView.as_view(), name='token_refresh'),
+    path('token/revoke/', TokenRevokeView.as_view(), name='token_revoke'),
 ]
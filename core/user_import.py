@@ -0,0 +1,194 @@
+import csv
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.exceptions import ValidationError
+from django.core.validators import validate_email
+from django.db import IntegrityError, transaction
+from phonenumber_field.phonenumber import to_python
+
+from .hashers import setup_worker
+
+User = get_user_model()
+
+PHONE_REGION = User._meta.get_field('phone').region
+
+
+class InvalidRow:
+    """Stands in for a line of the input that could not be parsed into a row."""
+
+    def __init__(self, message):
+        self.message = message
+
+
+def read_rows(path, fmt=None):
+    """
+    Yield dict rows from a CSV (with a header line) or JSONL file, one at a time.
+
+    A JSONL line that is not valid JSON is yielded as an InvalidRow, so the
+    importer can report it with the other row errors.
+    """
+    fmt = fmt or ('jsonl' if path.endswith(('.jsonl', '.ndjson')) else 'csv')
+    with open(path, newline='', encoding='utf-8') as handle:
+        if fmt == 'csv':
+            yield from csv.DictReader(handle)
+        else:
+            for line in handle:
+                if line.strip():
+                    try:
+                        yield json.loads(line)
+                    except json.JSONDecodeError as exc:
+                        yield InvalidRow(f"Invalid JSON: {exc.msg}")
+
+
+def _text(row, name):
+    """The stripped string value of `name` in `row`, '' when missing; anything but a string is an error."""
+    value = row.get(name)
+    if value is None:
+        return ""
+    if not isinstance(value, str):
+        raise ValidationError(f"Invalid {name} {value!r}: expected a string")
+    return value.strip()
+
+
+def normalize_row(row):
+    """Return the cleaned import fields of a row, or raise ValidationError."""
+    if isinstance(row, InvalidRow):
+        raise ValidationError(row.message)
+    if not isinstance(row, dict):
+        raise ValidationError(f"Invalid row {row!r}: expected an object")
+    email = User.objects.normalize_email(_text(row, "email"))
+    validate_email(email)
+    phone = to_python(_text(row, "phone"), region=PHONE_REGION)
+    if phone is None or not phone.is_valid():
+        raise ValidationError(f"Invalid phone number {row.get('phone')!r}")
+    password = row.get("password")
+    if password is not None and not isinstance(password, str):
+        raise ValidationError("Invalid password: expected a string")
+    return {
+        "email": email,
+        "phone": phone.as_e164,
+        "password": password or None,
+        "first_name": _text(row, "first_name"),
+        "last_name": _text(row, "last_name"),
+    }
+
+
+class UserImporter:
+    """
+    Streams user rows into `core.User` in chunks.
+
+    Each chunk is normalized, checked for duplicate emails and phones against the
+    rows already imported and the database with two set-based lookups, hashed on a
+    process pool and inserted with one bulk_create. If that hits a unique
+    constraint, for a user who signed up meanwhile, the chunk is inserted row by
+    row and the conflicting rows are reported. After every committed chunk the
+    number of consumed rows is written to the checkpoint file, so an interrupted
+    import can resume where it stopped; a completed import removes it.
+    """
+
+    def __init__(self, chunk_size=1000, workers=None, checkpoint=None, report=None):
+        self.chunk_size = chunk_size
+        self.workers = os.cpu_count() if workers is None else workers
+        self.checkpoint = checkpoint
+        self.report = report or (lambda stats: None)
+        self.stats = {"rows": 0, "created": 0, "skipped": 0, "errors": []}
+        self._seen_emails = set()
+        self._seen_phones = set()
+
+    def load_checkpoint(self):
+        if self.checkpoint and os.path.exists(self.checkpoint):
+            with open(self.checkpoint) as handle:
+                return json.load(handle)["rows"]
+        return 0
+
+    def save_checkpoint(self):
+        if self.checkpoint:
+            tmp = f"{self.checkpoint}.tmp"
+            with open(tmp, 'w') as handle:
+                json.dump({"rows": self.stats["rows"]}, handle)
+            os.replace(tmp, self.checkpoint)
+
+    def clear_checkpoint(self):
+        if self.checkpoint and os.path.exists(self.checkpoint):
+            os.remove(self.checkpoint)
+
+    def run(self, rows, resume=False):
+        start = self.load_checkpoint() if resume else 0
+        rows = islice(rows, start, None)
+        self.stats["rows"] = start
+
+        executor = ProcessPoolExecutor(self.workers, initializer=setup_worker) if self.workers else None
+        try:
+            while True:
+                chunk = list(islice(rows, self.chunk_size))
+                if not chunk:
+                    break
+                self._import_chunk(chunk, executor)
+                self.save_checkpoint()
+                self.report(self.stats)
+        finally:
+            if executor is not None:
+                executor.shutdown()
+        self.clear_checkpoint()
+        return self.stats
+
+    def _reject(self, line, message):
+        self.stats["skipped"] += 1
+        self.stats["errors"].append((line, message))
+
+    def _import_chunk(self, chunk, executor):
+        first_line = self.stats["rows"] + 1
+        self.stats["rows"] += len(chunk)
+
+        cleaned = []
+        for line, row in enumerate(chunk, start=first_line):
+            try:
+                cleaned.append((line, normalize_row(row)))
+            except ValidationError as exc:
+                self._reject(line, "; ".join(exc.messages))
+
+        emails = {data["email"] for _line, data in cleaned}
+        phones = {data["phone"] for _line, data in cleaned}
+        taken_emails = set(User.objects.filter(email__in=emails).values_list("email", flat=True))
+        taken_phones = {str(phone) for phone in User.objects.filter(phone__in=phones).values_list("phone", flat=True)}
+
+        accepted = []
+        for line, data in cleaned:
+            if data["email"] in taken_emails or data["email"] in self._seen_emails:
+                self._reject(line, f"Duplicate email {data['email']}")
+            elif data["phone"] in taken_phones or data["phone"] in self._seen_phones:
+                self._reject(line, f"Duplicate phone {data['phone']}")
+            else:
+                self._seen_emails.add(data["email"])
+                self._seen_phones.add(data["phone"])
+                accepted.append((line, data))
+
+        passwords = [data.pop("password") for _line, data in accepted]
+        if executor is not None:
+            chunksize = max(1, len(passwords) // (self.workers * 4))
+            hashes = list(executor.map(make_password, passwords, chunksize=chunksize))
+        else:
+            hashes = [make_password(password) for password in passwords]
+
+        users = [(line, User(password=password_hash, **data)) for (line, data), password_hash in zip(accepted, hashes)]
+        try:
+            with transaction.atomic():
+                User.objects.bulk_create([user for _line, user in users], batch_size=self.chunk_size)
+            self.stats["created"] += len(users)
+        except IntegrityError:
+            self._insert_one_by_one(users)
+
+    def _insert_one_by_one(self, users):
+        for line, user in users:
+            try:
+                with transaction.atomic():
+                    user.save(force_insert=True)
+            except IntegrityError as exc:
+                self._reject(line, f"Already exists: {exc}")
+            else:
+                self.stats["created"] += 1
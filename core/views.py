@@ -1,10 +1,25 @@
-from rest_framework import generics, permissions, status
+import json
+
+from asgiref.sync import sync_to_async
+from rest_framework import generics, permissions, serializers, status
+from rest_framework.renderers import JSONRenderer
 from rest_framework.response import Response
-from .serializers import UserSerializer, LoginSerializer
+from rest_framework_simplejwt.views import TokenViewBase
+from .fast_serializers import CompiledSerializer
+from .hashers import HashPoolBusy, get_hash_pool
+from .serializers import UserSerializer, LoginSerializer, create_unique_user
+from .tokens import RoleTokenRevokeSerializer
 from django.contrib.auth import get_user_model, authenticate
+from django.http import HttpResponse
+from django.views import View
+from django.views.decorators.csrf import csrf_exempt
 
 User = get_user_model()
 
+# Response payloads are built through the compiled serializer; the output is the
+# same JSON UserSerializer(user).data renders.
+user_payload = CompiledSerializer(UserSerializer)
+
 class RegisterView(generics.CreateAPIView):
     """
     API view for user registration.
@@ -28,7 +43,7 @@ class RegisterView(generics.CreateAPIView):
         user = serializer.save()
         tokens = serializer.get_tokens(user)
         return Response({
-            "user": serializer.data,
+            "user": user_payload.to_representation(user),
             "tokens": tokens
         }, status=status.HTTP_201_CREATED)
 
@@ -59,9 +74,8 @@ class LoginView(generics.GenericAPIView):
         user = authenticate(request, email=email, password=password)
         
         if user is not None:
-            user_serializer = UserSerializer(user)
             return Response({
-                "user": user_serializer.data,
+                "user": user_payload.to_representation(user),
                 "tokens": UserSerializer.get_tokens(user)
             }, status=status.HTTP_200_OK)
         
@@ -69,3 +83,130 @@ class LoginView(generics.GenericAPIView):
         return Response({
             "error": "Invalid credentials"
         }, status=status.HTTP_401_UNAUTHORIZED)
+
+
+class TokenRevokeView(TokenViewBase):
+    """
+    API view for revoking a refresh token, e.g. on logout.
+
+    The token's jti goes into the revocation store until the token expires.
+    """
+    serializer_class = RoleTokenRevokeSerializer
+
+
+def render_json(data, status=status.HTTP_200_OK):
+    """Render `data` exactly as DRF's JSONRenderer would for a Response."""
+    return HttpResponse(JSONRenderer().render(data), status=status, content_type="application/json")
+
+
+class AsyncAPIView(View):
+    """
+    Base class for async JSON views served by the ASGI app.
+
+    DRF's APIView dispatch is synchronous, so these views parse and render JSON
+    themselves and run blocking work through sync_to_async or the hash pool.
+    """
+
+    @classmethod
+    def as_view(cls, **initkwargs):
+        return csrf_exempt(super().as_view(**initkwargs))
+
+    @staticmethod
+    def parse_body(request):
+        try:
+            data = json.loads(request.body or b"{}")
+        except ValueError:
+            return None
+        return data if isinstance(data, dict) else None
+
+    @staticmethod
+    def busy_response():
+        response = render_json(
+            {"error": "Too many authentication requests, please retry."},
+            status=status.HTTP_503_SERVICE_UNAVAILABLE,
+        )
+        response["Retry-After"] = "1"
+        return response
+
+
+class AsyncRegisterView(AsyncAPIView):
+    """
+    Async API view for user registration.
+
+    Same request and response as RegisterView, with the password hashed on the
+    bounded password hash pool instead of the worker handling the request.
+    """
+
+    async def post(self, request, *args, **kwargs):
+        data = self.parse_body(request)
+        if data is None:
+            return render_json({"error": "Invalid JSON body"}, status=status.HTTP_400_BAD_REQUEST)
+
+        serializer = UserSerializer(data=data)
+        if not await sync_to_async(serializer.is_valid)():
+            return render_json(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        validated = dict(serializer.validated_data)
+        try:
+            password_hash = await get_hash_pool().make_password(validated.pop("password"))
+        except HashPoolBusy:
+            return self.busy_response()
+
+        try:
+            user = await sync_to_async(create_unique_user)(
+                User.objects.create_user_with_hash, password_hash=password_hash, **validated,
+            )
+        except serializers.ValidationError as exc:
+            return render_json(exc.detail, status=status.HTTP_400_BAD_REQUEST)
+        tokens = await sync_to_async(UserSerializer.get_tokens)(user)
+        return render_json({
+            "user": user_payload.to_representation(user),
+            "tokens": tokens
+        }, status=status.HTTP_201_CREATED)
+
+
+class AsyncLoginView(AsyncAPIView):
+    """
+    Async API view for user login.
+
+    Verifies the password on the bounded password hash pool. Hashes made with
+    outdated hasher settings are transparently upgraded after a successful login.
+    """
+
+    async def post(self, request, *args, **kwargs):
+        data = self.parse_body(request)
+        if data is None:
+            return render_json({"error": "Invalid JSON body"}, status=status.HTTP_400_BAD_REQUEST)
+
+        serializer = LoginSerializer(data=data)
+        if not serializer.is_valid():
+            return render_json(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        email = serializer.validated_data["email"]
+        password = serializer.validated_data["password"]
+
+        pool = get_hash_pool()
+        user = await User.objects.filter(**{User.USERNAME_FIELD: email}).afirst()
+        try:
+            # An unknown email still costs one hash, as with authenticate().
+            is_correct, must_update = await pool.verify_password(password, user.password if user else None)
+        except HashPoolBusy:
+            return self.busy_response()
+
+        if not is_correct or not user.is_active:
+            return render_json({
+                "error": "Invalid credentials"
+            }, status=status.HTTP_401_UNAUTHORIZED)
+
+        if must_update:
+            try:
+                user.password = await pool.make_password(password)
+            except HashPoolBusy:
+                pass  # Upgrade on a later login instead of failing this one.
+            else:
+                await user.asave(update_fields=["password"])
+
+        tokens = await sync_to_async(UserSerializer.get_tokens)(user)
+        return render_json({
+            "user": user_payload.to_representation(user),
+            "tokens": tokens
+        }, status=status.HTTP_200_OK)
@@ -0,0 +1,42 @@
+"""
+Gunicorn settings: gunicorn -c gunicorn.conf.py
+
+The app is loaded once in the master (preload_app) and warmed up there, so
+workers fork with Django, every view and the phone metadata already imported
+and share those pages copy-on-write instead of each building its own.
+"""
+
+import gc
+import multiprocessing
+import os
+
+wsgi_app = 'backend.wsgi:application'
+bind = os.getenv('GUNICORN_BIND', '0.0.0.0:8000')
+workers = int(os.getenv('WEB_CONCURRENCY', multiprocessing.cpu_count() * 2 + 1))
+preload_app = os.getenv('GUNICORN_PRELOAD', '1') == '1'
+max_requests = int(os.getenv('GUNICORN_MAX_REQUESTS', 0))
+max_requests_jitter = int(os.getenv('GUNICORN_MAX_REQUESTS_JITTER', 0))
+
+
+def on_starting(server):
+    # Workers must share autosave buffers, leaderboard deltas and invalidations (see CACHES).
+    # server.cfg has the effective settings, command-line overrides such as -w included.
+    if server.cfg.workers > 1 and not os.getenv('CACHE_URL'):
+        raise RuntimeError("Set CACHE_URL to a shared Redis cache to run more than one worker.")
+
+
+def when_ready(server):
+    if not server.cfg.preload_app:
+        return
+    from backend.startup import warm_up
+
+    warm_up()
+    # Keep the collector from touching (and so copying) the objects every worker inherits.
+    gc.freeze()
+
+
+def post_fork(server, worker):
+    # Connections must never be shared across processes.
+    from django.db import connections
+
+    connections.close_all()